@@ -3,61 +3,223 @@ API calls for Personal Library Management System
 Handles external API integrations for book metadata retrieval
 """
 
-import requests
+import threading
 import json
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, List
+from app_config import get_setting
 
-def get_openlibrary_book_data(isbn: str) -> Optional[Dict[str, Any]]:
+# requests is imported on first lookup rather than when the Add page loads
+
+# Seconds a lookup waits for the providers before returning the best record so far
+LOOKUP_DEADLINE = float(get_setting('LOOKUP_DEADLINE_SECONDS', '4'))
+
+# Book fields every lookup result carries, matching the database schema
+# ('authors' holds every author name and feeds the Authors/BookAuthors tables)
+BOOK_FIELDS = [
+    'title', 'subtitle', 'author', 'authors', 'isbncode', 'publisher', 'publisheddate',
+    'length', 'memo', 'rating', 'description', 'imageurl', 'excerpt'
+]
+
+# Shared pool for provider requests; identical in-flight requests are deduplicated
+_lookup_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="book-lookup")
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _fetch_json(url: str) -> Any:
+    """GET a URL and decode the JSON body"""
+    import requests
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def _forget_request(url: str, future) -> None:
+    """Drop a finished request from the in-flight table"""
+    with _inflight_lock:
+        if _inflight.get(url) is future:
+            del _inflight[url]
+
+def _get_json(url: str):
     """
-    Retrieve book data from OpenLibrary API using ISBN
+    Start a GET request in the lookup pool
+    
+    Returns the already running future when the same URL is in flight,
+    so concurrent lookups of one ISBN share a single network call.
+    """
+    with _inflight_lock:
+        future = _inflight.get(url)
+        if future is not None:
+            return future
+        future = _lookup_pool.submit(_fetch_json, url)
+        _inflight[url] = future
+    future.add_done_callback(lambda f: _forget_request(url, f))
+    return future
+
+def openlibrary_url(isbn: str) -> str:
+    return f"https://openlibrary.org/api/books?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
+
+def google_books_url(isbn: str) -> str:
+    return f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
+
+def parse_openlibrary_response(payload: Dict[str, Any], isbn: str) -> Optional[Dict[str, Any]]:
+    """Map an OpenLibrary response to standardized book fields"""
+    book_key = f"ISBN:{isbn}"
+    if book_key in payload and payload[book_key]:
+        return extract_book_fields(payload[book_key], isbn)
+    return None
+
+def parse_google_books_response(payload: Dict[str, Any], isbn: str) -> Optional[Dict[str, Any]]:
+    """Map a Google Books volume search response to standardized book fields"""
+    if payload.get('totalItems', 0) == 0 or not payload.get('items'):
+        return None
+    book_info = payload['items'][0].get('volumeInfo', {})
+    authors = book_info.get('authors') or []
+    return {
+        'title': book_info.get('title'),
+        'subtitle': book_info.get('subtitle'),
+        'author': authors[0] if authors else None,
+        'authors': authors,
+        'isbncode': isbn,
+        'publisher': book_info.get('publisher'),
+        'publisheddate': book_info.get('publishedDate'),
+        'length': book_info.get('pageCount') or 0,
+        'description': book_info.get('description'),
+        'imageurl': book_info.get('imageLinks', {}).get('thumbnail'),
+    }
+
+# Metadata providers queried concurrently, in default priority order
+PROVIDERS = [
+    {'name': 'openlibrary', 'url': openlibrary_url, 'parse': parse_openlibrary_response},
+    {'name': 'google', 'url': google_books_url, 'parse': parse_google_books_response},
+]
+
+# Per-field priority overrides (OpenLibrary doesn't provide descriptions)
+FIELD_PRIORITY = {
+    'description': ['google', 'openlibrary'],
+}
+
+def mirror_book_fields(isbn: str) -> Optional[Dict[str, Any]]:
+    """OpenLibrary fields for an ISBN from the local mirror, or None without a mirror or when it lacks the book"""
+    import sqlite3
+    from openlibrary_mirror import get_mirror
+    mirror = get_mirror()
+    if mirror is None:
+        return None
+    try:
+        data = mirror.lookup(isbn)
+    except sqlite3.Error as e:
+        print(f"OpenLibrary mirror lookup failed: {e}")
+        return None
+    return extract_book_fields(data, isbn) if data else None
+
+def _provider_result(provider: Dict[str, Any], future, isbn: str) -> Optional[Dict[str, Any]]:
+    """Parse a finished provider request, returning None on any failure"""
+    import requests
+    try:
+        return provider['parse'](future.result(), isbn)
+    except requests.RequestException as e:
+        print(f"{provider['name']} API request failed: {e}")
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Failed to decode {provider['name']} response: {e}")
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        # A payload of an unexpected shape counts as the provider finding nothing
+        print(f"Unexpected {provider['name']} response: {e!r}")
+    return None
+
+def merge_provider_fields(results: Dict[str, Dict[str, Any]], isbn: str) -> Optional[Dict[str, Any]]:
+    """
+    Merge provider results field by field according to priority
+    
+    Args:
+        results (dict): Provider name -> standardized fields
+        isbn (str): ISBN the lookup was for
+        
+    Returns:
+        dict: Merged book record, or None if no provider found a title
+    """
+    default_order = [provider['name'] for provider in PROVIDERS]
+    record = {field: None for field in BOOK_FIELDS}
+    for field in BOOK_FIELDS:
+        for name in FIELD_PRIORITY.get(field, default_order):
+            value = (results.get(name) or {}).get(field)
+            if value:
+                record[field] = value
+                break
+    if not record['title']:
+        return None
+    record['isbncode'] = isbn
+    record['length'] = record['length'] or 0
+    return record
+
+def lookup_book(isbn: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Query all providers concurrently and return the best record within a deadline
+    
+    With an OpenLibrary mirror configured (openlibrary_mirror.py), a book
+    found there stands in for the OpenLibrary request; the other providers
+    are queried and merged as usual.
+    
+    Providers still running at the deadline are left out of the record; if
+    none has answered yet, the lookup keeps waiting for the first usable one.
+    The returned record is never changed afterwards.
     
     Args:
         isbn (str): ISBN-10 or ISBN-13 of the book
+        deadline (float): Seconds to wait before returning; defaults to LOOKUP_DEADLINE
         
     Returns:
         dict: Book data dictionary with standardized field names, or None if not found
     """
-    url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
+    deadline = LOOKUP_DEADLINE if deadline is None else deadline
+    results = {}
+    mirrored = mirror_book_fields(isbn)
+    if mirrored:
+        results['openlibrary'] = mirrored
+    futures = {_get_json(provider['url'](isbn)): provider for provider in PROVIDERS
+               if not (mirrored and provider['name'] == 'openlibrary')}
     
-    try:
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            book_key = f"ISBN:{isbn}"
-            
-            if book_key in data and data[book_key]:
-                raw_data = data[book_key]
-                return extract_book_fields(raw_data, isbn)
-                
-    except requests.RequestException as e:
-        print(f"OpenLibrary API request failed: {e}")
-    except json.JSONDecodeError as e:
-        print(f"Failed to decode OpenLibrary response: {e}")
+    done, pending = wait(futures, timeout=deadline)
+    for future in done:
+        results[futures[future]['name']] = _provider_result(futures[future], future, isbn)
+    record = merge_provider_fields(results, isbn)
     
-    return None
+    # Nothing usable yet - keep waiting rather than report "not found" early
+    while record is None and pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[futures[future]['name']] = _provider_result(futures[future], future, isbn)
+        record = merge_provider_fields(results, isbn)
+    
+    return record
+
+def get_openlibrary_book_data(isbn: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve book data using ISBN
+    
+    OpenLibrary and Google Books are queried concurrently and merged; see lookup_book.
+    
+    Args:
+        isbn (str): ISBN-10 or ISBN-13 of the book
+        deadline (float): Seconds to wait for providers; defaults to LOOKUP_DEADLINE
+        
+    Returns:
+        dict: Book data dictionary with standardized field names, or None if not found
+    """
+    return lookup_book(isbn, deadline=deadline)
 
 def extract_book_fields(data: Dict[str, Any], isbn: str) -> Dict[str, Any]:
     """
     Extract and standardize book fields from OpenLibrary response
-    Enhanced with Google Books fallback for missing data
+    Google Books fields are merged in separately by lookup_book
     
     Args:
         data (dict): Raw OpenLibrary book data
-        isbn (str): ISBN for Google Books fallback calls
+        isbn (str): ISBN of the book
         
     Returns:
         dict: Standardized book data matching database schema
     """
-    # Get OpenLibrary thumbnail first
     image_url = extract_cover_url(data)
-    
-    # If no OpenLibrary thumbnail, try Google Books
-    if not image_url:
-        image_url = get_google_books_thumbnail(isbn)
-    
-    # Always get description from Google Books (OpenLibrary doesn't provide descriptions)
-    description = get_google_books_description(isbn)
     length_value = data.get('number_of_pages') or data.get('pagination')
     if length_value:
         try:
@@ -70,13 +232,14 @@ def extract_book_fields(data: Dict[str, Any], isbn: str) -> Dict[str, Any]:
         'title': data.get('title'),
         'subtitle': data.get('subtitle'),
         'author': extract_first_author(data),
+        'authors': extract_authors(data),
         'isbncode': isbn,
         'publisher': extract_first_publisher(data),
         'publisheddate': data.get('publish_date'),
         'length': length_value,  # ← Use the processed int value
         'memo': None,
         'rating': None,
-        'description': description,
+        'description': None,
         'imageurl': image_url,
         'excerpt': extract_first_excerpt(data)
     }
@@ -89,6 +252,15 @@ def extract_first_author(data: Dict[str, Any]) -> Optional[str]:
             return author['name']
     return None
 
+def extract_authors(data: Dict[str, Any]) -> List[str]:
+    """Extract all author names from authors array, in credit order"""
+    names = []
+    if 'authors' in data and isinstance(data['authors'], list):
+        for author in data['authors']:
+            if isinstance(author, dict) and author.get('name'):
+                names.append(author['name'])
+    return names
+
 def extract_first_publisher(data: Dict[str, Any]) -> Optional[str]:
     """Extract first publisher name from publishers array"""
     if 'publishers' in data and isinstance(data['publishers'], list) and len(data['publishers']) > 0:
@@ -121,44 +293,26 @@ def extract_first_excerpt(data: Dict[str, Any]) -> Optional[str]:
 
 def get_google_books_description(isbn: str) -> Optional[str]:
     """Get description from Google Books API by ISBN"""
-    url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
-    
+    import requests
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('totalItems', 0) > 0:
-            book_info = data['items'][0]['volumeInfo']
-            return book_info.get('description')
-        else:
-            return None
-            
+        fields = parse_google_books_response(_get_json(google_books_url(isbn)).result(), isbn)
+        return fields.get('description') if fields else None
     except requests.RequestException as e:
         print(f"Error fetching from Google Books: {e}")
         return None
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, ValueError) as e:
         print(f"Error parsing Google Books response: {e}")
         return None
 
 def get_google_books_thumbnail(isbn: str) -> Optional[str]:
     """Get thumbnail URL from Google Books API by ISBN"""
-    url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
-    
+    import requests
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('totalItems', 0) > 0:
-            book_info = data['items'][0]['volumeInfo']
-            return book_info.get('imageLinks', {}).get('thumbnail')
-        else:
-            return None
-            
+        fields = parse_google_books_response(_get_json(google_books_url(isbn)).result(), isbn)
+        return fields.get('imageurl') if fields else None
     except requests.RequestException as e:
         print(f"Error fetching from Google Books: {e}")
         return None
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, ValueError) as e:
         print(f"Error parsing Google Books response: {e}")
         return None
@@ -0,0 +1,27 @@
+"""
+Process-wide configuration for Personal Library Management System
+Loads .env once per process and reads settings from the environment
+"""
+
+import os
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def load_environment():
+    """Load .env into the environment (first call only; later calls are free)"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def get_setting(name, default=None):
+    """
+    Read a setting from the environment, loading .env first if needed
+
+    Args:
+        name (str): Environment variable name
+        default: Value returned when the variable is unset or empty
+
+    Returns:
+        str: The setting value, or default
+    """
+    load_environment()
+    return os.environ.get(name) or default
@@ -0,0 +1,223 @@
+"""
+Form autocomplete for Personal Library Management System
+Suggests authors and publishers already in the catalog, most used first
+
+Each field's distinct values are kept in a sorted array of case- and
+space-folded keys, so the values starting with a prefix are one bisect
+away; the top-k of a range is picked by use count. Values are counted
+once from the catalog and kept current as books are written - there is
+no database query while typing.
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+import streamlit as st
+from app_config import get_setting
+
+# Titles are left out: they are nearly all unique, so there is little to complete them from
+AUTOCOMPLETE_FIELDS = ['author', 'publisher']
+
+# Suggestions shown under a field for what has been typed
+AUTOCOMPLETE_SUGGESTIONS = int(get_setting('AUTOCOMPLETE_SUGGESTIONS', '6'))
+
+# Top values for prefixes this short span most of the array, so they are cached
+CACHED_PREFIX_LENGTH = 2
+
+def fold(value):
+    """Key a value is matched on: lower case with runs of whitespace collapsed"""
+    return " ".join(value.lower().split()) if isinstance(value, str) else ''
+
+class CompletionIndex:
+    """Distinct values of one field with their use counts, sorted by folded key"""
+
+    def __init__(self, values=()):
+        # Folded key -> {spelling: count}; the most used spelling is the one suggested
+        self.spellings = {}
+        self.totals = {}
+        for value in values:
+            key = fold(value)
+            if key:
+                spellings = self.spellings.setdefault(key, {})
+                spellings[value] = spellings.get(value, 0) + 1
+                self.totals[key] = self.totals.get(key, 0) + 1
+        self.keys = sorted(self.spellings)
+        self._top = {}
+
+    def _changed(self, key):
+        for length in range(min(len(key), CACHED_PREFIX_LENGTH) + 1):
+            self._top.pop(key[:length], None)
+
+    def add(self, value):
+        key = fold(value)
+        if not key:
+            return
+        if key not in self.spellings:
+            insort(self.keys, key)
+            self.spellings[key] = {}
+            self.totals[key] = 0
+        self.spellings[key][value] = self.spellings[key].get(value, 0) + 1
+        self.totals[key] += 1
+        self._changed(key)
+
+    def remove(self, value):
+        key = fold(value)
+        spellings = self.spellings.get(key)
+        if not spellings or value not in spellings:
+            return
+        spellings[value] -= 1
+        if not spellings[value]:
+            del spellings[value]
+        self.totals[key] -= 1
+        if not self.totals[key]:
+            del self.spellings[key], self.totals[key]
+            del self.keys[bisect_left(self.keys, key)]
+        self._changed(key)
+
+    def _top_keys(self, prefix, k):
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff')
+        return heapq.nlargest(k, self.keys[start:end], key=self.totals.__getitem__)
+
+    def suggest(self, prefix, k=10):
+        """
+        The most used values starting with prefix (case-insensitive)
+
+        Returns:
+            list: Values in their most used spelling, most used first
+        """
+        prefix = fold(prefix)
+        if len(prefix) <= CACHED_PREFIX_LENGTH and k <= AUTOCOMPLETE_SUGGESTIONS:
+            if prefix not in self._top:
+                self._top[prefix] = self._top_keys(prefix, AUTOCOMPLETE_SUGGESTIONS)
+            keys = self._top[prefix][:k]
+        else:
+            keys = self._top_keys(prefix, k)
+        return [max(self.spellings[key].items(), key=lambda item: item[1])[0] for key in keys]
+
+def _row_key(book):
+    """A catalog row's ID; rows not in the database yet (journaled adds) go by ISBN"""
+    row_id = book.get('id')
+    if row_id is None or row_id != row_id:
+        return ('isbn', book.get('isbncode'))
+    return int(row_id)
+
+class CatalogCompletions:
+    """Completion indexes for one library's author and publisher values"""
+
+    def __init__(self, books):
+        self.lock = threading.Lock()
+        # Keyed by row: an ISBN can be on the shelf more than once, and each copy counts
+        self.values = {}
+        self.rows_by_isbn = {}
+        for book in books:
+            if book.get('isbncode'):
+                self._add_row(book)
+        self.indexes = {field: CompletionIndex(values[position] for values in self.values.values())
+                        for position, field in enumerate(AUTOCOMPLETE_FIELDS)}
+        # ISBNs written since they were last read into the indexes
+        self.stale = set()
+
+    def _add_row(self, book):
+        key = _row_key(book)
+        self.rows_by_isbn.setdefault(book['isbncode'], set()).add(key)
+        self.values[key] = tuple(book.get(field) for field in AUTOCOMPLETE_FIELDS)
+        return self.values[key]
+
+    def replace(self, isbn, books):
+        """Swap the values of every row with an ISBN for those of its rows as now stored"""
+        for key in self.rows_by_isbn.pop(isbn, ()):
+            for field, value in zip(AUTOCOMPLETE_FIELDS, self.values.pop(key, ())):
+                self.indexes[field].remove(value)
+        for book in books:
+            for field, value in zip(AUTOCOMPLETE_FIELDS, self._add_row(book)):
+                self.indexes[field].add(value)
+
+# One set of indexes per library, built on first use and kept current by book_changed()
+_completions = {}
+_completions_lock = threading.Lock()
+
+def book_changed(library_id, isbn):
+    """Note that a book was written; loaded indexes re-read it before their next use"""
+    completions = _completions.get(library_id)
+    if completions is not None:
+        with completions.lock:
+            completions.stale.add(isbn)
+
+def read_rows(library_id, isbns):
+    """The stored rows (every copy) of some ISBNs, with the fields the indexes use"""
+    from database import get_read_connection_dict
+    conn = get_read_connection_dict(library_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ID, ISBNCode, Author, Publisher FROM MyBooks WHERE LibraryID = %s AND ISBNCode = ANY(%s)",
+                       (library_id, list(isbns)))
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def get_completions(library_id):
+    """A library's completion indexes, built if needed and caught up with books written since"""
+    from database import get_all_books
+    with _completions_lock:
+        completions = _completions.get(library_id)
+        if completions is None:
+            books_df = get_all_books(library_id=library_id)
+            columns = [col for col in ['id', 'isbncode'] + AUTOCOMPLETE_FIELDS if col in books_df.columns]
+            completions = _completions[library_id] = CatalogCompletions(books_df[columns].to_dict('records'))
+    with completions.lock:
+        if completions.stale:
+            stale, completions.stale = completions.stale, set()
+            rows = {}
+            try:
+                for row in read_rows(library_id, stale):
+                    rows.setdefault(row['isbncode'], []).append(row)
+            except Exception:
+                completions.stale |= stale
+                raise
+            for isbn in stale:
+                completions.replace(isbn, rows.get(isbn, []))
+    return completions
+
+def suggest(field, prefix, k=AUTOCOMPLETE_SUGGESTIONS, library_id=None):
+    """
+    The library's most used values of a field starting with what has been typed
+
+    Args:
+        field (str): One of AUTOCOMPLETE_FIELDS
+        prefix (str): The field's current value
+
+    Returns:
+        list: Values, most used first (empty if the indexes can't be loaded)
+    """
+    from database import current_library_id
+    try:
+        completions = get_completions(library_id or current_library_id())
+        with completions.lock:
+            return completions.indexes[field].suggest(prefix or '', k)
+    except Exception as e:
+        print(f"Autocomplete for {field} unavailable: {e}")
+        return []
+
+@st.fragment
+def autocomplete_input(label, field, value, key):
+    """
+    Text field with buttons for the library's most used values starting with what is typed
+
+    Suggestions follow the field's value, which st.form only sends on submit,
+    so call this outside the form; the form's callbacks read the value from
+    st.session_state[key] as usual. Picking a suggestion reruns only this field.
+    """
+    # (Re)start from the book's value when a different book is shown; keep edits otherwise
+    seed_key = f"{key}_seed"
+    if key not in st.session_state or st.session_state.get(seed_key) != value:
+        st.session_state[key] = value or ''
+        st.session_state[seed_key] = value
+    typed = st.text_input(label, key=key, help="Press Enter to see matching names from your library")
+    matches = [match for match in suggest(field, typed) if fold(match) != fold(typed)]
+    if matches:
+        cols = st.columns(len(matches))
+        for position, (col, match) in enumerate(zip(cols, matches)):
+            with col:
+                st.button(match, key=f"{key}_suggestion_{position}", use_container_width=True,
+                          on_click=st.session_state.__setitem__, args=(key, match))
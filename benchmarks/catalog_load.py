@@ -0,0 +1,75 @@
+"""
+Catalog load benchmark: pd.read_sql_query vs COPY into Arrow vs the on-disk store
+Compares wall time and peak memory of the get_all_books load paths
+
+Each measurement runs in a fresh interpreter so peak RSS is not shared
+between loaders. Point NEON_CONNECTION_STRING at a (seeded) local database
+(with migrations applied, for the store).
+
+Usage:
+    python benchmarks/catalog_load.py [--runs 5]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOADERS = ["pandas", "arrow", "store"]
+
+# Runs inside the child interpreter; prints one JSON line
+CHILD_SCRIPT = """
+import json, resource, time
+import pandas, pyarrow, psycopg2
+from database import get_all_books
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+df = get_all_books(loader={loader!r})
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": elapsed,
+    "peak_mb": (peak_kb - baseline_kb) / 1024,
+    "frame_mb": df.memory_usage(deep=True).sum() / 2**20,
+    "rows": len(df),
+}}))
+"""
+
+def measure(loader):
+    """Load the catalog once with the given loader in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(loader=loader)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare catalog load paths")
+    parser.add_argument("--runs", type=int, default=5, help="loads per loader")
+    args = parser.parse_args()
+
+    summary = {}
+    print(f"{'loader':<8}{'rows':>8}{'median ms':>11}{'peak MB':>9}{'frame MB':>10}")
+    for loader in LOADERS:
+        if loader == "store":
+            # The first load writes the store file; measure warm starts from it
+            measure(loader)
+        runs = [measure(loader) for _ in range(args.runs)]
+        summary[loader] = {
+            "ms": statistics.median(r["seconds"] for r in runs) * 1000,
+            "peak": statistics.median(r["peak_mb"] for r in runs),
+        }
+        print(f"{loader:<8}{runs[0]['rows']:>8}{summary[loader]['ms']:>11.0f}"
+              f"{summary[loader]['peak']:>9.1f}{runs[0]['frame_mb']:>10.1f}")
+
+    speedup = summary["pandas"]["ms"] / max(summary["arrow"]["ms"], 1e-9)
+    saved = summary["pandas"]["peak"] - summary["arrow"]["peak"]
+    print(f"\narrow is {speedup:.1f}x faster and peaks {saved:.1f} MB lower")
+    print(f"a warm start from the store takes {summary['store']['ms']:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Multi-session load test for the library app
+Drives the pages headlessly with Streamlit's AppTest as N concurrent users
+
+Each simulated user runs in its own process (AppTest keeps global runtime
+state, so sessions cannot share a process) and loops through a family
+or guest session: open the library, search, change page, view a book
+and open the edit page. Every rerun is timed. Meanwhile the parent
+samples pg_stat_activity for the number of open database connections.
+
+Usage:
+    python benchmarks/seed.py --dsn postgresql://localhost/library_bench --books 50000
+    python benchmarks/load_test.py --dsn postgresql://localhost/library_bench --users 8 --duration 60
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import threading
+import statistics
+from multiprocessing import Pool
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+SEARCH_TERMS = ["shadow", "river", "tolkien", "garden", "hobit", "winter", "quinn"]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+def timed(samples, action, run):
+    """Run one rerun and record its latency under action"""
+    start = time.perf_counter()
+    try:
+        run()
+        samples.append((action, time.perf_counter() - start, None))
+    except Exception as e:
+        samples.append((action, time.perf_counter() - start, repr(e)))
+
+def user_session(args):
+    """One simulated user; returns [(action, seconds, error)] and connections opened"""
+    user_id, dsn, duration, isbns = args
+    os.chdir(ROOT_DIR)
+    os.environ['NEON_CONNECTION_STRING'] = dsn
+
+    # Count connections this user's reruns open
+    import psycopg2
+    opened = [0]
+    real_connect = psycopg2.connect
+
+    def counting_connect(*a, **kw):
+        opened[0] += 1
+        return real_connect(*a, **kw)
+    psycopg2.connect = counting_connect
+
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(user_id)
+    samples = []
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        library = AppTest.from_file("myLibrary.py", default_timeout=60)
+        timed(samples, "library", library.run)
+
+        timed(samples, "search", lambda: library.text_input[0].input(rng.choice(SEARCH_TERMS)).run())
+        timed(samples, "clear_search", lambda: library.text_input[0].input("").run())
+
+        for _ in range(rng.randint(1, 3)):
+            pagers = [button for button in library.button if button.label == "Next ▶" and not button.disabled]
+            if not pagers:
+                break
+            timed(samples, "paginate", lambda: pagers[0].click().run())
+
+        isbn = rng.choice(isbns)
+        viewer = AppTest.from_file("pages/view_book.py", default_timeout=60)
+        viewer.session_state['edit_isbn'] = isbn
+        timed(samples, "view", viewer.run)
+
+        editor = AppTest.from_file("pages/edit_book.py", default_timeout=60)
+        editor.session_state['edit_isbn'] = isbn
+        timed(samples, "edit_open", editor.run)
+        timed(samples, "edit_rerun", editor.run)
+
+    return samples, opened[0]
+
+def sample_connections(dsn, stop, peaks):
+    """Poll pg_stat_activity until stop is set, keeping the peak client count"""
+    import psycopg2
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    while not stop.is_set():
+        cursor.execute("""
+            SELECT COUNT(*) FROM pg_stat_activity
+            WHERE datname = current_database() AND pid <> pg_backend_pid()
+        """)
+        peaks.append(cursor.fetchone()[0])
+        time.sleep(0.05)
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test")
+    parser.add_argument("--dsn", required=True, help="seeded local database (see benchmarks/seed.py)")
+    parser.add_argument("--users", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds each user keeps going")
+    args = parser.parse_args()
+
+    import psycopg2
+    conn = psycopg2.connect(args.dsn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT ISBNCode FROM MyBooks ORDER BY random() LIMIT 500")
+    isbns = [row[0] for row in cursor.fetchall()]
+    conn.close()
+
+    stop = threading.Event()
+    connection_counts = []
+    sampler = threading.Thread(target=sample_connections, args=(args.dsn, stop, connection_counts), daemon=True)
+    sampler.start()
+
+    started = time.perf_counter()
+    with Pool(args.users) as pool:
+        results = pool.map(user_session, [(i, args.dsn, args.duration, isbns) for i in range(args.users)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+
+    samples = [sample for user_samples, _ in results for sample in user_samples]
+    opened = sum(count for _, count in results)
+    errors = [s for s in samples if s[2]]
+
+    print(f"{args.users} users for {args.duration:.0f}s: {len(samples)} reruns "
+          f"({len(samples) / elapsed:.1f}/s), {len(errors)} errors")
+    print(f"\n{'action':<14}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    actions = sorted({s[0] for s in samples})
+    for action in actions + ["all"]:
+        latencies = [s[1] * 1000 for s in samples if action in ("all", s[0])]
+        print(f"{action:<14}{len(latencies):>7}{percentile(latencies, 50):>9.0f}"
+              f"{percentile(latencies, 95):>9.0f}{percentile(latencies, 99):>9.0f}")
+
+    print(f"\nDatabase connections: {opened} opened "
+          f"({opened / max(len(samples), 1):.2f} per rerun), "
+          f"peak {max(connection_counts, default=0)} open at once, "
+          f"median {statistics.median(connection_counts) if connection_counts else 0:.0f}")
+    if errors:
+        print(f"\nFirst error ({errors[0][0]}): {errors[0][2]}")
+
+if __name__ == "__main__":
+    main()
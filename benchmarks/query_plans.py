@@ -0,0 +1,261 @@
+"""
+Query plan regression check for the library's SQL
+Runs every statement the app issues through EXPLAIN (ANALYZE, BUFFERS)
+
+Drives the database, catalog store, cover check and autocomplete
+functions against a seeded local database and
+records each statement they send (including the query inside the
+catalog COPY). Every statement is then explained in a transaction that
+is rolled back, and its plan is checked against the budgets in CHECKS:
+no sequential scan on a book table unless the step is allowed one, and
+caps on buffers touched and execution time. Exits non-zero on any
+violation, so it can gate changes to the SQL.
+
+Usage:
+    python benchmarks/seed.py --dsn postgresql://localhost/library_bench --books 50000
+    python benchmarks/query_plans.py --dsn postgresql://localhost/library_bench
+"""
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+# Tables that grow with the catalog; a sequential scan on these is a regression
+BOOK_TABLES = {"mybooks", "bookauthors", "authors", "coverstatus", "bookdeletions"}
+
+# Budgets per step: buffers are shared blocks hit + read (8 kB each)
+DEFAULT_BUDGET = {'max_buffers': 500, 'max_ms': 50.0, 'seq_scan_ok': set()}
+CHECKS = {
+    # Whole-catalog read for search and "All": scanning is the point
+    "catalog": {'max_buffers': None, 'max_ms': 2000.0, 'seq_scan_ok': {"mybooks"}},
+    "count": {'max_buffers': None, 'max_ms': 200.0, 'seq_scan_ok': {"mybooks"}},
+    # Counting the rows before a book reads a range of the sort index
+    "position": {'max_buffers': 5000, 'max_ms': 200.0, 'seq_scan_ok': set()},
+    # Building the catalog store and the autocomplete indexes reads the whole catalog once
+    "catalog store full": {'max_buffers': None, 'max_ms': 2000.0, 'seq_scan_ok': {"mybooks"}},
+    "autocomplete build": {'max_buffers': None, 'max_ms': 2000.0, 'seq_scan_ok': {"mybooks"}},
+    # The background cover check walks every book with a cover
+    "covers due": {'max_buffers': None, 'max_ms': 500.0, 'seq_scan_ok': {"mybooks", "coverstatus"}},
+    "shared images": {'max_buffers': None, 'max_ms': 500.0, 'seq_scan_ok': {"coverstatus"}},
+}
+
+_recorded = []
+
+@contextmanager
+def recording():
+    """Collect the SQL statements sent while the block runs"""
+    start = len(_recorded)
+    statements = []
+    yield statements
+    statements.extend(_recorded[start:])
+
+def install_recorder():
+    """Make every psycopg2 connection record the statements its cursors run"""
+    import psycopg2
+    import psycopg2.extensions
+
+    class RecordingCursorMixin:
+        def execute(self, query, vars=None):
+            _recorded.append(self.mogrify(query, vars).decode())
+            return super().execute(query, vars)
+
+        def copy_expert(self, sql, file, size=8192):
+            _recorded.append(sql)
+            return super().copy_expert(sql, file, size)
+
+    recording_classes = {}
+
+    def recording_cursor(base):
+        if base not in recording_classes:
+            recording_classes[base] = type(f"Recording{base.__name__}", (RecordingCursorMixin, base), {})
+        return recording_classes[base]
+
+    real_connect = psycopg2.connect
+
+    def connect(*args, cursor_factory=None, **kwargs):
+        base = cursor_factory or psycopg2.extensions.cursor
+        return real_connect(*args, cursor_factory=recording_cursor(base), **kwargs)
+    psycopg2.connect = connect
+
+def explainable(statement):
+    """The statement to EXPLAIN, or None for ones that can't be (COPY unwraps to its query)"""
+    statement = statement.strip().rstrip(';')
+    copy = re.match(r"(?is)^COPY\s*\((.*)\)\s*TO\s+STDOUT", statement)
+    if copy:
+        return copy.group(1)
+    if re.match(r"(?i)^(SELECT|WITH|INSERT|UPDATE|DELETE)\b", statement):
+        return statement
+    return None
+
+def plan_nodes(node):
+    """Yield every node of a JSON plan tree"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+def check_plan(conn, statement, budget):
+    """
+    EXPLAIN ANALYZE one statement (rolled back) and compare it with its budget
+
+    Returns:
+        tuple: (ms, buffers, scan summary, list of violations)
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement)
+        result = cursor.fetchone()[0][0]
+    finally:
+        conn.rollback()
+
+    plan = result['Plan']
+    ms = result['Execution Time']
+    buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+    scans = []
+    violations = []
+    for node in plan_nodes(plan):
+        relation = (node.get('Relation Name') or '').lower()
+        if not relation:
+            continue
+        scans.append(f"{node['Node Type']} {relation}" + (f" ({node['Index Name']})" if node.get('Index Name') else ""))
+        if node['Node Type'] == 'Seq Scan' and relation in BOOK_TABLES and relation not in budget['seq_scan_ok']:
+            violations.append(f"sequential scan on {relation}")
+    if budget['max_buffers'] is not None and buffers > budget['max_buffers']:
+        violations.append(f"{buffers} buffers > {budget['max_buffers']}")
+    if ms > budget['max_ms']:
+        violations.append(f"{ms:.1f} ms > {budget['max_ms']:.0f} ms")
+    return ms, buffers, scans, violations
+
+def run_workload(sample_isbn, deep_isbn):
+    """
+    Call every database function the app uses
+
+    Returns:
+        list: (step name, recorded statements) in call order
+    """
+    import database
+    import autocomplete
+    import catalog_store
+    import cover_health
+
+    library_id = database.current_library_id()
+    steps = []
+
+    def step(name, call):
+        with recording() as statements:
+            call()
+        steps.append((name, statements))
+
+    step("catalog", lambda: database.get_all_books())
+    step("count", database.count_books)
+    for sort in database.SORT_ORDERS:
+        page = database.get_books_keyset(sort, limit=51)
+        step(f"keyset {sort} first", lambda: database.get_books_keyset(sort, limit=51))
+        if not page.empty:
+            key = database.sort_key(page.iloc[-1], sort)
+            step(f"keyset {sort} next", lambda: database.get_books_keyset(sort, after=key, limit=51))
+            step(f"keyset {sort} previous", lambda: database.get_books_keyset(sort, before=key, limit=51))
+        step(f"keyset {sort} jump", lambda: database.get_books_keyset(sort, start_at=deep_isbn, limit=51))
+        step("position", lambda: database.get_book_position(deep_isbn, sort))
+
+    step("book by isbn", lambda: database.fetch_book_by_isbn(sample_isbn))
+    book = database.fetch_book_by_isbn(sample_isbn)
+    step("book revalidation", lambda: database.book_is_current(sample_isbn, book['lastmodified']))
+    step("book authors", lambda: database.get_book_authors(sample_isbn))
+    step("duplicate check", lambda: database.find_possible_duplicates(book))
+    authors = database.search_authors(book['author'][:4])
+    step("author search", lambda: database.search_authors(book['author'][:4]))
+    if authors:
+        first_page = database.get_books_by_author(authors[0]['authorid'], limit=25)
+        step("author books", lambda: database.get_books_by_author(authors[0]['authorid'], limit=25))
+        if first_page:
+            after = (first_page[-1]['sorttitle'], first_page[-1]['isbncode'])
+            step("author books next", lambda: database.get_books_by_author(authors[0]['authorid'], after=after))
+    step("delete pin", database.get_delete_pin)
+    step("bad covers", database.get_bad_covers)
+    database.get_libraries.clear()
+    step("libraries", database.get_libraries)
+    step("autocomplete build", lambda: autocomplete.get_completions(library_id))
+    store = {}
+    step("catalog store full", lambda: store.update(zip(('watermark', 'table'),
+                                                        catalog_store.refresh_library(library_id, full=True))))
+
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        step("covers due", lambda: cover_health.covers_due(cursor, library_id))
+        step("shared images", lambda: cover_health.mark_shared_images(cursor, library_id))
+    finally:
+        conn.rollback()
+        conn.close()
+
+    # Writes run for real against the disposable database
+    new_book = dict(book, isbncode="9799999999990", title=f"{book['title']} (plan check)")
+    step("add book", lambda: database.add_book_to_database(new_book))
+    step("add books", lambda: database.add_books_to_database([new_book, dict(new_book, isbncode="9799999999983")]))
+    step("update book", lambda: database.update_book_fields(new_book['isbncode'], {'memo': "plan check"}))
+    step("update title and author",
+         lambda: database.update_book_fields(new_book['isbncode'], {'title': "Plan Check", 'author': "Plan Checker"}))
+    isbns = [new_book['isbncode'], "9799999999983"]
+    step("books by isbns", lambda: database.get_books_by_isbns(isbns))
+    versions = {added['isbncode']: added['rowversion'] for added in database.get_books_by_isbns(isbns)}
+    step("batch edit", lambda: database.update_books_batch(
+        [(isbn, versions.get(isbn), {'title': "Plan Check Batch", 'rating': 4.0}) for isbn in isbns]))
+    step("merge duplicates", lambda: database.merge_duplicate_books(isbns[0], isbns[1:]))
+    step("autocomplete refresh", lambda: autocomplete.get_completions(library_id))
+    step("delete book", lambda: database.delete_book_from_database(new_book['isbncode']))
+    # Reads the rows and tombstones written since the full build
+    step("catalog store changes", lambda: catalog_store.refresh_library(library_id, store['table'], store['watermark']))
+    return steps
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query plans against index and budget rules")
+    parser.add_argument("--dsn", required=True, help="seeded local database (see benchmarks/seed.py)")
+    args = parser.parse_args()
+
+    os.environ['NEON_CONNECTION_STRING'] = args.dsn
+    # Writes must reach the database, not a local journal (empty values also win over .env)
+    os.environ['WRITE_JOURNAL_PATH'] = ''
+    os.environ['SNAPSHOT_DIR'] = ''
+    os.environ['CATALOG_STORE_DIR'] = tempfile.mkdtemp(prefix="plan-check-store-")
+    install_recorder()
+
+    import psycopg2
+    conn = psycopg2.connect(args.dsn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT ISBNCode FROM MyBooks ORDER BY ID LIMIT 1")
+    sample_isbn = cursor.fetchone()[0]
+    cursor.execute("SELECT ISBNCode FROM MyBooks ORDER BY ID OFFSET (SELECT COUNT(*) * 3 / 4 FROM MyBooks) LIMIT 1")
+    deep_isbn = cursor.fetchone()[0]
+    conn.rollback()
+
+    steps = run_workload(sample_isbn, deep_isbn)
+
+    failures = 0
+    print(f"{'step':<30}{'ms':>8}{'buffers':>9}  plan")
+    for name, statements in steps:
+        budget = CHECKS.get(name, DEFAULT_BUDGET)
+        for statement in statements:
+            sql = explainable(statement)
+            if sql is None:
+                continue
+            ms, buffers, scans, violations = check_plan(conn, sql, budget)
+            flag = "FAIL " if violations else ""
+            print(f"{name:<30}{ms:>8.1f}{buffers:>9}  {flag}{'; '.join(scans) or '-'}")
+            for violation in violations:
+                print(f"{'':<48}{violation}")
+                print(f"{'':<48}{' '.join(sql.split())[:160]}")
+            failures += bool(violations)
+    conn.close()
+
+    print(f"\n{failures} statement{'s' if failures != 1 else ''} over budget" if failures else "\nAll plans within budget")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Seed a local Postgres database with a synthetic library
+Used by the benchmarks; never point it at the production database
+
+Creates the schema with migrations.py, bulk-loads generated books with
+COPY and sets the Settings PIN.
+
+Usage:
+    python benchmarks/seed.py --dsn postgresql://localhost/library_bench --books 50000
+"""
+
+import io
+import os
+import csv
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+BENCH_PIN = "1234"
+
+TITLE_WORDS = [
+    "Shadow", "River", "Garden", "Winter", "Silent", "Empire", "Journey", "Secret", "Glass", "Iron",
+    "Night", "Ocean", "Forgotten", "Golden", "Last", "Hidden", "Storm", "Kingdom", "Fire", "Stone",
+    "Letters", "Memory", "House", "Light", "Island", "Mountain", "Crown", "Wolf", "Star", "Harbor",
+]
+FIRST_NAMES = ["Ada", "James", "Mary", "Leo", "Ruth", "Omar", "Ines", "Kenji", "Nora", "Felix",
+               "Priya", "Tomas", "Grace", "Ivan", "Lena", "Samuel", "Aiko", "Hugo", "Zara", "Milo"]
+LAST_NAMES = ["Tolkien", "Austin", "Okafor", "Lindqvist", "Moreau", "Tanaka", "Castillo", "Hughes",
+              "Novak", "Brennan", "Sato", "Fischer", "Adeyemi", "Rossi", "Kowalski", "Haddad",
+              "Whitfield", "Larsen", "Mendes", "Quinn"]
+PUBLISHERS = ["Penguin", "HarperCollins", "Vintage", "Tor Books", "Orbit", "Faber & Faber",
+              "Random House", "Bloomsbury", "Del Rey", "Scribner"]
+
+def isbn13(n):
+    """Valid ISBN-13 built from a sequence number"""
+    body = f"978{n:09d}"
+    check = (10 - sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(body)) % 10) % 10
+    return body + str(check)
+
+def synthetic_books(count, seed=42):
+    """Yield rows in INSERT_BOOK_SQL column order (WorkKey is backfilled after the load)"""
+    rng = random.Random(seed)
+    authors = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    start = datetime(2020, 1, 1)
+    for n in range(count):
+        title = "The " + " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+        added = start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4))
+        yield (
+            title,
+            rng.choice([None, "A Novel", "Stories", "Book One"]),
+            rng.choice(authors),
+            isbn13(n),
+            rng.choice(PUBLISHERS),
+            str(rng.randint(1950, 2024)),
+            rng.randint(90, 900),
+            None,
+            rng.choice([None, 1.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0]),
+            " ".join(rng.choices(TITLE_WORDS, k=40)).lower(),
+            f"https://covers.openlibrary.org/b/isbn/{isbn13(n)}-M.jpg",
+            None,
+            added,
+            added + timedelta(days=rng.randint(0, 30)),
+        )
+
+def seed_database(dsn, book_count, reset=True):
+    """
+    Create the schema and load book_count synthetic books
+
+    Args:
+        dsn (str): Connection string of a disposable database
+        book_count (int): Number of books to generate
+        reset (bool): Empty the book tables first
+    """
+    os.environ['NEON_CONNECTION_STRING'] = dsn
+    from migrations import run_migrations, backfill_book_authors, backfill_work_keys
+    from database import get_db_connection
+
+    run_migrations()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if reset:
+            cursor.execute("TRUNCATE BookAuthors, Authors, MyBooks RESTART IDENTITY")
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in synthetic_books(book_count):
+            writer.writerow(["" if value is None else value for value in row])
+        buffer.seek(0)
+        cursor.copy_expert("""
+            COPY MyBooks (Title, Subtitle, Author, ISBNCode, Publisher, PublishedDate,
+                          Length, Memo, Rating, Description, ImageURL, Excerpt,
+                          DateAdded, LastModified)
+            FROM STDIN WITH (FORMAT csv)
+        """, buffer)
+
+        backfill_book_authors(cursor)
+        backfill_work_keys(cursor)
+        cursor.execute("""
+            INSERT INTO Settings (ID, PIN) VALUES (1, %s)
+            ON CONFLICT (ID) DO UPDATE SET PIN = EXCLUDED.PIN
+        """, (BENCH_PIN,))
+        conn.commit()
+        cursor.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a disposable database with synthetic books")
+    parser.add_argument("--dsn", required=True, help="connection string of the local benchmark database")
+    parser.add_argument("--books", type=int, default=50000, help="number of books")
+    args = parser.parse_args()
+    seed_database(args.dsn, args.books)
+    print(f"Seeded {args.books} books (PIN {BENCH_PIN})")
@@ -0,0 +1,76 @@
+"""
+Cold-start benchmark for the Streamlit pages
+Measures time-to-first-render of each page in a fresh interpreter
+
+Each page is run headlessly with Streamlit's AppTest in its own
+subprocess, so module imports are paid exactly as on a cold start.
+The report also lists which heavy modules each page pulled in.
+
+Usage:
+    python benchmarks/startup.py [--runs 5]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = [
+    "myLibrary.py",
+    "pages/add_book.py",
+    "pages/edit_book.py",
+    "pages/view_book.py",
+    "pages/browse_author.py",
+    "pages/scan_books.py",
+    "pages/find_duplicates.py",
+    "pages/batch_edit.py",
+]
+
+HEAVY_MODULES = ["pandas", "numpy", "psycopg2", "requests", "dotenv"]
+
+# Runs inside the child interpreter; prints one JSON line
+CHILD_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file({page!r}, default_timeout=60)
+at.run()
+rendered = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import": imported - start,
+    "first_render": rendered - imported,
+    "total": rendered - start,
+    "exception": bool(at.exception),
+    "modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+def measure_page(page):
+    """Run one page in a fresh interpreter and return its timings"""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(page=page, heavy=HEAVY_MODULES)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time-to-first-render per page")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per page")
+    args = parser.parse_args()
+
+    print(f"{'page':<26}{'first render ms':>16}{'total ms':>10}  heavy modules loaded")
+    for page in PAGES:
+        runs = [measure_page(page) for _ in range(args.runs)]
+        first_render = statistics.median(r["first_render"] for r in runs) * 1000
+        total = statistics.median(r["total"] for r in runs) * 1000
+        modules = ", ".join(runs[-1]["modules"]) or "-"
+        flag = "  (raised)" if runs[-1]["exception"] else ""
+        print(f"{page:<26}{first_render:>16.0f}{total:>10.0f}  {modules}{flag}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Record cache for Personal Library Management System
+Size-bounded, thread-safe LRU cache shared by all sessions in the process
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+class BookCache:
+    """
+    LRU cache of book records keyed by ISBN
+
+    Each entry remembers when it was last confirmed against the database
+    so callers can decide when a cheap revalidation is due.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up a record, marking it most recently used
+
+        Returns:
+            tuple: (record copy, seconds since last validated), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            record, validated_at = entry
+            return dict(record), time.monotonic() - validated_at
+
+    def put(self, key, record):
+        """Store (or re-validate) a record, evicting the least recently used beyond maxsize"""
+        with self._lock:
+            self._entries[key] = (dict(record), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop a record after it was written"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
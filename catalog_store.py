@@ -0,0 +1,278 @@
+"""
+On-disk catalog store for Personal Library Management System
+Keeps each library's catalog in a memory-mapped Arrow file shared by every app process
+
+With CATALOG_LOADER=store, get_all_books reads the catalog from
+<CATALOG_STORE_DIR>/library-<id>-<watermark>.arrow instead of the database.
+The file is an uncompressed Arrow IPC file, so opening it maps it into
+memory without parsing or copying: a restarted process renders its first
+page straight from disk, and processes on one host share the file's pages
+in the OS cache instead of each holding a copy of the catalog.
+
+The watermark is the library's highest ChangeSeq (migration 0007), which
+every insert, update and delete advances. A refresh reads only the rows
+and deletion tombstones past the watermark, merges them into the table and
+writes the file for the new watermark; older files are removed once
+replaced. Tombstones no file on disk predates are deleted after a full read.
+
+Usage:
+    python catalog_store.py [--library ID] [--full]
+"""
+
+import os
+import re
+import time
+import argparse
+import threading
+from app_config import get_setting
+
+CATALOG_STORE_DIR = get_setting('CATALOG_STORE_DIR', 'catalog_store')
+
+# Seconds between checks for writes made by other processes
+CATALOG_STORE_CHECK_SECONDS = float(get_setting('CATALOG_STORE_CHECK_SECONDS', '10'))
+
+CHANGED_BOOKS_QUERY = "SELECT * FROM MyBooks WHERE LibraryID = %s AND ChangeSeq > %s ORDER BY ChangeSeq"
+
+_FILE_RE = re.compile(r"library-(\d+)-(\d+)\.arrow$")
+
+def store_files(library_id, store_dir=None):
+    """
+    A library's snapshot files
+
+    Returns:
+        list: (watermark, path) pairs, newest first
+    """
+    store_dir = store_dir or CATALOG_STORE_DIR
+    try:
+        names = os.listdir(store_dir)
+    except FileNotFoundError:
+        return []
+    files = []
+    for name in names:
+        match = _FILE_RE.match(name)
+        if match and int(match.group(1)) == library_id:
+            files.append((int(match.group(2)), os.path.join(store_dir, name)))
+    return sorted(files, reverse=True)
+
+def open_snapshot(path):
+    """Map a snapshot file; the table's buffers point into the mapping and stay valid after the file is replaced"""
+    import pyarrow as pa
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+def write_snapshot(table, library_id, watermark, store_dir=None):
+    """
+    Write a library's table as the file for a watermark and remove older ones
+
+    Returns:
+        str: Path of the new file
+    """
+    import pyarrow as pa
+    store_dir = store_dir or CATALOG_STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, f"library-{library_id}-{watermark}.arrow")
+    # Readers only ever see complete files
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(temp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+    for older_watermark, older_path in store_files(library_id, store_dir):
+        if older_watermark < watermark:
+            try:
+                os.remove(older_path)
+            except OSError:
+                # Still mapped by a process on Windows; removed by a later refresh
+                pass
+    return path
+
+def read_watermark(cursor, library_id):
+    """The library's highest ChangeSeq over its books and deletions (0 when it has neither)"""
+    cursor.execute("""
+        SELECT coalesce(greatest((SELECT max(ChangeSeq) FROM MyBooks WHERE LibraryID = %s),
+                                 (SELECT max(ChangeSeq) FROM BookDeletions WHERE LibraryID = %s)), 0)
+    """, (library_id, library_id))
+    return cursor.fetchone()[0]
+
+def apply_changes(conn, library_id, table, watermark):
+    """
+    Merge the books written and deleted since a watermark into a table
+
+    Raises:
+        ValueError: The changes don't fit the table's columns (e.g. after a
+            migration, or a column that was all NULL at the last full read)
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from database import read_books_table
+    try:
+        changed = read_books_table(conn, CHANGED_BOOKS_QUERY, (library_id, watermark),
+                                   column_types=dict(zip(table.schema.names, table.schema.types)))
+    except pa.ArrowException as e:
+        raise ValueError(str(e)) from e
+    if changed.schema.names != table.schema.names:
+        raise ValueError("Catalog columns changed")
+    cursor = conn.cursor()
+    cursor.execute("SELECT ID FROM BookDeletions WHERE LibraryID = %s AND ChangeSeq > %s", (library_id, watermark))
+    replaced = pa.array(changed.column('id').to_pylist() + [row[0] for row in cursor.fetchall()],
+                        type=table.schema.field('id').type)
+    kept = table.filter(pc.invert(pc.is_in(table.column('id'), value_set=replaced)))
+    # Keep the catalog query's order: lower-cased titles in byte order (its COLLATE "C"), missing as ''
+    merged = pa.concat_tables([kept, changed.cast(table.schema)])
+    order = pa.table({'sort_title': pc.utf8_lower(pc.fill_null(merged.column('title'), '')),
+                      'isbncode': merged.column('isbncode')})
+    return merged.take(pc.sort_indices(order, sort_keys=[('sort_title', 'ascending'), ('isbncode', 'ascending')]))
+
+def prune_deletions(library_id):
+    """
+    Delete the library's tombstones that no snapshot on disk still needs
+
+    Processes move to the newest file before applying changes, so deletions
+    at or below the oldest file's watermark are never read again.
+
+    Returns:
+        int: Tombstones deleted
+    """
+    from database import get_db_connection
+    files = store_files(library_id)
+    if not files:
+        return 0
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM BookDeletions WHERE LibraryID = %s AND ChangeSeq <= %s",
+                       (library_id, min(watermark for watermark, _ in files)))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def refresh_library(library_id, table=None, watermark=0, full=False):
+    """
+    Bring a library's snapshot up to date with the database
+
+    Starts from the newest file on disk when another process has already
+    written past the given table, and reads everything when there is no
+    table yet, full is set or the changes don't fit.
+
+    Args:
+        library_id (int): Library to refresh
+        table (pyarrow.Table): The caller's current table, or None
+        watermark (int): The current table's watermark
+        full (bool): Re-read the whole catalog
+
+    Returns:
+        tuple: (watermark, table mapped from the store)
+    """
+    from database import get_read_connection, read_books_table, CATALOG_QUERY
+    files = store_files(library_id)
+    if files and not full and (table is None or files[0][0] > watermark):
+        watermark, table = files[0][0], open_snapshot(files[0][1])
+
+    conn = get_read_connection(library_id)
+    try:
+        # The watermark and the rows must come from the same snapshot of the database
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cursor = conn.cursor()
+        latest = read_watermark(cursor, library_id)
+        if table is not None and not full:
+            if latest <= watermark:
+                # Nothing new (or a lagging replica)
+                return watermark, table
+            try:
+                table = apply_changes(conn, library_id, table, watermark)
+            except ValueError as e:
+                print(f"Catalog store for library {library_id} needs a full read: {e}")
+                table = None
+        if table is None or full:
+            table = read_books_table(conn, CATALOG_QUERY, (library_id,))
+            full = True
+    finally:
+        conn.close()
+    table = open_snapshot(write_snapshot(table, library_id, latest))
+    if full:
+        try:
+            prune_deletions(library_id)
+        except Exception as e:
+            print(f"Could not prune deletions for library {library_id}: {e}")
+    return latest, table
+
+class StoredCatalog:
+    """One library's mapped table in this process, and when it was last checked against the database"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.table = None
+        self.watermark = 0
+        self.checked = 0.0
+        # Written by this process since the last refresh
+        self.dirty = False
+        self.checking = False
+
+    def refresh(self, library_id):
+        with self.lock:
+            # Cleared first, so a write during the refresh triggers another
+            self.dirty = False
+            self.watermark, self.table = refresh_library(library_id, self.table, self.watermark)
+            self.checked = time.monotonic()
+
+    def refresh_in_background(self, library_id):
+        def run():
+            try:
+                self.refresh(library_id)
+            except Exception as e:
+                print(f"Catalog store refresh failed: {e}")
+            finally:
+                self.checking = False
+        threading.Thread(target=run, name=f"catalog-store-{library_id}", daemon=True).start()
+
+# One mapped table per library, opened on first use
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def book_changed(library_id):
+    """Note that a library was written; its next read in this process refreshes first"""
+    catalog = _catalogs.get(library_id)
+    if catalog is not None:
+        catalog.dirty = True
+
+def catalog_table(library_id):
+    """
+    A library's catalog as an Arrow table mapped from the store
+
+    The first read in a process maps the newest file on disk without
+    touching the database; writes by other processes are picked up by a
+    background check at most every CATALOG_STORE_CHECK_SECONDS. After a
+    write in this process, the next read refreshes before it returns.
+    Only a library with no file yet is read from the database in full.
+
+    Returns:
+        pyarrow.Table: The catalog, ordered by title
+    """
+    with _catalogs_lock:
+        catalog = _catalogs.setdefault(library_id, StoredCatalog())
+    if catalog.table is None:
+        with catalog.lock:
+            files = store_files(library_id)
+            if catalog.table is None and files:
+                catalog.watermark, catalog.table = files[0][0], open_snapshot(files[0][1])
+    if catalog.table is None or catalog.dirty:
+        catalog.refresh(library_id)
+        return catalog.table
+    with _catalogs_lock:
+        check = not catalog.checking and time.monotonic() - catalog.checked >= CATALOG_STORE_CHECK_SECONDS
+        if check:
+            catalog.checking = True
+    if check:
+        catalog.refresh_in_background(library_id)
+    return catalog.table
+
+if __name__ == "__main__":
+    from database import DEFAULT_LIBRARY_ID
+    parser = argparse.ArgumentParser(description="Build or refresh the on-disk catalog store")
+    parser.add_argument('--library', type=int, default=DEFAULT_LIBRARY_ID, help="LibraryID to store")
+    parser.add_argument('--full', action='store_true', help="re-read the whole catalog")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    watermark, table = refresh_library(args.library, full=args.full)
+    elapsed = time.perf_counter() - started
+    print(f"{table.num_rows} books at watermark {watermark} ({table.nbytes / 2**20:.1f} MB) in {elapsed:.2f}s")
@@ -0,0 +1,239 @@
+"""
+Cover URL health checker for Personal Library Management System
+Checks stored ImageURLs in the background and records which ones are dead or placeholders
+
+Each cover URL is fetched with a ranged GET of its first bytes (enough to
+hash small placeholder images whole), several at a time but rate limited
+per host. The result is stored in CoverStatus with a content hash, so the
+card grid can skip known-bad covers without a network attempt. A cover is
+a placeholder when it is tiny, when its hash is in
+COVER_PLACEHOLDER_HASHES, or when the same image is served for several
+different books (real covers aren't shared between ISBNs).
+
+Usage:
+    python cover_health.py [--library ID] [--recheck]
+"""
+
+import time
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from app_config import get_setting
+from database import get_db_connection
+
+# Cover check results
+COVER_OK = 'ok'
+COVER_MISSING = 'missing'
+COVER_PLACEHOLDER = 'placeholder'
+COVER_ERROR = 'error'
+
+# Statuses the card grid treats as "no cover" without trying the URL
+BAD_COVER_STATUSES = (COVER_MISSING, COVER_PLACEHOLDER)
+
+COVER_CHECK_WORKERS = int(get_setting('COVER_CHECK_WORKERS', '8'))
+# Requests per second to any one host
+COVER_CHECK_RATE = float(get_setting('COVER_CHECK_RATE', '5'))
+COVER_CHECK_BATCH = int(get_setting('COVER_CHECK_BATCH', '500'))
+# Good covers are rechecked after this long; errors (timeouts, 5xx) after a day
+COVER_RECHECK_DAYS = int(get_setting('COVER_RECHECK_DAYS', '30'))
+# Run the checker in the app's process every this many hours (unset: only via the CLI)
+COVER_CHECK_INTERVAL_HOURS = float(get_setting('COVER_CHECK_INTERVAL_HOURS', '0'))
+
+# Bytes requested; the hash covers at most this much of the image
+COVER_SAMPLE_BYTES = 64 * 1024
+# Images smaller than this are 1x1 pixels or "no cover" badges
+MIN_COVER_BYTES = 1000
+# The same image served for this many books is a placeholder
+SHARED_IMAGE_BOOKS = 3
+KNOWN_PLACEHOLDER_HASHES = {h.strip() for h in get_setting('COVER_PLACEHOLDER_HASHES', '').split(',') if h.strip()}
+
+class HostRateLimiter:
+    """Spaces requests to each host at least 1/rate seconds apart"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+_sessions = threading.local()
+
+def _session():
+    """One requests session (connection pool) per worker thread"""
+    if not hasattr(_sessions, 'session'):
+        import requests
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+def check_cover(url, limiter):
+    """
+    Fetch the start of one cover image
+
+    Returns:
+        dict: status, http_status, content_hash and content_length
+    """
+    import requests
+    limiter.wait(urlparse(url).netloc)
+    result = {'status': COVER_ERROR, 'http_status': None, 'content_hash': None, 'content_length': None}
+    try:
+        with _session().get(url, headers={'Range': f"bytes=0-{COVER_SAMPLE_BYTES - 1}"},
+                            timeout=10, stream=True) as response:
+            result['http_status'] = response.status_code
+            if response.status_code in (404, 410):
+                result['status'] = COVER_MISSING
+                return result
+            if response.status_code not in (200, 206):
+                return result
+            if not response.headers.get('Content-Type', '').startswith('image/'):
+                result['status'] = COVER_MISSING
+                return result
+            body = response.raw.read(COVER_SAMPLE_BYTES, decode_content=True)
+    except requests.RequestException:
+        return result
+
+    # Content-Range carries the full size of a partial response
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    result['content_length'] = int(total) if total.isdigit() else len(body)
+    result['content_hash'] = hashlib.sha256(body).hexdigest()
+    small = result['content_length'] < MIN_COVER_BYTES
+    result['status'] = COVER_PLACEHOLDER if small or result['content_hash'] in KNOWN_PLACEHOLDER_HASHES else COVER_OK
+    return result
+
+def covers_due(cursor, library_id, checked_before=None, limit=COVER_CHECK_BATCH):
+    """
+    Books whose cover URL has never been checked, has changed, is due a recheck or was checked before checked_before
+
+    ISBNCode isn't unique, and CoverStatus keeps one row per ISBN, so each
+    ISBN is checked by one of its URLs (the same one every time).
+    """
+    cursor.execute("""
+        SELECT b.ISBNCode, b.ImageURL
+        FROM (
+            SELECT DISTINCT ON (ISBNCode) LibraryID, ISBNCode, ImageURL
+            FROM MyBooks
+            WHERE LibraryID = %s AND ISBNCode IS NOT NULL AND coalesce(ImageURL, '') <> ''
+            ORDER BY ISBNCode, ImageURL
+        ) b
+        LEFT JOIN CoverStatus cs ON cs.LibraryID = b.LibraryID AND cs.ISBNCode = b.ISBNCode
+        WHERE (cs.CheckedAt < %s OR cs.ISBNCode IS NULL OR cs.ImageURL IS DISTINCT FROM b.ImageURL
+               OR cs.CheckedAt < CURRENT_TIMESTAMP - make_interval(days => CASE WHEN cs.Status = %s THEN 1 ELSE %s END))
+        ORDER BY cs.CheckedAt NULLS FIRST
+        LIMIT %s
+    """, (library_id, checked_before, COVER_ERROR, COVER_RECHECK_DAYS, limit))
+    return cursor.fetchall()
+
+def mark_shared_images(cursor, library_id):
+    """Mark images served for several different books as placeholders"""
+    cursor.execute("""
+        UPDATE CoverStatus SET Status = %s
+        WHERE LibraryID = %s AND Status = %s AND ContentHash IN (
+            SELECT ContentHash FROM CoverStatus
+            WHERE LibraryID = %s AND ContentHash IS NOT NULL
+            GROUP BY ContentHash
+            HAVING COUNT(DISTINCT ISBNCode) >= %s
+        )
+    """, (COVER_PLACEHOLDER, library_id, COVER_OK, library_id, SHARED_IMAGE_BOOKS))
+    return cursor.rowcount
+
+def check_library_covers(library_id, recheck=False):
+    """
+    Check every cover in a library that is due, batch by batch
+
+    Returns:
+        dict: Count of covers per status
+    """
+    from psycopg2.extras import execute_values
+    limiter = HostRateLimiter(COVER_CHECK_RATE)
+    counts = {}
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        checked_before = None
+        if recheck:
+            cursor.execute("SELECT LOCALTIMESTAMP")
+            checked_before = cursor.fetchone()[0]
+        # ISBNs checked in this run; one coming back means the batches make no progress
+        checked = set()
+        with ThreadPoolExecutor(max_workers=COVER_CHECK_WORKERS, thread_name_prefix="cover-check") as pool:
+            while True:
+                due = covers_due(cursor, library_id, checked_before)
+                conn.commit()
+                due = [book for book in due if book[0] not in checked]
+                if not due:
+                    break
+                checked.update(isbn for isbn, _ in due)
+                results = pool.map(lambda book: (book, check_cover(book[1], limiter)), due)
+                rows = {}
+                for (isbn, url), result in results:
+                    counts[result['status']] = counts.get(result['status'], 0) + 1
+                    rows[isbn] = (library_id, isbn, url, result['status'], result['http_status'],
+                                  result['content_hash'], result['content_length'])
+                execute_values(cursor, """
+                    INSERT INTO CoverStatus (LibraryID, ISBNCode, ImageURL, Status, HTTPStatus,
+                                             ContentHash, ContentLength)
+                    VALUES %s
+                    ON CONFLICT (LibraryID, ISBNCode) DO UPDATE SET
+                        ImageURL = EXCLUDED.ImageURL, Status = EXCLUDED.Status,
+                        HTTPStatus = EXCLUDED.HTTPStatus, ContentHash = EXCLUDED.ContentHash,
+                        ContentLength = EXCLUDED.ContentLength, CheckedAt = CURRENT_TIMESTAMP
+                """, list(rows.values()))
+                conn.commit()
+        shared = mark_shared_images(cursor, library_id)
+        conn.commit()
+    finally:
+        conn.close()
+    if shared:
+        counts[COVER_OK] = counts.get(COVER_OK, 0) - shared
+        counts[COVER_PLACEHOLDER] = counts.get(COVER_PLACEHOLDER, 0) + shared
+    return counts
+
+def check_all_covers():
+    """Check the due covers of every library"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT LibraryID FROM Libraries ORDER BY LibraryID")
+        library_ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    for library_id in library_ids:
+        check_library_covers(library_id)
+
+_checker_thread = None
+_checker_lock = threading.Lock()
+
+def _checker_loop():
+    while True:
+        try:
+            check_all_covers()
+        except Exception as e:
+            print(f"Cover check failed: {e}")
+        time.sleep(COVER_CHECK_INTERVAL_HOURS * 3600)
+
+def start_cover_checker():
+    """Start the periodic background check if COVER_CHECK_INTERVAL_HOURS is set (once per process)"""
+    global _checker_thread
+    if COVER_CHECK_INTERVAL_HOURS <= 0:
+        return
+    with _checker_lock:
+        if _checker_thread is None:
+            _checker_thread = threading.Thread(target=_checker_loop, name="cover-checker", daemon=True)
+            _checker_thread.start()
+
+if __name__ == "__main__":
+    from database import DEFAULT_LIBRARY_ID
+    parser = argparse.ArgumentParser(description="Check stored cover URLs and record dead and placeholder covers")
+    parser.add_argument('--library', type=int, default=DEFAULT_LIBRARY_ID, help="LibraryID to check")
+    parser.add_argument('--recheck', action='store_true', help="recheck every cover, not just the due ones")
+    args = parser.parse_args()
+    counts = check_library_covers(args.library, recheck=args.recheck)
+    print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())) or "No covers due")
@@ -0,0 +1,41 @@
+"""
+Local cover image cache for Personal Library Management System
+Cover files are stored as <cover_cache>/<isbn>.<ext> and preferred over remote URLs
+"""
+
+import os
+import re
+from app_config import get_setting
+
+COVER_CACHE_DIR = get_setting('COVER_CACHE_DIR', 'cover_cache')
+COVER_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+
+def book_slug(isbn):
+    """File-system safe name for a book's files"""
+    return re.sub(r'[^0-9A-Za-z-]', '_', str(isbn))
+
+def cached_cover(isbn):
+    """Return the path of a locally cached cover for the ISBN, or None"""
+    for extension in COVER_EXTENSIONS:
+        path = os.path.join(COVER_CACHE_DIR, book_slug(isbn) + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+def cached_cover_index():
+    """
+    List every cached cover in one directory scan
+
+    Returns:
+        dict: Book slug -> cover file path
+    """
+    covers = {}
+    try:
+        with os.scandir(COVER_CACHE_DIR) as entries:
+            for entry in entries:
+                slug, extension = os.path.splitext(entry.name)
+                if extension.lower() in COVER_EXTENSIONS and entry.is_file():
+                    covers[slug] = entry.path
+    except FileNotFoundError:
+        pass
+    return covers
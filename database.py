@@ -1,34 +1,306 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import pandas as pd
 import streamlit as st
+import time
+import threading
 from datetime import datetime
-import os
-from dotenv import load_dotenv
+from decimal import Decimal
+from app_config import get_setting
+from book_cache import BookCache
 
-# Load environment variables
-load_dotenv()
+# psycopg2 and pandas are imported inside the functions that use them so
+# pages that never touch them (or only on a button click) start faster
 
 def get_db_connection():
     """Create standard database connection (for pandas)"""
-    conn = psycopg2.connect(os.getenv('NEON_CONNECTION_STRING'))
+    import psycopg2
+    conn = psycopg2.connect(get_setting('NEON_CONNECTION_STRING'))
     return conn
 
 def get_db_connection_dict():
     """Create database connection with dict cursor (for individual operations)"""
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
     conn = psycopg2.connect(
-        os.getenv('NEON_CONNECTION_STRING'),
+        get_setting('NEON_CONNECTION_STRING'),
         cursor_factory=RealDictCursor
     )
     return conn
 
-def get_all_books():
-    """Retrieve all books from database"""
+# Optional streaming read replica: with NEON_REPLICA_CONNECTION_STRING set,
+# catalog reads go to the replica and every write stays on the primary
+REPLICA_CONNECTION_STRING = get_setting('NEON_REPLICA_CONNECTION_STRING')
+# A library's reads stay on the primary this long after it was written, so a
+# write is never followed by a read the replica hasn't replayed yet
+REPLICA_STICKY_SECONDS = float(get_setting('REPLICA_STICKY_SECONDS', '15'))
+# After a failed replica connection, reads use the primary this long before the replica is tried again
+REPLICA_RETRY_SECONDS = float(get_setting('REPLICA_RETRY_SECONDS', '30'))
+REPLICA_CONNECT_TIMEOUT = int(get_setting('REPLICA_CONNECT_TIMEOUT', '3'))
+
+# LibraryID -> monotonic time of its last write in this process
+_last_write = {}
+_replica_down_until = 0.0
+
+def note_library_write(library_id):
+    """Keep the library's reads on the primary until the replica has caught up with this write"""
+    _last_write[library_id] = time.monotonic()
+
+def reads_use_replica(library_id):
+    """Whether a library's reads can go to the replica right now"""
+    if not REPLICA_CONNECTION_STRING:
+        return False
+    now = time.monotonic()
+    written = _last_write.get(library_id)
+    return now >= _replica_down_until and (written is None or now - written >= REPLICA_STICKY_SECONDS)
+
+def _read_connection(library_id, **kwargs):
+    global _replica_down_until
+    import psycopg2
+    if reads_use_replica(library_id):
+        try:
+            return psycopg2.connect(REPLICA_CONNECTION_STRING, connect_timeout=REPLICA_CONNECT_TIMEOUT, **kwargs)
+        except psycopg2.OperationalError as e:
+            print(f"Read replica unavailable, reading from the primary: {e}")
+            _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+    return psycopg2.connect(get_setting('NEON_CONNECTION_STRING'), **kwargs)
+
+def get_read_connection(library_id):
+    """Connection for read-only queries of a library: the replica when it is up and caught up, else the primary"""
+    return _read_connection(library_id)
+
+def get_read_connection_dict(library_id):
+    """Read-only connection with dict cursor (see get_read_connection)"""
+    from psycopg2.extras import RealDictCursor
+    return _read_connection(library_id, cursor_factory=RealDictCursor)
+
+# Each household's books live in their own library. Pages work in the
+# session's library; background threads are handed theirs explicitly.
+DEFAULT_LIBRARY_ID = int(get_setting('LIBRARY_ID', '1'))
+
+def current_library_id():
+    """Library the current session works in (DEFAULT_LIBRARY_ID outside a Streamlit session)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx() is not None:
+        return st.session_state.get('library_id', DEFAULT_LIBRARY_ID)
+    return DEFAULT_LIBRARY_ID
+
+@st.cache_data(ttl=300)
+def get_libraries():
+    """
+    List the libraries
+    
+    Returns:
+        list: Dicts with libraryid and name, ordered by name
+    """
+    conn = get_db_connection_dict()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT LibraryID, Name FROM Libraries ORDER BY Name")
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def create_library(name, pin):
+    """
+    Add a library with its own PIN
+    
+    Returns:
+        int: The new LibraryID
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO Libraries (Name) VALUES (%s) RETURNING LibraryID", (name,))
+        library_id = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO Settings (ID, PIN) VALUES (%s, %s)", (library_id, pin))
+        conn.commit()
+    finally:
+        conn.close()
+    get_libraries.clear()
+    return library_id
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _read_bad_covers(library_id):
+    conn = get_read_connection(library_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT cs.ISBNCode FROM CoverStatus cs
+            JOIN MyBooks b ON b.LibraryID = cs.LibraryID AND b.ISBNCode = cs.ISBNCode
+            WHERE cs.LibraryID = %s AND cs.Status IN ('missing', 'placeholder') AND cs.ImageURL = b.ImageURL
+        """, (library_id,))
+        return frozenset(row[0] for row in cursor.fetchall())
+    finally:
+        conn.close()
+
+def get_bad_covers(library_id=None):
+    """
+    ISBNs whose cover URL the cover checker found dead or a placeholder image
+    
+    Only results for the book's current ImageURL count. Refreshed every few
+    minutes; an empty set when covers haven't been checked.
+    
+    Returns:
+        frozenset: ISBNs to show without a cover
+    """
+    try:
+        return _read_bad_covers(library_id or current_library_id())
+    except Exception as e:
+        print(f"Cover status unavailable: {e}")
+        return frozenset()
+
+# Shared single-book read cache keyed by (library, ISBN); entries older than
+# the revalidation window are checked against LastModified before being served
+BOOK_CACHE_REVALIDATE_SECONDS = float(get_setting('BOOK_CACHE_REVALIDATE_SECONDS', '30'))
+_book_cache = BookCache(maxsize=int(get_setting('BOOK_CACHE_SIZE', '256')))
+
+def book_written(isbn, library_id=None):
+    """Run follow-up work after a book was added, updated or deleted"""
+    library_id = library_id or current_library_id()
+    note_library_write(library_id)
+    _book_cache.invalidate((library_id, isbn))
+    
+    # Loaded "More like this" and autocomplete indexes re-read the book before their next use
+    import similar_books
+    import autocomplete
+    import catalog_store
+    similar_books.book_changed(library_id, isbn)
+    autocomplete.book_changed(library_id, isbn)
+    # The catalog store catches up with the write before this process's next read
+    catalog_store.book_changed(library_id)
+    
+    # Keep the static read-only snapshot current when one is configured
+    if get_setting('SNAPSHOT_DIR'):
+        from snapshot import schedule_snapshot_refresh, SNAPSHOT_LIBRARY_ID
+        if library_id == SNAPSHOT_LIBRARY_ID:
+            schedule_snapshot_refresh()
+
+# Optional write-behind journal: with WRITE_JOURNAL_PATH set, adds, edits and
+# deletes are acknowledged once they are on local disk and reach the
+# database from a background flusher
+_write_journal = None
+_write_journal_lock = threading.Lock()
+
+def get_write_journal():
+    """The process's write journal (starting its flusher), or None when journaling is off"""
+    global _write_journal
+    path = get_setting('WRITE_JOURNAL_PATH')
+    if not path:
+        return None
+    with _write_journal_lock:
+        if _write_journal is None:
+            from write_journal import WriteJournal
+            _write_journal = WriteJournal(path, apply_journal_entries)
+            # Entries left over from a previous run start flushing straight away
+            _write_journal.start()
+    return _write_journal
+
+def pending_writes(library_id=None):
+    """A library's journaled writes not yet in the database, oldest first"""
+    journal = get_write_journal()
+    if not journal:
+        return []
+    library_id = library_id or current_library_id()
+    return [entry for entry in journal.pending() if entry['library_id'] == library_id]
+
+def database_reachable():
+    """Check whether a database connection can be opened"""
+    try:
+        get_db_connection().close()
+        return True
+    except Exception:
+        return False
+
+# Catalog load path: 'arrow' streams COPY output into Arrow buffers,
+# 'pandas' builds the DataFrame through pd.read_sql_query, 'store' maps the
+# on-disk Arrow snapshot kept by catalog_store.py
+CATALOG_LOADER = get_setting('CATALOG_LOADER', 'arrow')
+# Ordered by a key the catalog store can reproduce when it merges changes (catalog_store.apply_changes)
+CATALOG_QUERY = 'SELECT * FROM MyBooks WHERE LibraryID = %s ORDER BY lower(coalesce(Title, \'\')) COLLATE "C", ISBNCode'
+
+# Free-text columns must stay strings (ISBNs look numeric to type inference)
+TEXT_COLUMNS = ['title', 'subtitle', 'author', 'isbncode', 'publisher', 'publisheddate',
+                'memo', 'description', 'imageurl', 'excerpt', 'language']
+
+def read_books_table(conn, query=CATALOG_QUERY, params=None, column_types=None):
+    """
+    Load query results as an Arrow table via COPY ... TO STDOUT
+    
+    The rows travel as compact CSV bytes and are parsed straight into Arrow
+    columns, skipping the per-cell Python objects of a cursor fetch.
+    
+    Args:
+        conn: Open database connection
+        query (str): SELECT statement to export
+        params (tuple): Query parameters
+        column_types (dict): Arrow types for columns, overriding inference
+        
+    Returns:
+        pyarrow.Table: The query's rows
+    """
+    import io
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    
+    buffer = io.BytesIO()
+    cursor = conn.cursor()
+    if params:
+        query = cursor.mogrify(query, params).decode()
+    cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    buffer.seek(0)
+    
+    return pa_csv.read_csv(
+        buffer,
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types or {column: pa.string() for column in TEXT_COLUMNS},
+            strings_can_be_null=True,
+            # Postgres writes NULL unquoted and '' quoted - keep them apart
+            quoted_strings_can_be_null=False,
+        ),
+    )
+
+def read_books_arrow(conn, query=CATALOG_QUERY, params=None):
+    """
+    Load query results as an Arrow-backed DataFrame (see read_books_table)
+    
+    Returns:
+        DataFrame: Columns backed by pd.ArrowDtype
+    """
+    import pandas as pd
+    return read_books_table(conn, query, params).to_pandas(types_mapper=pd.ArrowDtype)
+
+def get_all_books(loader=None, library_id=None):
+    """
+    Retrieve all books of a library from database
+    
+    Args:
+        loader (str): 'arrow', 'pandas' or 'store', defaults to CATALOG_LOADER
+        library_id (int): Library to read, defaults to the session's
+    """
+    import pandas as pd
+    library_id = library_id or current_library_id()
+    loader = loader or CATALOG_LOADER
     conn = None
     try:
-        conn = get_db_connection()
-        query = "SELECT * FROM MyBooks ORDER BY title"
-        books_df = pd.read_sql_query(query, conn)
+        books_df = None
+        if loader == 'store':
+            try:
+                from catalog_store import catalog_table
+                books_df = catalog_table(library_id).to_pandas(types_mapper=pd.ArrowDtype)
+            except Exception as e:
+                print(f"Catalog store unavailable, reading the database: {e}")
+                loader = 'arrow'
+        if books_df is None:
+            conn = get_read_connection(library_id)
+        if loader == 'arrow':
+            try:
+                books_df = read_books_arrow(conn, CATALOG_QUERY, (library_id,))
+            except ImportError:
+                pass
+        if books_df is None:
+            books_df = pd.read_sql_query(CATALOG_QUERY, conn, params=(library_id,))
+        entries = pending_writes(library_id)
+        if entries:
+            from write_journal import overlay_books_df
+            books_df = overlay_books_df(entries, books_df)
         return books_df
     except Exception as e:
         st.error(f"Database error: {e}")
@@ -37,72 +309,416 @@ def get_all_books():
         if conn:
             conn.close()
 
-def add_book_to_database(book_data):
+# User-selectable catalog orders. Each key expression has a SQL type (used to
+# cast keyset cursors passed back as text) and a composite index on
+# (LibraryID, keys..., ISBNCode) created by migrations.py; ISBNCode breaks ties.
+# Text keys are case-folded and compared bytewise, like CATALOG_QUERY and
+# sort_books in pages/view_library.py, so every view orders books alike.
+SORT_ORDERS = {
+    "Title": {
+        'keys': [("lower(coalesce(Title, '')) COLLATE \"C\"", 'text')],
+        'direction': 'ASC', 'index': 'mybooks_sort_title_idx',
+    },
+    "Author": {
+        'keys': [("lower(coalesce(Author, '')) COLLATE \"C\"", 'text'),
+                 ("lower(coalesce(Title, '')) COLLATE \"C\"", 'text')],
+        'direction': 'ASC', 'index': 'mybooks_sort_author_idx',
+    },
+    "Rating": {
+        'keys': [("coalesce(Rating, -1)", 'numeric')],
+        'direction': 'DESC', 'index': 'mybooks_sort_rating_idx',
+    },
+    "Date added": {
+        'keys': [("coalesce(DateAdded, '-infinity')", 'timestamp')],
+        'direction': 'DESC', 'index': 'mybooks_sort_dateadded_idx',
+    },
+    "Last modified": {
+        'keys': [("coalesce(LastModified, '-infinity')", 'timestamp')],
+        'direction': 'DESC', 'index': 'mybooks_sort_lastmodified_idx',
+    },
+    "Published date": {
+        'keys': [("coalesce(substring(PublishedDate from '[0-9]{4}'), '')", 'text')],
+        'direction': 'DESC', 'index': 'mybooks_sort_published_idx',
+    },
+}
+
+def _sort_key_sql(sort):
+    """Key expressions, their SQL types and the ORDER BY direction for a sort order"""
+    order = SORT_ORDERS[sort]
+    expressions = [expr for expr, _ in order['keys']] + ['ISBNCode']
+    types = [sql_type for _, sql_type in order['keys']] + ['text']
+    return expressions, types, order['direction']
+
+def get_books_keyset(sort="Title", after=None, before=None, start_at=None, limit=50, library_id=None):
+    """
+    Retrieve one page of books with keyset pagination
+    
+    Pages are addressed by the sort key of a neighbouring row instead of an
+    offset, so every page is a single index range scan of `limit` rows no
+    matter how deep it is, and concurrent inserts don't shift pages.
+    
+    Args:
+        sort (str): Key of SORT_ORDERS
+        after (list): Sort key of the row just before the page (from sort_key())
+        before (list): Sort key of the row just after the page, for paging backwards
+        start_at (str): ISBN of a book the page should start with
+        limit (int): Page size
+        library_id (int): Library to read, defaults to the session's
+        
+    Returns:
+        DataFrame: The page's rows plus sort_key_N text columns (empty on error)
+    """
+    import pandas as pd
+    library_id = library_id or current_library_id()
+    expressions, types, direction = _sort_key_sql(sort)
+    row = f"({', '.join(expressions)})"
+    cast_params = f"({', '.join(f'%s::{sql_type}' for sql_type in types)})"
+    forward = '>' if direction == 'ASC' else '<'
+    backward = '<' if direction == 'ASC' else '>'
+    
+    params = [library_id]
+    where = "WHERE LibraryID = %s"
+    order = direction
+    if after:
+        where += f" AND {row} {forward} {cast_params}"
+        params += list(after)
+    elif before:
+        where += f" AND {row} {backward} {cast_params}"
+        params += list(before)
+        order = 'DESC' if direction == 'ASC' else 'ASC'
+    elif start_at:
+        where += (f" AND {row} {forward}= (SELECT {', '.join(expressions)} FROM MyBooks"
+                  f" WHERE LibraryID = %s AND ISBNCode = %s LIMIT 1)")
+        params += [library_id, start_at]
+    
+    key_columns = ", ".join(f"({expr})::text AS sort_key_{i}" for i, expr in enumerate(expressions[:-1]))
+    query = f"""
+        SELECT *, {key_columns} FROM MyBooks
+        {where}
+        ORDER BY {', '.join(f'{expr} {order}' for expr in expressions)}
+        LIMIT %s
+    """
+    conn = None
+    try:
+        conn = get_read_connection(library_id)
+        books_df = pd.read_sql_query(query, conn, params=(*params, limit))
+        # Backward pages are read in reverse; put them back in display order
+        if before:
+            books_df = books_df.iloc[::-1].reset_index(drop=True)
+        # Show unflushed edits and deletes (new books appear once flushed)
+        entries = pending_writes(library_id)
+        if entries:
+            from write_journal import overlay_books_df
+            books_df = overlay_books_df(entries, books_df, include_added=False)
+        return books_df
+    except Exception as e:
+        st.error(f"Database error: {e}")
+        return pd.DataFrame()
+    finally:
+        if conn:
+            conn.close()
+
+def sort_key(book, sort="Title"):
+    """Keyset cursor for a row returned by get_books_keyset"""
+    key_count = len(SORT_ORDERS[sort]['keys'])
+    return [book[f'sort_key_{i}'] for i in range(key_count)] + [book['isbncode']]
+
+def count_books(library_id=None):
+    """Return the number of books in the library"""
+    library_id = library_id or current_library_id()
+    conn = get_read_connection(library_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM MyBooks WHERE LibraryID = %s", (library_id,))
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+def get_book_position(isbn, sort="Title", library_id=None):
+    """
+    Return the 0-based position of a book in the given sort order, or None if not found
+    """
+    library_id = library_id or current_library_id()
+    expressions, _, direction = _sort_key_sql(sort)
+    before = '<' if direction == 'ASC' else '>'
+    conn = get_read_connection(library_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT CASE WHEN EXISTS (SELECT 1 FROM MyBooks WHERE LibraryID = %s AND ISBNCode = %s) THEN (
+                SELECT COUNT(*) FROM MyBooks
+                WHERE LibraryID = %s AND ({', '.join(expressions)}) {before}
+                      (SELECT {', '.join(expressions)} FROM MyBooks
+                       WHERE LibraryID = %s AND ISBNCode = %s LIMIT 1)
+            ) END
+        """, (library_id, isbn, library_id, library_id, isbn))
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+INSERT_BOOK_SQL = """
+    INSERT INTO MyBooks (
+        Title, Subtitle, Author, ISBNCode, Publisher, PublishedDate, 
+        Length, Memo, Rating, Description, ImageURL, Excerpt,
+        DateAdded, LastModified, WorkKey, LibraryID
+    )"""
+
+def book_insert_values(book_data, timestamp, library_id):
+    """Values tuple for INSERT_BOOK_SQL"""
+    from duplicates import work_key
+    return (
+        book_data.get('title'),
+        book_data.get('subtitle'),
+        book_data.get('author'),
+        book_data.get('isbncode'),
+        book_data.get('publisher'),
+        book_data.get('publisheddate'),
+        book_data.get('length'),
+        book_data.get('memo'),
+        book_data.get('rating'),
+        book_data.get('description'),
+        book_data.get('imageurl'),
+        book_data.get('excerpt'),
+        timestamp,
+        timestamp,
+        work_key(book_data.get('title'), book_data.get('author')),
+        library_id
+    )
+
+def add_book_to_database(book_data, library_id=None):
     """
     Insert a new book into the MyBooks table
     
+    With the write journal on, the book is journaled and added in the
+    background. The ISBN is still checked against the database; when the
+    database can't be reached the book is only queued, and a duplicate is
+    reported by the journal's sync status once it flushes.
+    
     Args:
         book_data (dict): Dictionary containing book information with keys matching database columns
+        library_id (int): Library to add to, defaults to the session's
         
     Returns:
         tuple: (success: bool, message: str)
     """
+    library_id = library_id or current_library_id()
+    journal = get_write_journal()
+    if journal:
+        from write_journal import JOURNAL_ADD
+        isbn = book_data.get('isbncode')
+        existing, confirmed = journaled_isbns_in_library([isbn], library_id)
+        if isbn in existing:
+            return False, f"Book with ISBN {isbn} already exists in database"
+        journal.append([(JOURNAL_ADD, library_id, isbn, book_data, None)])
+        if not confirmed:
+            return True, (f"Queued '{book_data.get('title')}' - the database can't be reached, so it is "
+                          f"not confirmed yet and will be added when it is back")
+        return True, f"Saved '{book_data.get('title')}' to library (syncing in the background)"
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
         # Check for duplicate ISBN
-        cursor.execute("SELECT COUNT(*) FROM MyBooks WHERE ISBNCode = %s", (book_data.get('isbncode'),))
+        cursor.execute("SELECT COUNT(*) FROM MyBooks WHERE LibraryID = %s AND ISBNCode = %s",
+                       (library_id, book_data.get('isbncode')))
         if cursor.fetchone()[0] > 0:
             conn.close()
             return False, f"Book with ISBN {book_data.get('isbncode')} already exists in database"
         
-        # Prepare insert statement
-        insert_sql = """
-            INSERT INTO MyBooks (
-                Title, Subtitle, Author, ISBNCode, Publisher, PublishedDate, 
-                Length, Memo, Rating, Description, ImageURL, Excerpt,
-                DateAdded, LastModified
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
         # Get current timestamp
         current_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Prepare values tuple
-        values = (
-            book_data.get('title'),
-            book_data.get('subtitle'),
-            book_data.get('author'),
-            book_data.get('isbncode'),
-            book_data.get('publisher'),
-            book_data.get('publisheddate'),
-            book_data.get('length'),
-            book_data.get('memo'),
-            book_data.get('rating'),
-            book_data.get('description'),
-            book_data.get('imageurl'),
-            book_data.get('excerpt'),
-            current_timestamp,
-            current_timestamp
-        )
-        
         # Execute insert
-        cursor.execute(insert_sql, values)
+        cursor.execute(INSERT_BOOK_SQL + " VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                       book_insert_values(book_data, current_timestamp, library_id))
+        set_book_authors(cursor, library_id, book_data.get('isbncode'), book_data.get('title'),
+                         author_names(book_data))
         conn.commit()
         conn.close()
+        book_written(book_data.get('isbncode'), library_id)
         
         return True, f"Successfully added '{book_data.get('title')}' to library"
 
     except Exception as e:
         return False, f"Database error: {str(e)}"
 
-def get_book_by_isbn(isbn):
-    """Get a single book by ISBN"""
-    conn = get_db_connection_dict()
+def journaled_isbns_in_library(isbns, library_id):
+    """
+    Which of the given ISBNs the library will hold once its journaled writes are flushed
+    
+    Returns:
+        tuple: (ISBNs in the database or added by the journal and not deleted by it,
+                whether the database could be checked - if not, only the journal was)
+    """
+    from write_journal import JOURNAL_ADD, JOURNAL_DELETE
+    added, deleted = set(), set()
+    for entry in pending_writes(library_id):
+        if entry['op'] == JOURNAL_ADD:
+            added.add(entry['isbn'])
+            deleted.discard(entry['isbn'])
+        elif entry['op'] == JOURNAL_DELETE:
+            deleted.add(entry['isbn'])
+            added.discard(entry['isbn'])
+    added &= set(isbns)
+    try:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT ISBNCode FROM MyBooks WHERE LibraryID = %s AND ISBNCode = ANY(%s)",
+                           (library_id, list(isbns)))
+            stored = {row[0] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Could not check the database for existing books: {e}")
+        return added, False
+    return (stored - deleted) | added, True
+
+def add_books_to_database(books, library_id=None):
+    """
+    Insert many new books in one transaction
+    
+    Books whose ISBN is already in the library (or repeated in the batch)
+    are skipped rather than failing the batch.
+    
+    Args:
+        books (list): Book dictionaries as for add_book_to_database
+        library_id (int): Library to add to, defaults to the session's
+        
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    library_id = library_id or current_library_id()
+    journal = get_write_journal()
+    if journal:
+        from write_journal import JOURNAL_ADD
+        seen, confirmed = journaled_isbns_in_library([book.get('isbncode') for book in books], library_id)
+        new_books = []
+        for book in books:
+            if book.get('isbncode') not in seen:
+                seen.add(book.get('isbncode'))
+                new_books.append(book)
+        journal.append([(JOURNAL_ADD, library_id, book.get('isbncode'), book, None) for book in new_books])
+        count = f"{len(new_books)} book{'s' if len(new_books) != 1 else ''}"
+        if not confirmed:
+            return True, (f"Queued {count} - the database can't be reached, so they are not confirmed yet "
+                          f"and will be added when it is back")
+        skipped = len(books) - len(new_books)
+        return True, (f"Saved {count} to library (syncing in the background)"
+                      + (f" ({skipped} already in library)" if skipped else ""))
+    
+    try:
+        inserted = insert_books(books, library_id)
+    except Exception as e:
+        return False, f"Database error: {str(e)}"
+    added = sum(inserted)
+    skipped = len(books) - added
+    message = f"Added {added} book{'s' if added != 1 else ''} to library"
+    if skipped:
+        message += f" ({skipped} already in library)"
+    return True, message
+
+def insert_books(books, library_id):
+    """
+    Insert new books in one transaction, skipping ISBNs already in the library
+    
+    Args:
+        books (list): Book dictionaries as for add_book_to_database
+        library_id (int): Library to add to
+        
+    Returns:
+        list: For each book, whether it was inserted
+        
+    Raises:
+        Exception: Any database error; nothing is inserted
+    """
+    from psycopg2.extras import execute_values
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        isbns = [book.get('isbncode') for book in books]
+        cursor.execute("SELECT ISBNCode FROM MyBooks WHERE LibraryID = %s AND ISBNCode = ANY(%s)",
+                       (library_id, isbns))
+        seen = {row[0] for row in cursor.fetchall()}
+        inserted = []
+        new_books = []
+        for book in books:
+            inserted.append(book.get('isbncode') not in seen)
+            if inserted[-1]:
+                seen.add(book.get('isbncode'))
+                new_books.append(book)
+        
+        current_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if new_books:
+            execute_values(cursor, INSERT_BOOK_SQL + " VALUES %s",
+                           [book_insert_values(book, current_timestamp, library_id) for book in new_books])
+            for book in new_books:
+                set_book_authors(cursor, library_id, book.get('isbncode'), book.get('title'), author_names(book))
+        conn.commit()
+        
+        for book in new_books:
+            book_written(book.get('isbncode'), library_id)
+        return inserted
+    finally:
+        if conn:
+            conn.close()
+
+def get_book_by_isbn(isbn, library_id=None):
+    """
+    Get a single book by ISBN, including any journaled writes not yet flushed
+    """
+    library_id = library_id or current_library_id()
+    entries = pending_writes(library_id)
+    if entries:
+        from write_journal import overlay_book
+        return overlay_book(entries, isbn, lambda key: read_book_by_isbn(key, library_id))
+    return read_book_by_isbn(isbn, library_id)
+
+def read_book_by_isbn(isbn, library_id):
+    """
+    Get a single book by ISBN as stored in the database
+    
+    Served from the shared record cache; an entry older than
+    BOOK_CACHE_REVALIDATE_SECONDS is only re-read when its LastModified
+    changed (e.g. written by another process).
+    """
+    cache_key = (library_id, isbn)
+    cached = _book_cache.get(cache_key)
+    if cached is not None:
+        book, age = cached
+        if age < BOOK_CACHE_REVALIDATE_SECONDS or book_is_current(isbn, book.get('lastmodified'), library_id):
+            if age >= BOOK_CACHE_REVALIDATE_SECONDS:
+                _book_cache.put(cache_key, book)
+            return book
+        _book_cache.invalidate(cache_key)
+    
+    book = fetch_book_by_isbn(isbn, library_id)
+    if book:
+        _book_cache.put(cache_key, book)
+    return book
+
+def book_is_current(isbn, last_modified, library_id):
+    """Check whether a book's LastModified still matches a cached copy"""
+    conn = get_read_connection(library_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT LastModified FROM MyBooks WHERE LibraryID = %s AND ISBNCode = %s",
+                       (library_id, isbn))
+        row = cursor.fetchone()
+        return row is not None and row[0] == last_modified
+    finally:
+        conn.close()
+
+def fetch_book_by_isbn(isbn, library_id=None):
+    """Read a single book by ISBN straight from the database"""
+    library_id = library_id or current_library_id()
+    conn = get_read_connection_dict(library_id)
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM MyBooks WHERE ISBNCode = %s", (isbn,))
+    cursor.execute("SELECT * FROM MyBooks WHERE LibraryID = %s AND ISBNCode = %s", (library_id, isbn))
     row = cursor.fetchone()
     
     if row:
@@ -113,64 +729,341 @@ def get_book_by_isbn(isbn):
     conn.close()
     return book_dict
 
-def update_book_in_database(book_data):
-    """Update an existing book in the database"""
+# Editable book fields and the MyBooks columns they are stored in
+BOOK_COLUMNS = {
+    'title': 'Title',
+    'subtitle': 'Subtitle',
+    'author': 'Author',
+    'isbncode': 'ISBNCode',
+    'publisher': 'Publisher',
+    'publisheddate': 'PublishedDate',
+    'length': 'Length',
+    'memo': 'Memo',
+    'rating': 'Rating',
+    'description': 'Description',
+    'imageurl': 'ImageURL',
+    'excerpt': 'Excerpt',
+}
+
+# Outcomes of save_book_changes / update_book_fields
+UPDATE_OK = 'updated'
+UPDATE_UNCHANGED = 'unchanged'
+UPDATE_CONFLICT = 'conflict'
+UPDATE_NOT_FOUND = 'not_found'
+UPDATE_ERROR = 'error'
+
+def _comparable(value, field=None):
+    """Normalize a field value so form input and database values compare equal"""
+    if value is None or value == '':
+        return None
+    # Lookups and scans store an unknown page count as 0; the forms send None
+    if field == 'length' and value == 0:
+        return None
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value)
+    return str(value)
+
+def changed_fields(original, book_data):
+    """
+    Work out which editable fields differ from the row as it was loaded
+    
+    Args:
+        original (dict): Book as read from the database
+        book_data (dict): Book with edited values
+        
+    Returns:
+        dict: Field -> new value, only for fields that changed
+    """
+    return {
+        field: book_data.get(field)
+        for field in BOOK_COLUMNS
+        if field in book_data and _comparable(book_data.get(field), field) != _comparable(original.get(field), field)
+    }
+
+def update_book_fields(isbn, changes, expected_version=None, library_id=None):
+    """
+    Write only the given fields of a book
+    
+    The row version is bumped on every write. When expected_version is
+    given, the update only applies if nobody has saved the book since it
+    was loaded; otherwise the result is a conflict. With the write journal
+    on, the change is journaled and a conflict found while flushing is
+    reported by the journal's sync status.
+    
+    Args:
+        isbn (str): Current ISBN of the book
+        changes (dict): Field -> new value (keys from BOOK_COLUMNS)
+        expected_version (int): RowVersion the edit started from, or None to skip the check
+        library_id (int): Library the book is in, defaults to the session's
+        
+    Returns:
+        tuple: (status: str, message: str) with status one of the UPDATE_* values
+    """
+    changes = {field: value for field, value in changes.items() if field in BOOK_COLUMNS}
+    if not changes:
+        return UPDATE_UNCHANGED, "No changes to save"
+    
+    library_id = library_id or current_library_id()
+    journal = get_write_journal()
+    if journal:
+        from write_journal import JOURNAL_UPDATE
+        journal.append([(JOURNAL_UPDATE, library_id, isbn, changes, expected_version)])
+        return UPDATE_OK, "Saved your changes (syncing in the background)"
+    return write_book_fields(isbn, changes, expected_version, library_id)
+
+def write_book_fields(isbn, changes, expected_version, library_id):
+    """
+    Write changed fields to the database in a single UPDATE ... RETURNING
+    
+    Args and return value as for update_book_fields.
+    """
+    conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Update query - using ISBNCode to identify the record
-        cursor.execute("""
-            UPDATE MyBooks 
-            SET Title = %s, 
-                Subtitle = %s, 
-                Author = %s, 
-                Publisher = %s, 
-                PublishedDate = %s, 
-                Length = %s, 
-                Memo = %s, 
-                Rating = %s, 
-                Description = %s, 
-                ImageURL = %s, 
-                Excerpt = %s,
-                LastModified = CURRENT_TIMESTAMP
-            WHERE ISBNCode = %s
-        """, (
-            book_data.get('title'),
-            book_data.get('subtitle'),
-            book_data.get('author'),
-            book_data.get('publisher'),
-            book_data.get('publisheddate'),
-            book_data.get('length'),
-            book_data.get('memo'),
-            book_data.get('rating'),
-            book_data.get('description'),
-            book_data.get('imageurl'),
-            book_data.get('excerpt'),
-            book_data.get('isbncode')
-        ))
+        assignments = ", ".join(f"{BOOK_COLUMNS[field]} = %s" for field in changes)
+        # One round trip: the update plus the current version to tell a conflict from a missing book
+        cursor.execute(f"""
+            WITH current AS (
+                SELECT RowVersion FROM MyBooks WHERE LibraryID = %s AND ISBNCode = %s
+            ), updated AS (
+                UPDATE MyBooks
+                SET {assignments},
+                    LastModified = CURRENT_TIMESTAMP,
+                    RowVersion = RowVersion + 1
+                WHERE LibraryID = %s AND ISBNCode = %s
+                  AND (%s::integer IS NULL OR RowVersion = %s::integer)
+                RETURNING Title, Author, RowVersion
+            )
+            SELECT (SELECT Title FROM updated), (SELECT Author FROM updated),
+                   (SELECT RowVersion FROM updated), (SELECT RowVersion FROM current)
+        """, (library_id, isbn, *changes.values(), library_id, isbn, expected_version, expected_version))
+        title, author, new_version, current_version = cursor.fetchone()
+        
+        if new_version is None:
+            conn.rollback()
+            # Whatever is cached for this book is out of date
+            _book_cache.invalidate((library_id, isbn))
+            if current_version is None:
+                return UPDATE_NOT_FOUND, f"No book found with ISBN {isbn}"
+            return UPDATE_CONFLICT, "This book was changed by someone else after you opened it"
+        
+        # Author links and the work key only need touching when the fields they depend on changed
+        new_isbn = changes.get('isbncode', isbn)
+        if 'title' in changes or 'author' in changes:
+            from duplicates import work_key
+            cursor.execute("UPDATE MyBooks SET WorkKey = %s WHERE LibraryID = %s AND ISBNCode = %s",
+                           (work_key(title, author), library_id, new_isbn))
+        if new_isbn != isbn:
+            cursor.execute("UPDATE BookAuthors SET ISBNCode = %s WHERE LibraryID = %s AND ISBNCode = %s",
+                           (new_isbn, library_id, isbn))
+        if 'author' in changes:
+            set_book_authors(cursor, library_id, new_isbn, title,
+                             author_names(changes, get_book_author_names(cursor, library_id, new_isbn)))
+        elif 'title' in changes:
+            cursor.execute("UPDATE BookAuthors SET SortTitle = %s WHERE LibraryID = %s AND ISBNCode = %s",
+                           ((title or '').lower(), library_id, new_isbn))
         
         conn.commit()
+        book_written(isbn, library_id)
+        if new_isbn != isbn:
+            book_written(new_isbn, library_id)
+        
+        return UPDATE_OK, f"Successfully updated '{title}'"
+        
+    except Exception as e:
+        return UPDATE_ERROR, f"Error updating book: {str(e)}"
+    finally:
+        if conn:
+            conn.close()
+
+def save_book_changes(original, book_data):
+    """
+    Save an edited book, writing only the fields that changed
+    
+    Args:
+        original (dict): Book as loaded for editing (including rowversion)
+        book_data (dict): Book with edited values
+        
+    Returns:
+        tuple: (status: str, message: str) with status one of the UPDATE_* values
+    """
+    return update_book_fields(original.get('isbncode'), changed_fields(original, book_data),
+                              original.get('rowversion'), original.get('libraryid'))
+
+def update_book_in_database(book_data, original=None):
+    """
+    Update an existing book in the database
+    
+    With the originally loaded row, only changed fields are written and
+    concurrent edits are detected; without it every field is written.
+    
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if original:
+        status, message = save_book_changes(original, book_data)
+    else:
+        changes = {field: value for field, value in book_data.items() if field in BOOK_COLUMNS}
+        status, message = update_book_fields(book_data.get('isbncode'), changes)
+    return status in (UPDATE_OK, UPDATE_UNCHANGED), message
+
+# Fields the batch editor can change, with the SQL types their new values are cast to
+BATCH_EDIT_TYPES = {
+    'title': 'text',
+    'subtitle': 'text',
+    'author': 'text',
+    'publisher': 'text',
+    'publisheddate': 'text',
+    'length': 'integer',
+    'memo': 'text',
+    'rating': 'numeric',
+}
+
+def get_books_by_isbns(isbns, library_id=None):
+    """
+    Read several books in one query (including journaled changes not yet synced)
+    
+    Returns:
+        list: Book dicts in the order of isbns, skipping any not found
+    """
+    library_id = library_id or current_library_id()
+    conn = get_read_connection_dict(library_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM MyBooks WHERE LibraryID = %s AND ISBNCode = ANY(%s)", (library_id, list(isbns)))
+        rows = {row['isbncode']: dict(row) for row in cursor.fetchall()}
+    finally:
         conn.close()
+    entries = pending_writes(library_id)
+    if entries:
+        from write_journal import overlay_book
+        rows = {isbn: overlay_book(entries, isbn, rows.get) for isbn in isbns}
+    return [rows[isbn] for isbn in isbns if rows.get(isbn)]
+
+def update_books_batch(edits, library_id=None):
+    """
+    Apply changes to many books in one transaction
+    
+    All rows are written by a single UPDATE ... FROM (VALUES ...). If any
+    book was saved by someone else since it was loaded (or deleted), the
+    whole batch is rolled back. With the write journal on, the changes are
+    journaled together and flushed book by book.
+    
+    Args:
+        edits (list): (isbn, expected_version, changes dict) per book; fields from BATCH_EDIT_TYPES
+        library_id (int): Library the books are in, defaults to the session's
+        
+    Returns:
+        tuple: (status: str, message: str) with status one of the UPDATE_* values
+    """
+    edits = [(isbn, version, changes) for isbn, version, changes in edits if changes]
+    if not edits:
+        return UPDATE_UNCHANGED, "No changes to save"
+    fields = sorted({field for _, _, changes in edits for field in changes})
+    unknown = [field for field in fields if field not in BATCH_EDIT_TYPES]
+    if unknown:
+        return UPDATE_ERROR, f"Fields can't be batch edited: {', '.join(unknown)}"
+    
+    library_id = library_id or current_library_id()
+    journal = get_write_journal()
+    if journal:
+        from write_journal import JOURNAL_UPDATE
+        journal.append([(JOURNAL_UPDATE, library_id, isbn, changes, version) for isbn, version, changes in edits])
+        return UPDATE_OK, f"Saved changes to {len(edits)} books (syncing in the background)"
+    
+    from psycopg2.extras import execute_values
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Each field gets a flag column so rows only overwrite the fields they change
+        names = ["isbncode", "rowversion"] + [name for field in fields for name in (f"set_{field}", field)]
+        template = "(%s, %s::integer, " + ", ".join(f"%s::boolean, %s::{BATCH_EDIT_TYPES[field]}" for field in fields) + ")"
+        assignments = ", ".join(
+            f"{BOOK_COLUMNS[field]} = CASE WHEN v.set_{field} THEN v.{field} ELSE b.{BOOK_COLUMNS[field]} END"
+            for field in fields)
+        rows = [(isbn, version, *[value for field in fields for value in (field in changes, changes.get(field))])
+                for isbn, version, changes in edits]
+        updated = execute_values(cursor, f"""
+            UPDATE MyBooks AS b
+            SET {assignments},
+                LastModified = CURRENT_TIMESTAMP,
+                RowVersion = b.RowVersion + 1
+            FROM (VALUES %s) AS v ({', '.join(names)})
+            WHERE b.LibraryID = {int(library_id)} AND b.ISBNCode = v.isbncode
+              AND (v.rowversion IS NULL OR b.RowVersion = v.rowversion)
+            RETURNING b.ISBNCode, b.Title, b.Author
+        """, rows, template=template, page_size=len(rows), fetch=True)
         
-        return True, f"Successfully updated '{book_data.get('title')}'"
+        if len(updated) < len(edits):
+            conn.rollback()
+            stale = len(edits) - len(updated)
+            for isbn, _, _ in edits:
+                _book_cache.invalidate((library_id, isbn))
+            return UPDATE_CONFLICT, (f"{stale} of the {len(edits)} books changed or were deleted since you "
+                                     f"selected them; nothing was saved")
+        
+        # Work keys and author links follow title and author changes, as for single edits
+        changes_by_isbn = {isbn: changes for isbn, _, changes in edits}
+        update_title_links(cursor, library_id, [(isbn, title, author, changes_by_isbn[isbn])
+                                                for isbn, title, author in updated])
+        
+        conn.commit()
+        for isbn, _, _ in updated:
+            book_written(isbn, library_id)
+        return UPDATE_OK, f"Updated {len(updated)} book{'s' if len(updated) != 1 else ''}"
         
     except Exception as e:
-        return False, f"Error updating book: {str(e)}"
+        return UPDATE_ERROR, f"Error updating books: {str(e)}"
+    finally:
+        if conn:
+            conn.close()
+
+def update_title_links(cursor, library_id, books):
+    """
+    Bring work keys and author links in line with changed titles and authors, in the caller's transaction
+    
+    Args:
+        cursor: Open cursor on the caller's connection
+        library_id (int): Library the books are in
+        books (list): (isbn, title, author, changes) with the title and author
+            now stored; books whose changes touch neither are skipped
+    """
+    from psycopg2.extras import execute_values
+    from duplicates import work_key
+    retitled = [book for book in books if 'title' in book[3] or 'author' in book[3]]
+    if not retitled:
+        return
+    execute_values(cursor, f"""
+        UPDATE MyBooks AS b SET WorkKey = v.workkey
+        FROM (VALUES %s) AS v (isbncode, workkey)
+        WHERE b.LibraryID = {int(library_id)} AND b.ISBNCode = v.isbncode
+    """, [(isbn, work_key(title, author)) for isbn, title, author, _ in retitled])
+    for isbn, title, _, changes in retitled:
+        if 'author' in changes:
+            set_book_authors(cursor, library_id, isbn, title,
+                             author_names(changes, get_book_author_names(cursor, library_id, isbn)))
+        else:
+            cursor.execute("UPDATE BookAuthors SET SortTitle = %s WHERE LibraryID = %s AND ISBNCode = %s",
+                           ((title or '').lower(), library_id, isbn))
 
-def get_delete_pin():
+def get_delete_pin(library_id=None):
     """
-    Retrieve the deletion PIN from the Settings table
+    Retrieve a library's deletion PIN from the Settings table (keyed by LibraryID)
     
     Returns:
         str: The PIN as a string, or None if not found
     """
+    library_id = library_id or current_library_id()
     conn = None
     try:
         conn = get_db_connection_dict()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT PIN FROM Settings WHERE ID = %s", (1,))
+        cursor.execute("SELECT PIN FROM Settings WHERE ID = %s", (library_id,))
         result = cursor.fetchone()
         
         if result:
@@ -185,46 +1078,375 @@ def get_delete_pin():
         if conn:
             conn.close()
 
-def delete_book_from_database(isbn):
+def delete_book_from_database(isbn, library_id=None):
     """
     Permanently delete a book from the database using its ISBN
     This is a hard delete - the record is completely removed
     
     Args:
         isbn (str): The ISBN of the book to delete
+        library_id (int): Library the book is in, defaults to the session's
         
     Returns:
         tuple: (success: bool, message: str)
     """
+    library_id = library_id or current_library_id()
+    journal = get_write_journal()
+    if journal:
+        from write_journal import JOURNAL_DELETE
+        journal.append([(JOURNAL_DELETE, library_id, isbn, {}, None)])
+        return True, f"Deleted book {isbn} (syncing in the background)"
+    return remove_book(isbn, library_id)
+
+def remove_book(isbn, library_id):
+    """Delete a book and its author links from the database; returns (success, message)"""
     conn = None
     try:
         conn = get_db_connection_dict()
         cursor = conn.cursor()
         
-        # First get the book title for the confirmation message
-        cursor.execute("SELECT Title FROM MyBooks WHERE ISBNCode = %s", (isbn,))
-        result = cursor.fetchone()
+        # Delete the book and its author links, getting the title back for the message
+        cursor.execute("""
+            WITH deleted AS (
+                DELETE FROM MyBooks WHERE LibraryID = %s AND ISBNCode = %s RETURNING ISBNCode, Title
+            ), unlinked AS (
+                DELETE FROM BookAuthors WHERE LibraryID = %s AND ISBNCode IN (SELECT ISBNCode FROM deleted)
+            )
+            SELECT Title FROM deleted
+        """, (library_id, isbn, library_id))
+        rows = cursor.fetchall()
+        conn.commit()
         
-        if not result:
+        if not rows:
             return False, f"No book found with ISBN {isbn}"
         
-        book_title = result['title']
+        book_written(isbn, library_id)
+        return True, f"Successfully deleted '{rows[0]['title']}'"
+            
+    except Exception as e:
+        return False, f"Database error during deletion: {str(e)}"
+    finally:
+        if conn:
+            conn.close()
+
+def apply_journal_entries(entries):
+    """
+    Write journaled book changes to the database in order (runs on the journal's flusher thread)
+    
+    Consecutive adds to the same library go in as one batch. A write the
+    database rejects is reported as failed; if the database can't be
+    reached, ConnectionError stops the flush so the journal retries from
+    that entry.
+    
+    Args:
+        entries (list): Pending journal entries, oldest first
+        
+    Yields:
+        tuple: (seq, ok, message) for each entry written or rejected
+    """
+    from write_journal import JOURNAL_ADD, JOURNAL_UPDATE
+    
+    def rejected(message):
+        if not database_reachable():
+            raise ConnectionError(message)
+        return message
+    
+    def continues_batch(batch, position):
+        return (position < len(entries) and entries[position]['op'] == JOURNAL_ADD
+                and entries[position]['library_id'] == batch[0]['library_id'])
+    
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        if entry['op'] == JOURNAL_ADD:
+            batch = [entry]
+            while continues_batch(batch, i + len(batch)):
+                batch.append(entries[i + len(batch)])
+            try:
+                inserted = insert_books([item['payload'] for item in batch], entry['library_id'])
+            except Exception as e:
+                message = rejected(f"Database error: {str(e)}")
+                inserted = None
+            for position, item in enumerate(batch):
+                if inserted is None:
+                    yield item['seq'], False, message
+                elif inserted[position]:
+                    yield item['seq'], True, ""
+                else:
+                    yield item['seq'], False, f"Book with ISBN {item['isbn']} already exists in database"
+            i += len(batch)
+            continue
+        
+        if entry['op'] == JOURNAL_UPDATE:
+            status, message = write_book_fields(entry['isbn'], entry['payload'], entry['expected_version'],
+                                                entry['library_id'])
+            ok = status in (UPDATE_OK, UPDATE_UNCHANGED)
+            if status == UPDATE_ERROR:
+                message = rejected(message)
+        else:
+            ok, message = remove_book(entry['isbn'], entry['library_id'])
+            if not ok and message.startswith("Database error"):
+                message = rejected(message)
+        yield entry['seq'], ok, message
+        i += 1
+
+def find_possible_duplicates(book_data, library_id=None):
+    """
+    Find books already in the library that look like another edition of this one
+    
+    An indexed lookup on the book's work key (normalized title plus the
+    first author's surname); the full fuzzy check is duplicates.py.
+    
+    Returns:
+        list: Book dicts with a different ISBN but the same work key
+    """
+    from duplicates import work_key
+    library_id = library_id or current_library_id()
+    key = work_key(book_data.get('title'), book_data.get('author'))
+    if not key:
+        return []
+    conn = None
+    try:
+        conn = get_read_connection_dict(library_id)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM MyBooks
+            WHERE LibraryID = %s AND WorkKey = %s AND ISBNCode IS DISTINCT FROM %s
+            ORDER BY Title, ISBNCode
+        """, (library_id, key, book_data.get('isbncode')))
+        return [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Duplicate check failed: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def merge_duplicate_books(keep_isbn, duplicate_isbns, library_id=None):
+    """
+    Merge duplicate editions into the one being kept
+    
+    Fields the kept book is missing are filled from the duplicates, their
+    personal notes are appended to its notes, and the duplicates are
+    deleted - all in one transaction.
+    
+    Args:
+        keep_isbn (str): ISBN of the book to keep
+        duplicate_isbns (list): ISBNs of the books merged into it
+        library_id (int): Library the books are in, defaults to the session's
+        
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    duplicate_isbns = [isbn for isbn in duplicate_isbns if isbn != keep_isbn]
+    if not duplicate_isbns:
+        return False, "Select at least one duplicate to merge"
+    
+    library_id = library_id or current_library_id()
+    conn = None
+    try:
+        conn = get_db_connection_dict()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM MyBooks WHERE LibraryID = %s AND ISBNCode = ANY(%s) FOR UPDATE",
+                       (library_id, [keep_isbn] + duplicate_isbns))
+        rows = {row['isbncode']: dict(row) for row in cursor.fetchall()}
+        keeper = rows.get(keep_isbn)
+        if keeper is None:
+            return False, f"No book found with ISBN {keep_isbn}"
+        duplicates = [rows[isbn] for isbn in duplicate_isbns if isbn in rows]
         
-        # Permanently delete the book record
-        cursor.execute("DELETE FROM MyBooks WHERE ISBNCode = %s", (isbn,))
+        fills = {}
+        for field in BOOK_COLUMNS:
+            if field in ('isbncode', 'memo') or _comparable(keeper.get(field), field) is not None:
+                continue
+            for book in duplicates:
+                if _comparable(book.get(field), field) is not None:
+                    fills[field] = book.get(field)
+                    break
+        memos = [keeper.get('memo')] + [book.get('memo') for book in duplicates]
+        memos = list(dict.fromkeys(memo.strip() for memo in memos if memo and memo.strip()))
+        if "\n\n".join(memos) != (keeper.get('memo') or '').strip():
+            fills['memo'] = "\n\n".join(memos)
+        
+        if fills:
+            assignments = ", ".join(f"{BOOK_COLUMNS[field]} = %s" for field in fills)
+            cursor.execute(f"""
+                UPDATE MyBooks
+                SET {assignments}, LastModified = CURRENT_TIMESTAMP, RowVersion = RowVersion + 1
+                WHERE LibraryID = %s AND ISBNCode = %s
+            """, (*fills.values(), library_id, keep_isbn))
+            # A filled title or author needs its work key and author links, like any edit
+            merged_book = dict(keeper, **fills)
+            update_title_links(cursor, library_id,
+                               [(keep_isbn, merged_book.get('title'), merged_book.get('author'), fills)])
+        merged = [book['isbncode'] for book in duplicates]
+        cursor.execute("DELETE FROM BookAuthors WHERE LibraryID = %s AND ISBNCode = ANY(%s)", (library_id, merged))
+        cursor.execute("DELETE FROM MyBooks WHERE LibraryID = %s AND ISBNCode = ANY(%s)", (library_id, merged))
         conn.commit()
         
-        # Verify the book was actually deleted
-        cursor.execute("SELECT COUNT(*) FROM MyBooks WHERE ISBNCode = %s", (isbn,))
-        count = cursor.fetchone()[0]
+        for isbn in [keep_isbn] + merged:
+            book_written(isbn, library_id)
+        return True, f"Merged {len(merged)} duplicate{'s' if len(merged) != 1 else ''} into '{keeper.get('title')}'"
+    
+    except Exception as e:
+        return False, f"Database error during merge: {str(e)}"
+    finally:
+        if conn:
+            conn.close()
+
+def author_names(book_data, existing_names=None):
+    """
+    Work out the ordered author list to store for a book
+    
+    Uses book_data['authors'] when present; otherwise keeps any existing
+    co-authors and puts book_data['author'] first.
+    
+    Args:
+        book_data (dict): Book information
+        existing_names (list): Authors currently linked to the book
         
-        if count == 0:
-            return True, f"Successfully deleted '{book_title}'"
-        else:
-            return False, f"Failed to delete '{book_title}' - book still exists"
-            
+    Returns:
+        list: Author names, primary author first
+    """
+    names = list(book_data.get('authors') or existing_names or [])
+    author = (book_data.get('author') or '').strip()
+    if author:
+        names = [author] + [name for name in names[1:] if name.lower() != author.lower()]
+    elif names and not book_data.get('authors'):
+        names = names[1:]
+    return [name.strip() for name in names if name and name.strip()]
+
+def get_book_author_names(cursor, library_id, isbn):
+    """Return the names of a book's linked authors in credit order"""
+    cursor.execute("""
+        SELECT a.Name FROM BookAuthors ba
+        JOIN Authors a ON a.AuthorID = ba.AuthorID
+        WHERE ba.LibraryID = %s AND ba.ISBNCode = %s
+        ORDER BY ba.Position
+    """, (library_id, isbn))
+    return [row[0] if not isinstance(row, dict) else row['name'] for row in cursor.fetchall()]
+
+def set_book_authors(cursor, library_id, isbn, title, names):
+    """
+    Replace a book's author links inside the caller's transaction
+    
+    Authors are shared between libraries; the links belong to one.
+    
+    Args:
+        cursor: Open cursor on the caller's connection
+        library_id (int): Library the book is in
+        isbn (str): ISBN of the book
+        title (str): Book title, stored lower-cased for ordered browsing
+        names (list): Author names in credit order
+    """
+    cursor.execute("DELETE FROM BookAuthors WHERE LibraryID = %s AND ISBNCode = %s", (library_id, isbn))
+    for position, name in enumerate(names):
+        cursor.execute("""
+            INSERT INTO Authors (Name) VALUES (%s)
+            ON CONFLICT ((lower(Name))) DO UPDATE SET Name = Authors.Name
+            RETURNING AuthorID
+        """, (name,))
+        row = cursor.fetchone()
+        author_id = row[0] if not isinstance(row, dict) else row['authorid']
+        cursor.execute("""
+            INSERT INTO BookAuthors (LibraryID, ISBNCode, AuthorID, Position, SortTitle)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+        """, (library_id, isbn, author_id, position, (title or '').lower()))
+
+def get_book_authors(isbn, library_id=None):
+    """
+    Get the authors linked to a book
+    
+    Returns:
+        list: Dicts with authorid and name, in credit order
+    """
+    library_id = library_id or current_library_id()
+    conn = None
+    try:
+        conn = get_read_connection_dict(library_id)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT a.AuthorID, a.Name FROM BookAuthors ba
+            JOIN Authors a ON a.AuthorID = ba.AuthorID
+            WHERE ba.LibraryID = %s AND ba.ISBNCode = %s
+            ORDER BY ba.Position
+        """, (library_id, isbn))
+        return [dict(row) for row in cursor.fetchall()]
     except Exception as e:
-        return False, f"Database error during deletion: {str(e)}"
+        st.error(f"Database error: {e}")
+        return []
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+def search_authors(prefix, limit=50, library_id=None):
+    """
+    Find authors with books in the library whose name starts with prefix (case-insensitive)
+    
+    Returns:
+        list: Dicts with authorid, name and book_count, ordered by name
+    """
+    library_id = library_id or current_library_id()
+    conn = None
+    try:
+        conn = get_read_connection_dict(library_id)
+        cursor = conn.cursor()
+        pattern = prefix.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        cursor.execute("""
+            SELECT * FROM (
+                SELECT a.AuthorID, a.Name,
+                       (SELECT COUNT(*) FROM BookAuthors ba
+                        WHERE ba.LibraryID = %s AND ba.AuthorID = a.AuthorID) AS book_count
+                FROM Authors a
+                WHERE lower(a.Name) LIKE %s
+            ) matches
+            WHERE book_count > 0
+            ORDER BY lower(Name)
+            LIMIT %s
+        """, (library_id, pattern, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        st.error(f"Database error: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def get_books_by_author(author_id, after=None, limit=24, library_id=None):
+    """
+    Get one page of an author's books, ordered by title
+    
+    Pages are read with a range scan on the (LibraryID, AuthorID, SortTitle,
+    ISBNCode) index, continuing after the last row of the previous page.
+    
+    Args:
+        author_id (int): Author to browse
+        after (tuple): (sorttitle, isbncode) of the previous page's last book, or None
+        limit (int): Page size
+        library_id (int): Library to browse, defaults to the session's
+        
+    Returns:
+        list: Book dicts with an extra sorttitle key
+    """
+    library_id = library_id or current_library_id()
+    conn = None
+    try:
+        conn = get_read_connection_dict(library_id)
+        cursor = conn.cursor()
+        after_title, after_isbn = after if after else ('', '')
+        cursor.execute("""
+            SELECT b.*, ba.SortTitle
+            FROM BookAuthors ba
+            JOIN MyBooks b ON b.LibraryID = ba.LibraryID AND b.ISBNCode = ba.ISBNCode
+            WHERE ba.LibraryID = %s AND ba.AuthorID = %s AND (ba.SortTitle, ba.ISBNCode) > (%s, %s)
+            ORDER BY ba.SortTitle, ba.ISBNCode
+            LIMIT %s
+        """, (library_id, author_id, after_title, after_isbn, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        st.error(f"Database error: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,156 @@
+"""
+Duplicate edition detection for Personal Library Management System
+Groups books into blocks and compares only books that share a block
+
+Usage:
+    python duplicates.py
+"""
+
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+from search_index import trigrams
+
+# Title trigram overlap (Jaccard) above which two books by the same author are the same work
+DUPLICATE_SIMILARITY = 0.6
+
+# MinHash signature as BANDS bands of ROWS values; books whose titles share a
+# band land in the same block, which catches titles with a Jaccard
+# similarity above roughly (1 / BANDS) ** (1 / ROWS)
+MINHASH_BANDS = 8
+MINHASH_ROWS = 4
+
+# Blocks this big are stop-word titles ("poems", "works") rather than duplicates
+MAX_BLOCK_SIZE = 100
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(20240601)
+_HASH_A = _rng.randint(1, 1 << 31, size=MINHASH_BANDS * MINHASH_ROWS).astype(np.uint64)
+_HASH_B = _rng.randint(0, 1 << 31, size=MINHASH_BANDS * MINHASH_ROWS).astype(np.uint64)
+
+_EDITION_RE = re.compile(
+    r"\b(\d+(st|nd|rd|th)|revised|expanded|illustrated|annotated|anniversary|deluxe|collector'?s|"
+    r"unabridged|abridged|mass market|paperback|hardcover|large print|edition|ed|a novel)\b")
+_NON_WORD_RE = re.compile(r"[^a-z0-9 ]+")
+
+def normalize_title(title):
+    """
+    Reduce a title to the part that names the work
+
+    Drops subtitles, bracketed edition notes, edition/format words and a
+    leading article, so different editions of a book normalize alike.
+    """
+    title = title.lower() if isinstance(title, str) else ''
+    title = re.split(r"[:;]| - |\(|\[", title)[0]
+    title = _NON_WORD_RE.sub(' ', title.replace('&', ' and '))
+    title = _EDITION_RE.sub(' ', title)
+    words = title.split()
+    if len(words) > 1 and words[0] in ('the', 'a', 'an'):
+        words = words[1:]
+    return ' '.join(words)
+
+def author_surname(author):
+    """Lower-cased surname of the first credited author ("Tolkien, J.R.R." and "J.R.R. Tolkien" alike)"""
+    first = re.split(r";| and | & ", author if isinstance(author, str) else '')[0].strip()
+    if ',' in first:
+        surname = first.split(',')[0]
+    else:
+        words = first.split()
+        surname = words[-1] if words else ''
+    return _NON_WORD_RE.sub('', surname.lower())
+
+def work_key(title, author):
+    """Exact blocking key stored in MyBooks.WorkKey, or None for an untitled book"""
+    normalized = normalize_title(title)
+    if not normalized:
+        return None
+    return f"{normalized}|{author_surname(author)}"
+
+def minhash_signature(text):
+    """MinHash of a string's trigram set, or None if it has no trigrams"""
+    grams = trigrams(text)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+    return ((np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+def title_similarity(title_a, title_b):
+    """Jaccard similarity of two normalized titles' trigram sets"""
+    grams_a, grams_b = trigrams(title_a), trigrams(title_b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+def blocking_keys(book):
+    """Every block a book belongs to: its work key plus one per MinHash band (per author)"""
+    title = normalize_title(book.get('title'))
+    if not title:
+        return []
+    surname = author_surname(book.get('author'))
+    keys = [('work', f"{title}|{surname}")]
+    signature = minhash_signature(title)
+    if signature is not None:
+        for band in range(MINHASH_BANDS):
+            rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+            keys.append(('band', surname, band, rows.tobytes()))
+    return keys
+
+def find_duplicate_groups(books, threshold=DUPLICATE_SIMILARITY):
+    """
+    Group books that look like editions of the same work
+
+    Each book is compared only with books sharing one of its blocks, so
+    the work grows with the catalog size rather than its square.
+
+    Args:
+        books (list): Book dicts with isbncode, title and author
+        threshold (float): Minimum title similarity within a block
+
+    Returns:
+        list: Groups of ISBNs (two or more each), largest first
+    """
+    blocks = defaultdict(list)
+    titles = []
+    for i, book in enumerate(books):
+        titles.append(normalize_title(book.get('title')))
+        for key in blocking_keys(book):
+            blocks[key].append(i)
+
+    # Union-find over the matching pairs
+    parent = list(range(len(books)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    compared = set()
+    for key, members in blocks.items():
+        if len(members) < 2 or (key[0] == 'band' and len(members) > MAX_BLOCK_SIZE):
+            continue
+        for a_pos, a in enumerate(members):
+            for b in members[a_pos + 1:]:
+                if (a, b) in compared or books[a].get('isbncode') == books[b].get('isbncode'):
+                    continue
+                compared.add((a, b))
+                if key[0] == 'work' or title_similarity(titles[a], titles[b]) >= threshold:
+                    parent[find(a)] = find(b)
+
+    groups = defaultdict(list)
+    for i in range(len(books)):
+        groups[find(i)].append(books[i].get('isbncode'))
+    return sorted((group for group in groups.values() if len(group) > 1), key=len, reverse=True)
+
+if __name__ == "__main__":
+    from database import get_all_books
+    books_df = get_all_books()
+    books = books_df[['isbncode', 'title', 'author']].to_dict('records')
+    by_isbn = {book['isbncode']: book for book in books}
+    groups = find_duplicate_groups(books)
+    for group in groups:
+        print(f"{len(group)} editions:")
+        for isbn in group:
+            print(f"    {isbn}  {by_isbn[isbn]['title']} — {by_isbn[isbn]['author']}")
+    print(f"{len(groups)} likely duplicate groups in {len(books)} books")
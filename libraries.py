@@ -0,0 +1,26 @@
+"""
+Library administration for Personal Library Management System
+Lists libraries and adds new ones, each with its own deletion PIN
+
+Usage:
+    python libraries.py
+    python libraries.py add "Grandma's Books" --pin 4321
+"""
+
+import argparse
+from database import get_libraries, create_library
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List or add libraries")
+    subcommands = parser.add_subparsers(dest='command')
+    add = subcommands.add_parser('add', help="add a library")
+    add.add_argument('name', help="library name")
+    add.add_argument('--pin', required=True, help="PIN for deleting and merging books in this library")
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        library_id = create_library(args.name, args.pin)
+        print(f"Added library {library_id}: {args.name} (open with ?library={library_id})")
+    else:
+        for library in get_libraries():
+            print(f"{library['libraryid']:>4}  {library['name']}")
@@ -0,0 +1,323 @@
+"""
+Schema migrations for Personal Library Management System
+Applies pending migrations in order and records them in SchemaMigrations
+
+Usage:
+    python migrations.py
+"""
+
+from database import get_db_connection, SORT_ORDERS
+
+def create_base_tables(cursor):
+    """
+    Original MyBooks and Settings tables, for setting up a fresh (e.g. local) database
+
+    Not a migration: run_migrations creates them (if missing) before
+    applying any, as the first migrations already expect them.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MyBooks (
+            Title TEXT,
+            Subtitle TEXT,
+            Author TEXT,
+            ISBNCode TEXT,
+            Publisher TEXT,
+            PublishedDate TEXT,
+            Length INTEGER,
+            Memo TEXT,
+            Rating NUMERIC(2, 1),
+            Description TEXT,
+            ImageURL TEXT,
+            Excerpt TEXT,
+            DateAdded TIMESTAMP,
+            LastModified TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Settings (
+            ID INTEGER PRIMARY KEY,
+            PIN TEXT NOT NULL
+        )
+    """)
+
+def create_authors_tables(cursor):
+    """Normalized authors with an indexed book-author join table, backfilled from MyBooks.Author"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Authors (
+            AuthorID SERIAL PRIMARY KEY,
+            Name TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS authors_name_key ON Authors (lower(Name))")
+    cursor.execute("CREATE INDEX IF NOT EXISTS authors_name_prefix_idx ON Authors (lower(Name) text_pattern_ops)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS BookAuthors (
+            ISBNCode TEXT NOT NULL,
+            AuthorID INTEGER NOT NULL REFERENCES Authors (AuthorID),
+            Position SMALLINT NOT NULL DEFAULT 0,
+            SortTitle TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (ISBNCode, AuthorID)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS bookauthors_author_title_idx
+        ON BookAuthors (AuthorID, SortTitle, ISBNCode)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS mybooks_isbncode_idx ON MyBooks (ISBNCode)")
+
+    # Existing rows only ever stored the first author
+    cursor.execute("""
+        INSERT INTO Authors (Name)
+        SELECT DISTINCT ON (lower(btrim(Author))) btrim(Author)
+        FROM MyBooks
+        WHERE btrim(coalesce(Author, '')) <> ''
+        ON CONFLICT DO NOTHING
+    """)
+    cursor.execute("""
+        INSERT INTO BookAuthors (ISBNCode, AuthorID, Position, SortTitle)
+        SELECT b.ISBNCode, a.AuthorID, 0, lower(coalesce(b.Title, ''))
+        FROM MyBooks b
+        JOIN Authors a ON lower(a.Name) = lower(btrim(b.Author))
+        WHERE b.ISBNCode IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+def backfill_book_authors(cursor):
+    """Link books that have no author links yet to their MyBooks.Author"""
+    # Existing rows only ever stored the first author
+    cursor.execute("""
+        INSERT INTO Authors (Name)
+        SELECT DISTINCT ON (lower(btrim(Author))) btrim(Author)
+        FROM MyBooks
+        WHERE btrim(coalesce(Author, '')) <> ''
+        ON CONFLICT DO NOTHING
+    """)
+    cursor.execute("""
+        INSERT INTO BookAuthors (LibraryID, ISBNCode, AuthorID, Position, SortTitle)
+        SELECT b.LibraryID, b.ISBNCode, a.AuthorID, 0, lower(coalesce(b.Title, ''))
+        FROM MyBooks b
+        JOIN Authors a ON lower(a.Name) = lower(btrim(b.Author))
+        WHERE b.ISBNCode IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM BookAuthors x
+                          WHERE x.LibraryID = b.LibraryID AND x.ISBNCode = b.ISBNCode)
+        ON CONFLICT DO NOTHING
+    """)
+
+def add_row_version(cursor):
+    """Row version counter used for optimistic concurrency on edits"""
+    cursor.execute("ALTER TABLE MyBooks ADD COLUMN IF NOT EXISTS RowVersion INTEGER NOT NULL DEFAULT 1")
+
+def create_sort_indexes(cursor):
+    """Composite (sort keys..., ISBNCode) indexes backing each keyset-paginated sort order"""
+    for order in SORT_ORDERS.values():
+        columns = ", ".join(f"({expr})" for expr, _ in order['keys'])
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {order['index']} ON MyBooks ({columns}, ISBNCode)")
+
+def add_work_keys(cursor):
+    """Indexed WorkKey (normalized title + first author's surname) for duplicate-edition checks"""
+    cursor.execute("ALTER TABLE MyBooks ADD COLUMN IF NOT EXISTS WorkKey TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS mybooks_workkey_idx ON MyBooks (WorkKey)")
+    backfill_work_keys(cursor)
+
+def backfill_work_keys(cursor):
+    """Compute WorkKey for books that don't have one yet"""
+    from psycopg2.extras import execute_values
+    from duplicates import work_key
+    cursor.execute("SELECT ID, Title, Author FROM MyBooks WHERE WorkKey IS NULL")
+    keys = [(book_id, work_key(title, author)) for book_id, title, author in cursor.fetchall()]
+    execute_values(cursor, """
+        UPDATE MyBooks SET WorkKey = v.WorkKey
+        FROM (VALUES %s) AS v (ID, WorkKey)
+        WHERE MyBooks.ID = v.ID
+    """, [(book_id, key) for book_id, key in keys if key], page_size=1000)
+
+def add_libraries(cursor):
+    """
+    Libraries table, with every book, author link and index scoped by LibraryID
+    
+    Existing books become library 1, whose PIN is the existing Settings row
+    (Settings.ID is the LibraryID). Each index leads with LibraryID so a
+    library's queries read only its own range.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Libraries (
+            LibraryID SERIAL PRIMARY KEY,
+            Name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("INSERT INTO Libraries (LibraryID, Name) VALUES (1, 'My Library') ON CONFLICT DO NOTHING")
+    cursor.execute("SELECT setval(pg_get_serial_sequence('libraries', 'libraryid'), (SELECT MAX(LibraryID) FROM Libraries))")
+    for table in ("MyBooks", "BookAuthors"):
+        cursor.execute(f"""
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS
+            LibraryID INTEGER NOT NULL DEFAULT 1 REFERENCES Libraries (LibraryID)
+        """)
+    
+    # The same ISBN can be in two libraries
+    cursor.execute("ALTER TABLE BookAuthors DROP CONSTRAINT IF EXISTS bookauthors_pkey")
+    cursor.execute("ALTER TABLE BookAuthors ADD PRIMARY KEY (LibraryID, ISBNCode, AuthorID)")
+    cursor.execute("DROP INDEX IF EXISTS bookauthors_author_title_idx")
+    cursor.execute("""
+        CREATE INDEX bookauthors_author_title_idx
+        ON BookAuthors (LibraryID, AuthorID, SortTitle, ISBNCode)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS mybooks_isbncode_idx")
+    cursor.execute("CREATE INDEX mybooks_isbncode_idx ON MyBooks (LibraryID, ISBNCode)")
+    cursor.execute("DROP INDEX IF EXISTS mybooks_workkey_idx")
+    cursor.execute("CREATE INDEX mybooks_workkey_idx ON MyBooks (LibraryID, WorkKey)")
+    for order in SORT_ORDERS.values():
+        columns = ", ".join(f"({expr})" for expr, _ in order['keys'])
+        cursor.execute(f"DROP INDEX IF EXISTS {order['index']}")
+        cursor.execute(f"CREATE INDEX {order['index']} ON MyBooks (LibraryID, {columns}, ISBNCode)")
+    backfill_book_authors(cursor)
+
+def create_cover_status(cursor):
+    """Result of the last cover URL check per book (see cover_health.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS CoverStatus (
+            LibraryID INTEGER NOT NULL REFERENCES Libraries (LibraryID),
+            ISBNCode TEXT NOT NULL,
+            ImageURL TEXT NOT NULL,
+            Status TEXT NOT NULL,
+            HTTPStatus SMALLINT,
+            ContentHash TEXT,
+            ContentLength INTEGER,
+            CheckedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (LibraryID, ISBNCode)
+        )
+    """)
+
+def add_change_seq(cursor):
+    """
+    Change counter for incremental catalog refreshes (see catalog_store.py)
+    
+    Every insert and update stamps the row with the next value of a shared
+    sequence, and every delete leaves a tombstone with one, so a library's
+    changes since a watermark are an index range scan. Writers of a library
+    take a transaction lock before stamping, so its stamps are handed out
+    in commit order and a reader never sees a later stamp before an earlier one.
+    """
+    cursor.execute("CREATE SEQUENCE IF NOT EXISTS mybooks_change_seq")
+    cursor.execute("""
+        ALTER TABLE MyBooks ADD COLUMN IF NOT EXISTS
+        ChangeSeq BIGINT NOT NULL DEFAULT nextval('mybooks_change_seq')
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS mybooks_changeseq_idx ON MyBooks (LibraryID, ChangeSeq)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS BookDeletions (
+            ID INTEGER NOT NULL,
+            LibraryID INTEGER NOT NULL,
+            ChangeSeq BIGINT NOT NULL,
+            DeletedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS bookdeletions_changeseq_idx ON BookDeletions (LibraryID, ChangeSeq)")
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION mybooks_stamp_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('mybooks_change_seq'), COALESCE(NEW.LibraryID, OLD.LibraryID));
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO BookDeletions (ID, LibraryID, ChangeSeq)
+                VALUES (OLD.ID, OLD.LibraryID, nextval('mybooks_change_seq'));
+                RETURN OLD;
+            END IF;
+            NEW.ChangeSeq := nextval('mybooks_change_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("DROP TRIGGER IF EXISTS mybooks_change_trigger ON MyBooks")
+    cursor.execute("""
+        CREATE TRIGGER mybooks_change_trigger
+        BEFORE INSERT OR UPDATE OR DELETE ON MyBooks
+        FOR EACH ROW EXECUTE FUNCTION mybooks_stamp_change()
+    """)
+
+def add_book_ids(cursor):
+    """
+    Surrogate MyBooks.ID, numbering existing rows
+
+    ISBNCode isn't unique, so row bookkeeping (work key backfill, deletion
+    tombstones, the catalog store) needs a key of its own. Databases whose
+    MyBooks already has an ID keep it.
+    """
+    cursor.execute("ALTER TABLE MyBooks ADD COLUMN IF NOT EXISTS ID SERIAL")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS mybooks_id_key ON MyBooks (ID)")
+
+def rebuild_sort_indexes(cursor):
+    """Recreate the sort order indexes for the case-folded Title and Author keys"""
+    for order in SORT_ORDERS.values():
+        columns = ", ".join(f"({expr})" for expr, _ in order['keys'])
+        cursor.execute(f"DROP INDEX IF EXISTS {order['index']}")
+        cursor.execute(f"CREATE INDEX {order['index']} ON MyBooks (LibraryID, {columns}, ISBNCode)")
+
+# Ordered list of (name, migration function); append new migrations at the end
+MIGRATIONS = [
+    ("0001_authors", create_authors_tables),
+    ("0002_row_version", add_row_version),
+    ("0003_sort_indexes", create_sort_indexes),
+    ("0004_work_keys", add_work_keys),
+    ("0005_libraries", add_libraries),
+    ("0006_cover_status", create_cover_status),
+    ("0007_change_seq", add_change_seq),
+    ("0008_book_ids", add_book_ids),
+    ("0009_folded_sort_keys", rebuild_sort_indexes),
+]
+
+# Migrations that must be applied before others listed ahead of them
+MIGRATION_REQUIRES = {
+    "0004_work_keys": ["0008_book_ids"],
+    "0007_change_seq": ["0008_book_ids"],
+}
+
+def run_migrations():
+    """
+    Apply every migration not yet recorded in SchemaMigrations
+
+    Each migration runs in its own transaction, in list order except that
+    a migration's MIGRATION_REQUIRES are applied first.
+
+    Returns:
+        list: Names of the migrations applied
+    """
+    conn = get_db_connection()
+    applied_now = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS SchemaMigrations (
+                Name TEXT PRIMARY KEY,
+                AppliedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        create_base_tables(cursor)
+        cursor.execute("SELECT Name FROM SchemaMigrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        conn.commit()
+
+        migrations = dict(MIGRATIONS)
+
+        def apply(name):
+            if name in applied:
+                return
+            for required in MIGRATION_REQUIRES.get(name, []):
+                apply(required)
+            migrations[name](cursor)
+            cursor.execute("INSERT INTO SchemaMigrations (Name) VALUES (%s)", (name,))
+            conn.commit()
+            applied.add(name)
+            applied_now.append(name)
+
+        for name, _ in MIGRATIONS:
+            apply(name)
+    finally:
+        conn.close()
+    return applied_now
+
+if __name__ == "__main__":
+    applied = run_migrations()
+    if applied:
+        for name in applied:
+            print(f"Applied {name}")
+    else:
+        print("Database schema is up to date")
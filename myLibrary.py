@@ -1,10 +1,14 @@
 #!Python 3
 
 import streamlit as st
-import sqlite3
 import pandas as pd
-from database import get_db_connection, get_all_books
-from pages.view_library import display_books_with_images, display_books_table, filter_books
+from database import (get_all_books, get_books_keyset, sort_key, count_books, get_book_position, SORT_ORDERS,
+                      get_write_journal, pending_writes, get_libraries, current_library_id, get_bad_covers)
+from cover_health import start_cover_checker
+from covers import cached_cover_index
+from page_loader import load_page_data
+from pages.view_library import display_books_with_images, display_books_table, filter_books, sort_books
+from profiler import profile_rerun
 
 # Page configuration
 st.set_page_config(page_title="Personal Library", page_icon="📚", layout="wide")
@@ -26,98 +30,323 @@ div[data-testid="stSidebarNav"] {display: none;}
 def main():
     st.title("📚 My Library")
     
+    start_cover_checker()
+    
     # Sidebar
+    choose_library()
     if st.sidebar.button("Add Book", use_container_width=True):
         st.switch_page("pages/add_book.py")
+    if st.sidebar.button("Scan Books", use_container_width=True):
+        st.switch_page("pages/scan_books.py")
+    if st.sidebar.button("Browse by Author", use_container_width=True):
+        st.switch_page("pages/browse_author.py")
+    if st.sidebar.button("Find Duplicates", use_container_width=True):
+        st.switch_page("pages/find_duplicates.py")
+    if get_write_journal():
+        with st.sidebar:
+            show_sync_status()
+    
+    # Capture return position state before widgets modify session state
+    returning_view_mode = st.session_state.get('return_view_mode', None)
+    returning_isbn = st.session_state.get('return_book_isbn', None)
+    show_book_first = st.session_state.pop('show_book_first', None)
+    # Restore view mode from session state if returning
+    if returning_view_mode:
+        st.session_state.library_show_images = returning_view_mode == 'card'
+    elif 'library_show_images' not in st.session_state:
+        st.session_state.library_show_images = True
+    # Picked up (once) by the results, so fragment reruns don't jump back to it
+    if show_book_first or returning_isbn:
+        st.session_state.library_jump_isbn = show_book_first or returning_isbn
+    
+    show_library_results()
+    
+    # Clear return state AFTER everything is displayed and widgets have used the values
+    for key in ['return_view_mode', 'return_selected_idx', 'return_book_isbn']:
+        if key in st.session_state:
+            del st.session_state[key]
+
+@st.fragment
+def show_library_results():
+    """
+    Search controls and the results they select
+    
+    A fragment: changing a control reruns only the controls and results,
+    not the sidebar. The results grid is a fragment of its own inside it,
+    so paging and the card buttons rerun just the grid.
+    """
+    # Compact search and display options in one row
+    col1, col2, col_fuzzy, col3, col_sort, col4 = st.columns([3, 1, 1, 1, 1, 1])
     
-    ## Get books
-    books_df = get_all_books()
+    with col1:
+        search_term = st.text_input("Search:", placeholder="Enter search term...", label_visibility="collapsed",
+                                    key='library_search')
+    with col2:
+        search_field = st.selectbox("In:", ["All", "Title", "Author", "ISBN"], label_visibility="collapsed",
+                                    key='library_search_field')
+    with col_fuzzy:
+        fuzzy_search = st.checkbox("Fuzzy", value=False, help="Match despite typos, best matches first",
+                                   key='library_fuzzy')
+    with col3:
+        show_images = st.checkbox("Images", key='library_show_images')
+    with col_sort:
+        sort = st.selectbox("Sort:", list(SORT_ORDERS), key='library_sort', label_visibility="visible")
+    with col4:
+        books_per_page_option = st.selectbox("Per page:", [25, 50, 100, "All"], index=1, label_visibility="visible",
+                                             key='library_per_page')
+    
+    # Searching and "All" need the whole catalog; plain browsing only loads
+    # the current page, and jumps to a book with a keyset seek
+    if search_term or books_per_page_option == "All":
+        show_catalog_results((search_term, search_field, fuzzy_search, sort), show_images, books_per_page_option)
+    else:
+        start_library_pages(sort, books_per_page_option, st.session_state.pop('library_jump_isbn', None))
+        show_paged_results(show_images, books_per_page_option, sort)
+
+# Session state that belongs to one library and is dropped when switching
+LIBRARY_SESSION_KEYS = ['library_pages', 'library_page_context', 'duplicate_groups', 'book_duplicates', 'batch_edit_isbns',
+                        'library_results', 'library_jump_isbn', 'library_page_number',
+                        'return_view_mode', 'return_selected_idx', 'return_book_isbn']
+
+def switch_library():
+    """Callback for the library picker: work in the chosen library from now on"""
+    st.session_state.library_id = st.session_state.library_choice
+    for key in LIBRARY_SESSION_KEYS:
+        st.session_state.pop(key, None)
+
+def choose_library():
+    """Pick the session's library: ?library=<id> on first load, then the sidebar picker"""
+    libraries = {library['libraryid']: library['name'] for library in get_libraries()}
+    if 'library_id' not in st.session_state:
+        requested = st.query_params.get('library', '')
+        if requested.isdigit() and int(requested) in libraries:
+            st.session_state.library_id = int(requested)
+    if len(libraries) > 1:
+        ids = list(libraries)
+        current = current_library_id()
+        st.sidebar.selectbox("Library:", ids, format_func=libraries.get, key='library_choice',
+                             index=ids.index(current) if current in ids else 0, on_change=switch_library)
+
+@st.fragment(run_every=5)
+def show_sync_status():
+    """Changes still waiting in the local write journal, and any the database rejected"""
+    journal = get_write_journal()
+    pending = len(pending_writes())
+    if pending:
+        st.info(f"⏳ {pending} change{'s' if pending != 1 else ''} waiting to sync")
+        if journal.last_error:
+            st.caption(f"Database unavailable, retrying: {journal.last_error}")
+            st.button("Retry Now", on_click=journal.retry_now, use_container_width=True)
+    for entry in journal.failed():
+        if entry['library_id'] != current_library_id():
+            continue
+        title = entry['payload'].get('title') or entry['isbn']
+        st.error(f"Could not {entry['op']} '{title}': {entry['message']}")
+        st.button("Dismiss", key=f"dismiss_journal_{entry['seq']}", on_click=journal.dismiss,
+                  args=(entry['seq'],), use_container_width=True)
+
+def display_page(df_page, show_images, covers, bad_covers):
+    """Display one page of books in the selected view mode"""
+    if show_images:
+        display_books_with_images(df_page, covers=covers, bad_covers=bad_covers)
+    else:
+        display_books_table(df_page)
+
+def show_load_problem(data):
+    """Explain which parts of the page could not be loaded in time"""
+    missing = data.timed_out + list(data.failed)
+    st.warning(f"The library is taking longer than usual to load ({', '.join(missing)}).")
+    st.button("Retry")
+
+def next_library_page(last_key, position):
+    """Push the page that follows the row with the given sort key"""
+    st.session_state.library_pages.append({'after': last_key, 'position': position})
+
+def previous_library_page(first_key, position, books_per_page):
+    """Go back a page: pop the cursor stack, or seek backwards from the first row shown"""
+    pages = st.session_state.library_pages
+    if len(pages) > 1:
+        pages.pop()
+    elif position is not None and position <= books_per_page:
+        pages[:] = [{'position': 0}]
+    else:
+        previous = None if position is None else position - books_per_page
+        pages[:] = [{'before': first_key, 'position': previous}]
+
+def start_library_pages(sort, books_per_page, jump_isbn):
+    """Reset the page stack when the library, order or page size changed, or start it at a book"""
+    # Pages are a stack of keyset cursors; changing the library, order or page size starts over
+    context = (current_library_id(), sort, books_per_page)
+    if st.session_state.get('library_page_context') != context:
+        st.session_state.library_page_context = context
+        st.session_state.library_pages = [{'position': 0}]
+    # Start the page at the book we are showing or returning to
+    if jump_isbn:
+        st.session_state.library_pages = [{'start_at': jump_isbn, 'position': None}]
+
+def load_library_page(cursor, sort, books_per_page):
+    """Load the page a cursor points at, the total count and cover availability - concurrently"""
+    # One extra row tells whether there is a page beyond this one
+    tasks = {
+        'rows': lambda: get_books_keyset(sort, after=cursor.get('after'), before=cursor.get('before'),
+                                         start_at=cursor.get('start_at'), limit=books_per_page + 1),
+        'count': count_books,
+        'covers': cached_cover_index,
+        'bad_covers': get_bad_covers,
+    }
+    if cursor.get('start_at') and cursor.get('position') is None:
+        tasks['position'] = lambda: get_book_position(cursor['start_at'], sort)
+    data = load_page_data(tasks)
+    if 'position' in data:
+        cursor['position'] = data.get('position')
+    return data
+
+@st.fragment
+def show_paged_results(show_images, books_per_page, sort):
+    """Show the current page of the library, with paging buttons"""
+    pages = st.session_state.library_pages
+    cursor = pages[-1]
+    data = load_library_page(cursor, sort, books_per_page)
+    if 'rows' in data and data.get('rows').empty and (len(pages) > 1 or cursor.get('position') != 0):
+        # The page no longer exists (books deleted, or the book we jumped to is gone):
+        # show the first page instead, in this run - this may be a full-app run
+        pages[:] = [{'position': 0}]
+        cursor = pages[-1]
+        data = load_library_page(cursor, sort, books_per_page)
+    if 'rows' not in data:
+        show_load_problem(data)
+        return
     
+    df_page = data.get('rows')
+    total_books = data.get('count')
+    position = cursor.get('position')
+    
+    if df_page.empty:
+        st.warning("No books found in database.")
+        return
+    
+    if cursor.get('before'):
+        # Backward pages carry their extra row at the front
+        has_next = True
+        has_previous = len(df_page) > books_per_page
+        df_page = df_page.iloc[-books_per_page:]
+        if not has_previous:
+            position = cursor['position'] = 0
+    else:
+        has_next = len(df_page) > books_per_page
+        df_page = df_page.iloc[:books_per_page]
+        has_previous = len(pages) > 1 or position != 0
+    df_page = df_page.reset_index(drop=True)
+    
+    of_total = f" of {total_books}" if total_books is not None else ""
+    if position is not None:
+        st.caption(f"Showing books {position + 1}-{position + len(df_page)}{of_total}")
+    else:
+        st.caption(f"Showing {len(df_page)} books{of_total}")
+    
+    if has_previous or has_next:
+        col_prev, col_next, _ = st.columns([1, 1, 6])
+        with col_prev:
+            st.button("◀ Previous", disabled=not has_previous, use_container_width=True,
+                      on_click=previous_library_page,
+                      args=(sort_key(df_page.iloc[0], sort), position, books_per_page))
+        with col_next:
+            st.button("Next ▶", disabled=not has_next, use_container_width=True,
+                      on_click=next_library_page,
+                      args=(sort_key(df_page.iloc[-1], sort),
+                            None if position is None else position + len(df_page)))
+    
+    display_page(df_page, show_images, data.get('covers', {}), data.get('bad_covers'))
+
+def catalog_token(books_df):
+    """Fingerprint of a loaded catalog, telling whether result positions saved for it still apply"""
+    columns = [col for col in ['isbncode', 'title', 'author'] if col in books_df.columns]
+    return len(books_df), int(pd.util.hash_pandas_object(books_df[columns], index=False).sum())
+
+def search_positions(books_df, search):
+    """Positions in the catalog of the books a search selects, in display order"""
+    search_term, search_field, fuzzy_search, sort = search
+    filtered_df = filter_books(books_df, search_term, search_field, fuzzy=fuzzy_search)
+    # Fuzzy matches stay in relevance order
+    if not (fuzzy_search and search_term and search_field != "ISBN"):
+        filtered_df = sort_books(filtered_df, sort)
+    return filtered_df.index.to_numpy()
+
+@st.fragment
+def show_catalog_results(search, show_images, books_per_page_option):
+    """
+    Load the whole catalog (and cover availability, concurrently) and show one page of a search
+    
+    Only the positions of the matching rows are kept in the session, for
+    the search and catalog they were computed from; the catalog itself is
+    read again on each run (mapped from the shared store with
+    CATALOG_LOADER=store), never copied into the session. Paging and the
+    table selection rerun just this fragment.
+    """
+    data = load_page_data({
+        'books': get_all_books,
+        'covers': cached_cover_index,
+        'bad_covers': get_bad_covers,
+    })
+    if 'books' not in data:
+        show_load_problem(data)
+        return
+    books_df = data.get('books')
     if books_df.empty:
         st.warning("No books found in database.")
+        return
+    # Index labels must be catalog positions
+    if not books_df.index.equals(pd.RangeIndex(len(books_df))):
+        books_df = books_df.reset_index(drop=True)
+    
+    key = (current_library_id(), search)
+    token = catalog_token(books_df)
+    results = st.session_state.get('library_results')
+    if not results or results['key'] != key or results['token'] != token:
+        # A different search starts on its first page
+        if not results or results['key'] != key:
+            st.session_state.library_page_number = 1
+        results = st.session_state.library_results = {
+            'key': key, 'token': token, 'positions': search_positions(books_df, search),
+        }
+    positions = results['positions']
+    
+    if not len(positions):
+        st.info("No books match your search.")
+        return
+    
+    # Handle "All" option for books per page
+    books_per_page = len(positions) if books_per_page_option == "All" else books_per_page_option
+    total_books = len(positions)
+    total_pages = (total_books - 1) // books_per_page + 1
+    
+    # Open the page of the book we are returning to (once - later fragment runs keep their page)
+    jump_isbn = st.session_state.pop('library_jump_isbn', None)
+    if jump_isbn:
+        matches = (books_df['isbncode'].iloc[positions] == jump_isbn).fillna(False).to_numpy()
+        if matches.any():
+            st.session_state.library_page_number = int(matches.argmax()) // books_per_page + 1
+    
+    if total_pages > 1:
+        if not 1 <= st.session_state.get('library_page_number', 1) <= total_pages:
+            st.session_state.library_page_number = 1
+        col_page, _ = st.columns([1, 6])
+        with col_page:
+            page_num = st.selectbox("Page:", range(1, total_pages + 1), key='library_page_number')
     else:
-        # Check if we need to show a specific book first (from Add/Edit/View)
-        if 'show_book_first' in st.session_state:
-            target_isbn = st.session_state.show_book_first
-            # Rotate the dataframe to start at the target book
-            target_idx = books_df[books_df['isbncode'] == target_isbn].index
-            if len(target_idx) > 0:
-                idx = target_idx[0]
-                books_df = pd.concat([books_df.iloc[idx:], books_df.iloc[:idx]]).reset_index(drop=True)
-            # Clear the flag after using it
-            del st.session_state.show_book_first
-
-        # Capture return position state before widgets modify session state
-        returning_view_mode = st.session_state.get('return_view_mode', None)
-        returning_isbn = st.session_state.get('return_book_isbn', None)
-        
-        # Compact search and display options in one row
-        col1, col2, col3, col4, col5 = st.columns([3, 1, 1, 1, 1])
-        
-        with col1:
-            search_term = st.text_input("Search:", placeholder="Enter search term...", label_visibility="collapsed")
-        with col2:
-            search_field = st.selectbox("In:", ["All", "Title", "Author", "ISBN"], label_visibility="collapsed")
-        with col3:
-            # Restore view mode from session state if returning
-            default_show_images = (returning_view_mode == 'card') if returning_view_mode else True
-            show_images = st.checkbox("Images", value=default_show_images)
-        with col4:
-            books_per_page_option = st.selectbox("Per page:", [25, 50, 100, "All"], index=1, label_visibility="visible")
-        
-        # Filter books
-        filtered_df = filter_books(books_df, search_term, search_field)
-        
-        if filtered_df.empty:
-            st.info("No books match your search.")
-        else:
-            # Handle "All" option for books per page
-            books_per_page = len(filtered_df) if books_per_page_option == "All" else books_per_page_option
-            
-            # Calculate pagination
-            total_books = len(filtered_df)
-            total_pages = (total_books - 1) // books_per_page + 1
-            
-            # Calculate default page if returning to a specific book
-            default_page_idx = 0
-            if returning_isbn:
-                try:
-                    # Find book position in filtered results
-                    book_rows = filtered_df[filtered_df['isbncode'] == returning_isbn]
-                    if not book_rows.empty:
-                        # Get the position in filtered dataframe
-                        book_position = filtered_df.index.get_loc(book_rows.index[0])
-                        # Calculate which page this book is on (0-indexed)
-                        default_page_idx = book_position // books_per_page
-                except:
-                    default_page_idx = 0
-            
-            # Page selector in col5
-            if total_pages > 1:
-                with col5:
-                    page_num = st.selectbox("Page:", range(1, total_pages + 1), index=default_page_idx, label_visibility="visible")
-            else:
-                page_num = 1
-            
-            # Calculate page slice
-            start_idx = (page_num - 1) * books_per_page
-            end_idx = min(start_idx + books_per_page, total_books)
-            
-            # Show book count
-            st.caption(f"Showing books {start_idx + 1}-{end_idx} of {total_books}")
-            
-            # Display books for current page
-            df_page = filtered_df.iloc[start_idx:end_idx]
-            
-            if show_images:
-                display_books_with_images(df_page, returning_isbn)
-            else:
-                display_books_table(df_page, returning_isbn)
-        
-        # Clear return state AFTER everything is displayed and widgets have used the values
-        for key in ['return_view_mode', 'return_selected_idx', 'return_book_isbn']:
-            if key in st.session_state:
-                del st.session_state[key]
+        page_num = 1
+    
+    # Calculate page slice
+    start_idx = (page_num - 1) * books_per_page
+    end_idx = min(start_idx + books_per_page, total_books)
+    
+    # Show book count
+    st.caption(f"Showing books {start_idx + 1}-{end_idx} of {total_books}")
+    
+    # Display books for current page
+    df_page = books_df.iloc[positions[start_idx:end_idx]].reset_index(drop=True)
+    display_page(df_page, show_images, data.get('covers', {}), data.get('bad_covers'))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profile_rerun("library"):
+        main()
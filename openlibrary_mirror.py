@@ -0,0 +1,271 @@
+"""
+Offline OpenLibrary mirror for Personal Library Management System
+Imports an OpenLibrary editions dump into a local SQLite file and looks up books in it by ISBN
+
+With OPENLIBRARY_MIRROR_PATH set, lookup_book takes OpenLibrary's part of a
+lookup from the mirror instead of the network; other providers are still
+queried for the fields OpenLibrary lacks. Editions are keyed by every ISBN-10 and ISBN-13 they
+list, so a lookup is one primary-key probe. Both the bulk dumps
+(ol_dump_editions_*.txt.gz: type, key, revision, last modified, JSON per
+line) and JSONL with one edition per line are read, plain or gzipped.
+Loading the authors dump as well gives the mirror author names; without
+it the edition's "by" statement is used.
+
+The dump is streamed and written in batches, so memory stays flat however
+large it is. Only the fields lookups use are kept.
+
+Usage:
+    python openlibrary_mirror.py import ol_dump_editions.txt.gz [ol_dump_authors.txt.gz ...]
+    python openlibrary_mirror.py lookup <isbn>
+"""
+
+import re
+import gzip
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from app_config import get_setting
+
+OPENLIBRARY_MIRROR_PATH = get_setting('OPENLIBRARY_MIRROR_PATH')
+
+IMPORT_BATCH_SIZE = int(get_setting('OPENLIBRARY_MIRROR_BATCH_SIZE', '10000'))
+
+COVER_URL = "https://covers.openlibrary.org/b/id/{cover_id}-{size}.jpg"
+
+# Edition fields kept in the mirror
+EDITION_FIELDS = ['title', 'subtitle', 'publishers', 'publish_date', 'number_of_pages', 'pagination', 'by_statement']
+
+def isbn_variants(isbn):
+    """
+    The ISBN-13 and ISBN-10 forms of an ISBN, as far as they exist
+
+    Returns:
+        list: Normalized ISBNs (digits and a trailing X), the given form first
+    """
+    isbn = re.sub(r'[^0-9X]', '', (isbn or '').upper())
+    variants = [isbn] if len(isbn) in (10, 13) else []
+    if len(isbn) == 10 and isbn[:9].isdigit():
+        core = '978' + isbn[:9]
+        check = (10 - sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core)) % 10) % 10
+        variants.append(f"{core}{check}")
+    elif len(isbn) == 13 and isbn.startswith('978') and isbn.isdigit():
+        core = isbn[3:12]
+        check = (11 - sum(int(d) * (10 - i) for i, d in enumerate(core)) % 11) % 11
+        variants.append(core + ('X' if check == 10 else str(check)))
+    return variants
+
+def connect(path=None, readonly=False):
+    """Open the mirror, creating its tables when writing"""
+    path = path or OPENLIBRARY_MIRROR_PATH
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Editions (
+            EditionKey TEXT PRIMARY KEY,
+            Data TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS EditionISBNs (
+            ISBN TEXT PRIMARY KEY,
+            EditionKey TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Authors (
+            AuthorKey TEXT PRIMARY KEY,
+            Name TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.commit()
+    return conn
+
+def dump_records(path):
+    """Stream the JSON records of a dump file (tab-separated or JSONL, optionally gzipped)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            # Bulk dumps carry the JSON in their last column
+            if not line.startswith('{'):
+                line = line.split('\t', 4)[-1]
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def edition_row(record):
+    """
+    Trim an edition record to what lookups use
+
+    Returns:
+        tuple: (edition key, JSON data, ISBNs), or None for a record without ISBNs
+    """
+    isbns = set()
+    for field in ('isbn_10', 'isbn_13'):
+        for value in record.get(field) or []:
+            if isinstance(value, str):
+                isbns.update(isbn_variants(value)[:1])
+    if not isbns or not record.get('key'):
+        return None
+    data = {field: record[field] for field in EDITION_FIELDS if record.get(field)}
+    data['authors'] = [author.get('key') or (author.get('author') or {}).get('key')
+                       for author in record.get('authors') or [] if isinstance(author, dict)]
+    covers = [cover_id for cover_id in record.get('covers') or [] if isinstance(cover_id, int) and cover_id > 0]
+    if covers:
+        data['cover_id'] = covers[0]
+    excerpts = [excerpt.get('excerpt') for excerpt in record.get('excerpts') or []
+                if isinstance(excerpt, dict) and isinstance(excerpt.get('excerpt'), str)]
+    if excerpts:
+        data['excerpt'] = excerpts[0]
+    return record['key'], json.dumps(data, separators=(',', ':')), isbns
+
+def import_dump(path, mirror_path=None, progress=None):
+    """
+    Stream a dump into the mirror, replacing editions and authors already there
+
+    Args:
+        path (str): Editions or authors dump
+        mirror_path (str): Mirror file, defaults to OPENLIBRARY_MIRROR_PATH
+        progress (callable): Called with the running counts after each batch
+
+    Returns:
+        dict: Number of editions, ISBNs and authors written
+    """
+    counts = {'editions': 0, 'isbns': 0, 'authors': 0}
+    conn = connect(mirror_path)
+    try:
+        # The mirror can be rebuilt from the dump, so favour import speed over durability
+        conn.execute("PRAGMA synchronous=OFF")
+        editions, isbns, authors = [], [], []
+
+        def flush():
+            conn.executemany("INSERT OR REPLACE INTO Editions (EditionKey, Data) VALUES (?, ?)", editions)
+            conn.executemany("INSERT OR REPLACE INTO EditionISBNs (ISBN, EditionKey) VALUES (?, ?)", isbns)
+            conn.executemany("INSERT OR REPLACE INTO Authors (AuthorKey, Name) VALUES (?, ?)", authors)
+            conn.commit()
+            counts['editions'] += len(editions)
+            counts['isbns'] += len(isbns)
+            counts['authors'] += len(authors)
+            editions.clear()
+            isbns.clear()
+            authors.clear()
+            if progress:
+                progress(counts)
+
+        for record in dump_records(path):
+            record_type = (record.get('type') or {}).get('key')
+            if record_type == '/type/author':
+                if record.get('key') and isinstance(record.get('name'), str):
+                    authors.append((record['key'], record['name']))
+            elif record_type in ('/type/edition', None):
+                row = edition_row(record)
+                if row:
+                    editions.append(row[:2])
+                    isbns.extend((isbn, row[0]) for isbn in row[2])
+            if len(editions) + len(authors) >= IMPORT_BATCH_SIZE:
+                flush()
+        flush()
+    finally:
+        conn.close()
+    return counts
+
+def book_data(conn, data):
+    """Build an OpenLibrary API-shaped record (as api_calls.extract_book_fields reads) from a mirrored edition"""
+    names = {}
+    keys = [key for key in data.get('authors') or [] if key]
+    if keys:
+        rows = conn.execute(f"SELECT AuthorKey, Name FROM Authors WHERE AuthorKey IN ({', '.join('?' * len(keys))})",
+                            keys).fetchall()
+        names = dict(rows)
+    authors = [{'name': names[key]} for key in keys if key in names]
+    if not authors and data.get('by_statement'):
+        authors = [{'name': re.sub(r'^by\s+', '', data['by_statement'].strip(' .'), flags=re.IGNORECASE)}]
+    book = {
+        'title': data.get('title'),
+        'subtitle': data.get('subtitle'),
+        'authors': authors,
+        'publishers': [{'name': name} for name in data.get('publishers') or [] if isinstance(name, str)],
+        'publish_date': data.get('publish_date'),
+        'number_of_pages': data.get('number_of_pages'),
+        'pagination': data.get('pagination'),
+    }
+    if data.get('cover_id'):
+        book['cover'] = {name: COVER_URL.format(cover_id=data['cover_id'], size=size)
+                         for name, size in (('small', 'S'), ('medium', 'M'), ('large', 'L'))}
+    if data.get('excerpt'):
+        book['excerpts'] = [{'text': data['excerpt']}]
+    return book
+
+class OpenLibraryMirror:
+    """Read-only lookups in a mirror file, one SQLite connection per thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        if not hasattr(self._local, 'conn'):
+            self._local.conn = connect(self.path, readonly=True)
+        return self._local.conn
+
+    def lookup(self, isbn):
+        """
+        Find an edition by ISBN-10 or ISBN-13
+
+        Returns:
+            dict: OpenLibrary API-shaped book data, or None if the mirror doesn't have it
+        """
+        variants = isbn_variants(isbn)
+        if not variants:
+            return None
+        conn = self._conn()
+        row = conn.execute(f"""
+            SELECT e.Data FROM EditionISBNs i JOIN Editions e ON e.EditionKey = i.EditionKey
+            WHERE i.ISBN IN ({', '.join('?' * len(variants))})
+            LIMIT 1
+        """, variants).fetchone()
+        return book_data(conn, json.loads(row[0])) if row else None
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+def get_mirror():
+    """The process's mirror, or None when OPENLIBRARY_MIRROR_PATH isn't set"""
+    global _mirror
+    if not OPENLIBRARY_MIRROR_PATH:
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = OpenLibraryMirror(OPENLIBRARY_MIRROR_PATH)
+    return _mirror
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the offline OpenLibrary mirror")
+    parser.add_argument('--mirror', default=OPENLIBRARY_MIRROR_PATH, help="mirror file (OPENLIBRARY_MIRROR_PATH)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="stream dump files into the mirror")
+    import_parser.add_argument('dumps', nargs='+', help="editions and authors dumps (.txt, .jsonl, optionally .gz)")
+    lookup_parser = commands.add_parser('lookup', help="look up an ISBN in the mirror")
+    lookup_parser.add_argument('isbn')
+    args = parser.parse_args()
+    if not args.mirror:
+        parser.error("set OPENLIBRARY_MIRROR_PATH or pass --mirror")
+
+    if args.command == 'import':
+        for dump in args.dumps:
+            started = time.perf_counter()
+            counts = import_dump(dump, args.mirror, progress=lambda counts: print(
+                f"\r{counts['editions']} editions, {counts['isbns']} ISBNs, {counts['authors']} authors",
+                end='', flush=True))
+            print(f"\n{dump}: done in {time.perf_counter() - started:.0f}s")
+    else:
+        from api_calls import extract_book_fields
+        data = OpenLibraryMirror(args.mirror).lookup(args.isbn)
+        print(json.dumps(extract_book_fields(data, args.isbn), indent=2) if data else "Not in mirror")
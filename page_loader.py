@@ -0,0 +1,70 @@
+"""
+Concurrent page data loader for Personal Library Management System
+Runs a page's independent reads in parallel under a latency budget
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from app_config import get_setting
+
+# Seconds a page waits for its reads before rendering with what it has
+PAGE_LOAD_BUDGET = float(get_setting('PAGE_LOAD_BUDGET_SECONDS', '5'))
+
+_loader_pool = ThreadPoolExecutor(max_workers=int(get_setting('PAGE_LOADER_WORKERS', '8')),
+                                  thread_name_prefix="page-loader")
+
+class PageData:
+    """Results of a page load; parts that timed out or failed are simply absent"""
+
+    def __init__(self, results, timed_out, failed):
+        self.results = results
+        self.timed_out = timed_out
+        self.failed = failed
+
+    def __contains__(self, name):
+        return name in self.results
+
+    def get(self, name, default=None):
+        return self.results.get(name, default)
+
+    @property
+    def complete(self):
+        return not self.timed_out and not self.failed
+
+def _run_with_context(task, ctx):
+    """Run a task on a pool thread attached to the calling script run, so st.* calls work"""
+    if ctx is not None:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), ctx)
+    return task()
+
+def load_page_data(tasks, budget=None):
+    """
+    Run independent page reads concurrently and collect their results
+
+    Reads still running when the budget runs out are left to finish in the
+    background and reported as timed out, so the page can render the
+    parts it has and degrade gracefully for the rest.
+
+    Args:
+        tasks (dict): Part name -> zero-argument callable
+        budget (float): Seconds to wait, defaults to PAGE_LOAD_BUDGET
+
+    Returns:
+        PageData: Results by part name, plus timed out and failed part names
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    budget = PAGE_LOAD_BUDGET if budget is None else budget
+
+    futures = {_loader_pool.submit(_run_with_context, task, ctx): name for name, task in tasks.items()}
+    done, pending = wait(futures, timeout=budget)
+
+    results, failed = {}, {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            print(f"Page data '{futures[future]}' failed: {e}")
+            failed[futures[future]] = e
+    return PageData(results, [futures[future] for future in pending], failed)
@@ -2,11 +2,15 @@ import streamlit as st
 import sys
 import os
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add parent directory to path for imports (once - pages rerun on every interaction)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
 
 from api_calls import get_openlibrary_book_data
-from database import add_book_to_database, get_book_by_isbn, update_book_in_database
+from database import add_book_to_database, get_book_by_isbn, update_book_in_database, find_possible_duplicates
+from profiler import profile_rerun
+from autocomplete import autocomplete_input
 
 # Hide auto-generated page navigation
 st.markdown("""
@@ -78,6 +82,7 @@ def show_add_book_page():
             if book_data:
                 st.success("Book found!")
                 st.session_state.book_data = book_data
+                st.session_state.book_duplicates = find_possible_duplicates(book_data)
             else:
                 st.error("Book not found. Please check the ISBN or enter manually.")
         else:
@@ -94,6 +99,10 @@ def show_book_review_form(book_data, edit_mode=False):
         st.subheader("Edit Book Information")
     else:
         st.subheader("Review Book Information")
+        # Another edition or format of the same work may already be on the shelf
+        if st.session_state.get('book_duplicates'):
+            editions = ", ".join(f"'{book['title']}' ({book['isbncode']})" for book in st.session_state.book_duplicates)
+            st.warning(f"You may already have this book in another edition: {editions}")
     
     # Callback function that runs BEFORE the rerun
     def save_book_callback():
@@ -102,6 +111,7 @@ def show_book_review_form(book_data, edit_mode=False):
             'title': st.session_state.form_title,
             'subtitle': st.session_state.form_subtitle if st.session_state.form_subtitle else None,
             'author': st.session_state.form_author,
+            'authors': book_data.get('authors'),
             'isbncode': st.session_state.form_isbn,
             'publisher': st.session_state.form_publisher if st.session_state.form_publisher else None,
             'publisheddate': st.session_state.form_published_date if st.session_state.form_published_date else None,
@@ -115,7 +125,7 @@ def show_book_review_form(book_data, edit_mode=False):
         
         # Save to database - check if update or add
         if edit_mode:
-            success, message = update_book_in_database(updated_book_data)
+            success, message = update_book_in_database(updated_book_data, original=book_data)
         else:
             success, message = add_book_to_database(updated_book_data)
         
@@ -134,14 +144,20 @@ def show_book_review_form(book_data, edit_mode=False):
             if 'edit_isbn' in st.session_state:
                 del st.session_state.edit_isbn
     
+    # Author and publisher suggest names already in the library; they sit outside the
+    # form because a form doesn't send what is typed until it is submitted
+    col1, col2 = st.columns(2)
+    with col1:
+        autocomplete_input("Author:", 'author', book_data.get('author'), 'form_author')
+    with col2:
+        autocomplete_input("Publisher:", 'publisher', book_data.get('publisher'), 'form_publisher')
+    
     with st.form("book_review_form"):
         col1, col2 = st.columns(2)
         
         with col1:
             st.text_input("Book Title:", value=book_data.get('title', ''), key='form_title')
-            st.text_input("Author:", value=book_data.get('author', ''), key='form_author') 
             st.text_input("ISBN:", value=book_data.get('isbncode', ''), key='form_isbn')
-            st.text_input("Publisher:", value=book_data.get('publisher', ''), key='form_publisher')
             
         with col2:
             st.text_input("Subtitle:", value=book_data.get('subtitle', ''), key='form_subtitle')
@@ -182,13 +198,15 @@ def show_book_review_form(book_data, edit_mode=False):
             if not edit_mode:
                 # Callback functions for navigation
                 def go_to_library():
-                    if 'book_data' in st.session_state:
-                        del st.session_state.book_data
+                    for key in ['book_data', 'book_duplicates']:
+                        if key in st.session_state:
+                            del st.session_state[key]
                     st.session_state.navigate_to_library = True
                 
                 def add_another():
-                    if 'book_data' in st.session_state:
-                        del st.session_state.book_data
+                    for key in ['book_data', 'book_duplicates']:
+                        if key in st.session_state:
+                            del st.session_state[key]
                     # Clear show_book_first so it doesn't interfere with next add
                     if 'show_book_first' in st.session_state:
                         del st.session_state.show_book_first
@@ -212,4 +230,5 @@ def show_book_review_form(book_data, edit_mode=False):
 
 # Run the page
 if __name__ == "__main__":
-    show_add_book_page()
\ No newline at end of file
+    with profile_rerun("add_book"):
+        show_add_book_page()
\ No newline at end of file
@@ -0,0 +1,187 @@
+import streamlit as st
+import sys
+import os
+import re
+
+# Add parent directory to path for imports (once - pages rerun on every interaction)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import pandas as pd
+from database import (get_books_by_isbns, update_books_batch, changed_fields, get_delete_pin,
+                      BATCH_EDIT_TYPES, UPDATE_OK, UPDATE_UNCHANGED)
+from profiler import profile_rerun
+
+# Hide auto-generated page navigation
+st.markdown("""
+<style>
+div[data-testid="stSidebarNav"] {display: none;}
+div.block-container {padding-top: 1rem;}
+</style>
+""", unsafe_allow_html=True)
+
+# Batch operations
+ACTION_SET = "Set to"
+ACTION_REPLACE = "Find and replace"
+ACTION_CLEAR = "Clear"
+
+FIELD_LABELS = {
+    'title': "Title",
+    'subtitle': "Subtitle",
+    'author': "Author",
+    'publisher': "Publisher",
+    'publisheddate': "Publication Date",
+    'length': "Pages",
+    'memo': "Personal Notes",
+    'rating': "Rating",
+}
+
+def parse_value(field, text):
+    """Convert a typed value to the field's type; raises ValueError with a message for the user"""
+    text = (text or '').strip()
+    if not text:
+        return None
+    if BATCH_EDIT_TYPES[field] == 'integer':
+        if not text.isdigit():
+            raise ValueError(f"{FIELD_LABELS[field]} must be a whole number")
+        return int(text)
+    if field == 'rating':
+        try:
+            rating = float(text)
+        except ValueError:
+            rating = -1
+        if not 0 <= rating <= 5 or rating * 2 != int(rating * 2):
+            raise ValueError("Rating must be 0 to 5 in steps of 0.5")
+        return rating
+    return text
+
+def apply_operation(value, field, action, find, replacement):
+    """New value of one field after an operation"""
+    if action == ACTION_CLEAR:
+        return None
+    if action == ACTION_SET:
+        return parse_value(field, replacement)
+    if BATCH_EDIT_TYPES[field] != 'text':
+        raise ValueError(f"Find and replace only works on text fields, not {FIELD_LABELS[field]}")
+    if not find:
+        raise ValueError("Enter the text to find")
+    if not isinstance(value, str):
+        return value
+    # Case-insensitive, with the replacement taken literally
+    return re.sub(re.escape(find), lambda match: replacement or '', value, flags=re.IGNORECASE) or None
+
+def batch_changes(books, operations):
+    """
+    Work out each book's changes
+
+    Args:
+        books (list): Book dicts as loaded
+        operations (list): (field, action, find, replacement) tuples, applied in order
+
+    Returns:
+        list: (book, changes dict) for the books that would change
+    """
+    edits = []
+    for book in books:
+        edited = dict(book)
+        for field, action, find, replacement in operations:
+            edited[field] = apply_operation(edited.get(field), field, action, find, replacement)
+        changes = changed_fields(book, {field: edited.get(field) for field in BATCH_EDIT_TYPES})
+        if changes:
+            edits.append((book, changes))
+    return edits
+
+def show_preview(edits):
+    """Table of every field that will change, before and after"""
+    rows = [{'Title': book.get('title'), 'ISBN': book.get('isbncode'), 'Field': FIELD_LABELS[field],
+             'Before': "" if book.get(field) is None else str(book.get(field)),
+             'After': "" if value is None else str(value)}
+            for book, changes in edits for field, value in changes.items()]
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+def leave_batch_edit():
+    for key in ['batch_edit_isbns', 'batch_operations', 'batch_edit_message']:
+        if key in st.session_state:
+            del st.session_state[key]
+
+def show_batch_edit_page():
+    """Change fields across the books selected in the table view, in one PIN-confirmed save"""
+
+    st.title("Batch Edit")
+
+    if st.sidebar.button("Return to Library", use_container_width=True):
+        leave_batch_edit()
+        st.switch_page("myLibrary.py")
+
+    if 'batch_edit_message' in st.session_state:
+        success, message = st.session_state.batch_edit_message
+        (st.success if success else st.error)(message)
+        del st.session_state.batch_edit_message
+
+    isbns = st.session_state.get('batch_edit_isbns')
+    if not isbns:
+        st.info("Select books in the library's table view (turn off Images), then choose Batch Edit.")
+        return
+
+    books = get_books_by_isbns(isbns)
+    if not books:
+        st.error("None of the selected books were found")
+        return
+    with st.expander(f"{len(books)} selected book{'s' if len(books) != 1 else ''}"):
+        st.dataframe(pd.DataFrame([{'Title': book.get('title'), 'Author': book.get('author'),
+                                    'Publisher': book.get('publisher'), 'Rating': book.get('rating')}
+                                   for book in books]),
+                     use_container_width=True, hide_index=True)
+
+    st.subheader("Changes")
+    st.caption("Operations apply in order to every selected book. Find and replace ignores case.")
+    operations_df = st.data_editor(
+        pd.DataFrame([{'field': 'publisher', 'action': ACTION_SET, 'find': "", 'value': ""}]),
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        key='batch_operations',
+        column_config={
+            'field': st.column_config.SelectboxColumn("Field", options=list(BATCH_EDIT_TYPES), required=True),
+            'action': st.column_config.SelectboxColumn("Action", options=[ACTION_SET, ACTION_REPLACE, ACTION_CLEAR],
+                                                       required=True),
+            'find': st.column_config.TextColumn("Find"),
+            'value': st.column_config.TextColumn("New value / replace with"),
+        },
+    )
+    operations = [(row['field'], row['action'], row['find'] if isinstance(row['find'], str) else "",
+                   row['value'] if isinstance(row['value'], str) else "")
+                  for row in operations_df.to_dict('records') if row['field'] and row['action']]
+
+    try:
+        edits = batch_changes(books, operations)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    if not edits:
+        st.info("These changes don't alter any of the selected books.")
+        return
+
+    st.subheader("Preview")
+    st.caption(f"{len(edits)} of {len(books)} books will change")
+    show_preview(edits)
+
+    pin_input = st.text_input("Enter PIN to confirm changes:", type="password", key='batch_pin')
+    if st.button(f"Apply to {len(edits)} Book{'s' if len(edits) != 1 else ''}", type="primary"):
+        if not pin_input:
+            st.error("Please enter PIN to confirm changes")
+        elif pin_input != get_delete_pin():
+            st.error("Incorrect PIN")
+        else:
+            status, message = update_books_batch([(book['isbncode'], book.get('rowversion'), changes)
+                                                  for book, changes in edits])
+            st.session_state.batch_edit_message = (status in (UPDATE_OK, UPDATE_UNCHANGED), message)
+            if status == UPDATE_OK:
+                del st.session_state.batch_operations
+            st.rerun()
+
+# Run the page
+if __name__ == "__main__":
+    with profile_rerun("batch_edit"):
+        show_batch_edit_page()
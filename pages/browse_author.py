@@ -0,0 +1,91 @@
+import streamlit as st
+import sys
+import os
+
+# Add parent directory to path for imports (once - pages rerun on every interaction)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from database import search_authors, get_books_by_author, get_bad_covers
+from profiler import profile_rerun
+from pages.view_library import display_books_with_images
+
+# Hide auto-generated page navigation
+st.markdown("""
+<style>
+div[data-testid="stSidebarNav"] {display: none;}
+div.block-container {padding-top: 1rem;}
+</style>
+""", unsafe_allow_html=True)
+
+BOOKS_PER_PAGE = 24
+
+def reset_author_paging():
+    """Start browsing from the first page of the selected author"""
+    st.session_state.browse_author_cursors = [None]
+
+def show_browse_author_page():
+    """Display the Browse by Author page"""
+
+    st.title("Browse by Author")
+
+    if st.sidebar.button("Return to Library", use_container_width=True):
+        for key in ['browse_author_id', 'browse_author_name', 'browse_author_cursors']:
+            if key in st.session_state:
+                del st.session_state[key]
+        st.switch_page("myLibrary.py")
+
+    # Author lookup - prefilled when arriving from a book's "More by" link
+    prefix = st.text_input("Author name starts with:", value=st.session_state.get('browse_author_name', ''),
+                           placeholder="Tolkien")
+    authors = search_authors(prefix) if prefix else []
+
+    if not authors and 'browse_author_id' not in st.session_state:
+        if prefix:
+            st.info("No authors match that name.")
+        return
+
+    if authors:
+        author_ids = [a['authorid'] for a in authors]
+        labels = {a['authorid']: f"{a['name']} ({a['book_count']})" for a in authors}
+        current_id = st.session_state.get('browse_author_id')
+        selected_id = st.selectbox("Author:", author_ids, format_func=labels.get,
+                                   index=author_ids.index(current_id) if current_id in author_ids else 0)
+        if selected_id != current_id:
+            st.session_state.browse_author_id = selected_id
+            reset_author_paging()
+
+    if 'browse_author_cursors' not in st.session_state:
+        reset_author_paging()
+
+    # Each page starts after the last (sorttitle, isbncode) of the previous one
+    cursors = st.session_state.browse_author_cursors
+    books = get_books_by_author(st.session_state.browse_author_id, after=cursors[-1], limit=BOOKS_PER_PAGE + 1)
+    has_next = len(books) > BOOKS_PER_PAGE
+    books = books[:BOOKS_PER_PAGE]
+
+    if not books:
+        st.info("No books found for this author.")
+        return
+
+    page_number = len(cursors)
+    st.caption(f"Page {page_number}")
+    import pandas as pd
+    display_books_with_images(pd.DataFrame(books), bad_covers=get_bad_covers())
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if page_number > 1 and st.button("◀ Previous", use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if has_next and st.button("Next ▶", use_container_width=True):
+            last = books[-1]
+            cursors.append((last['sorttitle'], last['isbncode']))
+            st.rerun()
+
+# Run the page
+if __name__ == "__main__":
+    with profile_rerun("browse_author"):
+        show_browse_author_page()
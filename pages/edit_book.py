@@ -2,11 +2,17 @@ import streamlit as st
 import sys
 import os
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add parent directory to path for imports (once - pages rerun on every interaction)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
 
-from api_calls import get_openlibrary_book_data
-from database import get_book_by_isbn, update_book_in_database, delete_book_from_database, get_delete_pin
+from database import (get_book_by_isbn, delete_book_from_database, get_delete_pin,
+                      save_book_changes, update_book_fields, changed_fields,
+                      UPDATE_OK, UPDATE_UNCHANGED, UPDATE_CONFLICT)
+from page_loader import load_page_data
+from profiler import profile_rerun
+from autocomplete import autocomplete_input
 
 # # Hide auto-generated page navigation and Streamlit UI elements
 st.markdown("""
@@ -38,6 +44,10 @@ def show_edit_book_page():
             del st.session_state.save_success
         if 'save_message' in st.session_state:
             del st.session_state.save_message
+        if 'save_conflict' in st.session_state:
+            del st.session_state.save_conflict
+        if 'edit_pin' in st.session_state:
+            del st.session_state.edit_pin
         st.switch_page("myLibrary.py")
 
     # Check if we just completed an update
@@ -46,7 +56,7 @@ def show_edit_book_page():
         st.info("Book successfully updated! You can return to the library to see your changes.")
         if st.button("Return to Library"):
             # Clear ALL edit-related state
-            for key in ['save_success', 'save_message', 'edit_isbn', 'edit_book_data']:
+            for key in ['save_success', 'save_message', 'save_conflict', 'edit_isbn', 'edit_book_data', 'edit_pin']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.switch_page("myLibrary.py")
@@ -67,7 +77,22 @@ def show_edit_book_page():
         if st.session_state.edit_book_data.get('isbncode') != isbn:
             del st.session_state.edit_book_data
     
-    book_data = get_book_by_isbn(isbn)
+    # The loaded copy lives in session state, so widget reruns don't re-read it
+    if 'edit_book_data' in st.session_state:
+        book_data = st.session_state.edit_book_data
+    else:
+        # Fetch the book and the confirmation PIN together
+        data = load_page_data({
+            'book': lambda: get_book_by_isbn(isbn),
+            'pin': get_delete_pin,
+        })
+        if 'book' not in data:
+            st.warning("The book is taking longer than usual to load.")
+            st.button("Retry")
+            return
+        book_data = data.get('book')
+        if data.get('pin'):
+            st.session_state.edit_pin = data.get('pin')
     
     if not book_data:
         st.error(f"Book with ISBN {isbn} not found in database")
@@ -121,12 +146,15 @@ def show_edit_form(book_data):
             'excerpt': st.session_state.form_excerpt if st.session_state.form_excerpt else None
         }
         
-        # Update in database
-        success, message = update_book_in_database(updated_book_data)
+        # Update in database - only changed fields, rejected if someone else saved first
+        status, message = save_book_changes(book_data, updated_book_data)
+        success = status in (UPDATE_OK, UPDATE_UNCHANGED)
         
         # Store results in session state for display after rerun
         st.session_state.save_success = success
         st.session_state.save_message = message
+        if status == UPDATE_CONFLICT:
+            st.session_state.save_conflict = updated_book_data
         
         # Store ISBN to show book at top of library when returning
         if success:
@@ -141,14 +169,20 @@ def show_edit_form(book_data):
         """Callback that runs when Delete Book button is clicked"""
         st.session_state.show_delete_confirm = True
     
+    # Author and publisher suggest names already in the library; they sit outside the
+    # form because a form doesn't send what is typed until it is submitted
+    col1, col2 = st.columns(2)
+    with col1:
+        autocomplete_input("Author:", 'author', book_data.get('author'), 'form_author')
+    with col2:
+        autocomplete_input("Publisher:", 'publisher', book_data.get('publisher'), 'form_publisher')
+    
     with st.form("book_edit_form"):
         col1, col2 = st.columns(2)
         
         with col1:
             st.text_input("Book Title:", value=book_data.get('title', ''), key='form_title')
-            st.text_input("Author:", value=book_data.get('author', ''), key='form_author') 
             st.text_input("ISBN:", value=book_data.get('isbncode', ''), key='form_isbn')
-            st.text_input("Publisher:", value=book_data.get('publisher', ''), key='form_publisher')
             
         with col2:
             st.text_input("Subtitle:", value=book_data.get('subtitle', ''), key='form_subtitle')
@@ -204,7 +238,7 @@ def show_edit_form(book_data):
                 if not pin_input:
                     st.error("Please enter PIN to confirm update")
                 else:
-                    correct_pin = get_delete_pin()
+                    correct_pin = st.session_state.get('edit_pin') or get_delete_pin()
                     
                     if pin_input == correct_pin:
                         update_book_callback()
@@ -240,7 +274,7 @@ def show_edit_form(book_data):
                 if not pin_input:
                     st.error("Please enter PIN to confirm deletion")
                 else:
-                    correct_pin = get_delete_pin()
+                    correct_pin = st.session_state.get('edit_pin') or get_delete_pin()
                     
                     if pin_input == correct_pin:
                         isbn = st.session_state.edit_isbn
@@ -258,12 +292,17 @@ def show_edit_form(book_data):
                 st.session_state.show_delete_confirm = False
                 st.rerun()
 
+    # Someone else saved this book while it was being edited
+    if 'save_conflict' in st.session_state:
+        show_conflict_options(book_data)
+        return
+    
     # Display results after form submission
     if 'save_success' in st.session_state:
         if st.session_state.save_success:
             st.success(st.session_state.save_message)
             # Clear all edit-related session state
-            for key in ['save_success', 'save_message', 'edit_isbn', 'edit_book_data']:
+            for key in ['save_success', 'save_message', 'save_conflict', 'edit_isbn', 'edit_book_data', 'edit_pin']:
                 if key in st.session_state:
                     del st.session_state[key]
             # Keep show_book_first and return_* variables
@@ -273,6 +312,44 @@ def show_edit_form(book_data):
             del st.session_state.save_success
             del st.session_state.save_message
 
+def show_conflict_options(book_data):
+    """Let the user reload the latest version or overwrite it with their changes"""
+    st.warning("This book was changed by someone else after you opened it.")
+    for key in ['save_success', 'save_message']:
+        if key in st.session_state:
+            del st.session_state[key]
+    
+    my_changes = changed_fields(book_data, st.session_state.save_conflict)
+    if my_changes:
+        st.caption("Your unsaved changes: " + ", ".join(sorted(my_changes)))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Reload Latest", type="primary"):
+            # Drop the stale copy and the form values so the page shows the saved version
+            for key in ['save_conflict', 'edit_book_data'] + [k for k in st.session_state if str(k).startswith('form_')]:
+                if key in st.session_state:
+                    del st.session_state[key]
+            st.rerun()
+    with col2:
+        if st.button("💾 Overwrite With My Changes", type="secondary"):
+            latest = get_book_by_isbn(book_data.get('isbncode'))
+            if not latest:
+                st.error("This book no longer exists")
+                return
+            status, message = update_book_fields(latest['isbncode'], my_changes, latest.get('rowversion'))
+            # Another save slipped in between - stay on the conflict options
+            if status != UPDATE_CONFLICT:
+                del st.session_state.save_conflict
+                st.session_state.save_success = status in (UPDATE_OK, UPDATE_UNCHANGED)
+                st.session_state.save_message = message
+                if st.session_state.save_success:
+                    st.session_state.show_book_first = my_changes.get('isbncode', latest['isbncode'])
+                    if 'edit_isbn' in st.session_state:
+                        del st.session_state.edit_isbn
+            st.rerun()
+
 # Run the page
 if __name__ == "__main__":
-    show_edit_book_page()
\ No newline at end of file
+    with profile_rerun("edit_book"):
+        show_edit_book_page()
\ No newline at end of file
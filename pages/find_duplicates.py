@@ -0,0 +1,109 @@
+import streamlit as st
+import sys
+import os
+
+# Add parent directory to path for imports (once - pages rerun on every interaction)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import pandas as pd
+from database import get_all_books, get_delete_pin, merge_duplicate_books
+from profiler import profile_rerun
+
+# Hide auto-generated page navigation
+st.markdown("""
+<style>
+div[data-testid="stSidebarNav"] {display: none;}
+div.block-container {padding-top: 1rem;}
+</style>
+""", unsafe_allow_html=True)
+
+def find_duplicates():
+    """Run the duplicate check over the whole catalog and keep the groups for this session"""
+    from duplicates import find_duplicate_groups
+    books_df = get_all_books()
+    columns = ['isbncode', 'title', 'subtitle', 'author', 'publisher', 'publisheddate', 'length', 'memo']
+    books = books_df[[col for col in columns if col in books_df.columns]].to_dict('records')
+    by_isbn = {book['isbncode']: book for book in books}
+    st.session_state.duplicate_groups = [[by_isbn[isbn] for isbn in group]
+                                         for group in find_duplicate_groups(books)]
+
+def dismiss_group(group_id):
+    """Hide a group the user says is not a duplicate"""
+    st.session_state.duplicate_groups = [group for group in st.session_state.duplicate_groups
+                                         if group[0]['isbncode'] != group_id]
+
+def describe_edition(book):
+    """One-line label for an edition"""
+    details = [value for value in (book.get('publisher'), book.get('publisheddate')) if isinstance(value, str) and value]
+    if pd.notna(book.get('length')) and book.get('length'):
+        details.append(f"{int(book['length'])} pages")
+    suffix = f" — {', '.join(details)}" if details else ""
+    return f"{book.get('title')} ({book.get('isbncode')}){suffix}"
+
+def show_duplicates_page():
+    """Display likely duplicate editions and merge the ones the user confirms"""
+
+    st.title("Duplicate Editions")
+
+    if st.sidebar.button("Return to Library", use_container_width=True):
+        for key in ['duplicate_groups', 'merge_message']:
+            if key in st.session_state:
+                del st.session_state[key]
+        st.switch_page("myLibrary.py")
+
+    if 'merge_message' in st.session_state:
+        success, message = st.session_state.merge_message
+        (st.success if success else st.error)(message)
+        del st.session_state.merge_message
+
+    if st.button("Check Library for Duplicates", type="primary"):
+        with st.spinner("Comparing books..."):
+            find_duplicates()
+
+    groups = st.session_state.get('duplicate_groups')
+    if groups is None:
+        st.info("Finds books that look like different editions or formats of the same work.")
+        return
+    if not groups:
+        st.success("No likely duplicates found.")
+        return
+
+    st.caption(f"{len(groups)} likely duplicate group{'s' if len(groups) != 1 else ''}")
+    for index, group in enumerate(groups):
+        # Widget keys follow the group, not its position, so dismissing one doesn't shift the others
+        group_id = group[0]['isbncode']
+        with st.expander(f"{group[0].get('title')} — {group[0].get('author')} ({len(group)} editions)"):
+            isbns = [book['isbncode'] for book in group]
+            labels = {book['isbncode']: describe_edition(book) for book in group}
+            keep = st.radio("Keep:", isbns, format_func=labels.get, key=f"dup_keep_{group_id}")
+            merge = st.multiselect("Merge into it:", [isbn for isbn in isbns if isbn != keep],
+                                   default=[isbn for isbn in isbns if isbn != keep],
+                                   format_func=labels.get, key=f"dup_merge_{group_id}_{keep}")
+            pin_input = st.text_input("Enter PIN to confirm merge:", type="password", key=f"dup_pin_{group_id}")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Merge", type="primary", key=f"dup_merge_button_{group_id}"):
+                    if not pin_input:
+                        st.error("Please enter PIN to confirm merge")
+                    elif pin_input != get_delete_pin():
+                        st.error("Incorrect PIN")
+                    else:
+                        success, message = merge_duplicate_books(keep, merge)
+                        st.session_state.merge_message = (success, message)
+                        if success:
+                            remaining = [book for book in group if book['isbncode'] not in merge]
+                            if len(remaining) > 1:
+                                groups[index] = remaining
+                            else:
+                                groups.pop(index)
+                        st.rerun()
+            with col2:
+                st.button("Not Duplicates", key=f"dup_dismiss_{group_id}", on_click=dismiss_group, args=(group_id,))
+
+# Run the page
+if __name__ == "__main__":
+    with profile_rerun("find_duplicates"):
+        show_duplicates_page()
@@ -0,0 +1,119 @@
+import streamlit as st
+import sys
+import os
+
+# Add parent directory to path for imports (once - pages rerun on every interaction)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from database import add_books_to_database, current_library_id
+from scan_queue import (ScanSession, SCAN_PENDING, SCAN_FOUND, SCAN_NOT_FOUND, SCAN_IN_LIBRARY,
+                        SCAN_ERROR, SCAN_ACCEPTED, SCAN_REJECTED)
+from profiler import profile_rerun
+
+# Hide auto-generated page navigation
+st.markdown("""
+<style>
+div[data-testid="stSidebarNav"] {display: none;}
+div.block-container {padding-top: 1rem;}
+</style>
+""", unsafe_allow_html=True)
+
+STATE_LABELS = {
+    SCAN_PENDING: "⏳ Looking up...",
+    SCAN_FOUND: "🔎 Found",
+    SCAN_NOT_FOUND: "❓ Not found",
+    SCAN_IN_LIBRARY: "📚 Already in library",
+    SCAN_ERROR: "⚠️ Lookup failed",
+    SCAN_ACCEPTED: "✅ Accepted",
+    SCAN_REJECTED: "❌ Rejected",
+}
+
+def get_scan_session():
+    # A new session when the library changes, so scans are checked against the right books
+    library_id = current_library_id()
+    if 'scan_session' not in st.session_state or st.session_state.scan_session.library_id != library_id:
+        st.session_state.scan_session = ScanSession(library_id)
+    return st.session_state.scan_session
+
+def queue_scanned_isbn():
+    """Callback for the scan box: queue the ISBN and clear the box for the next scan"""
+    value = st.session_state.scan_input
+    st.session_state.scan_input = ""
+    if value and not get_scan_session().enqueue(value):
+        st.session_state.scan_rejected_input = value
+
+def show_scan_books_page():
+    """Display the rapid-entry page for scanning shelves with a barcode reader"""
+
+    st.title("Scan Books")
+
+    if st.sidebar.button("Return to Library", use_container_width=True):
+        st.switch_page("myLibrary.py")
+
+    st.text_input("Scan ISBN:", key='scan_input', on_change=queue_scanned_isbn,
+                  placeholder="Scan a barcode - lookups run in the background")
+    if 'scan_rejected_input' in st.session_state:
+        st.error(f"'{st.session_state.scan_rejected_input}' is not a valid ISBN")
+        del st.session_state.scan_rejected_input
+
+    show_review_list()
+
+    # Poll only while lookups are in flight; the page goes quiet once they finish
+    pending = get_scan_session().count(SCAN_PENDING)
+    if pending:
+        watch_pending_lookups(pending)
+
+@st.fragment(run_every=1)
+def watch_pending_lookups(pending):
+    """Redraw the page when a lookup that was pending at the last full run has finished"""
+    if get_scan_session().count(SCAN_PENDING) != pending:
+        st.rerun()
+
+@st.fragment
+def show_review_list():
+    """Review list of scanned books; its buttons rerun only the list"""
+    session = get_scan_session()
+    items = session.snapshot()
+    if not items:
+        st.info("Scanned books will appear here.")
+        return
+
+    accepted = session.count(SCAN_ACCEPTED)
+    pending = session.count(SCAN_PENDING)
+    st.caption(f"{len(items)} scanned · {pending} looking up · {accepted} accepted")
+
+    if accepted and st.button(f"Add {accepted} Accepted Book{'s' if accepted != 1 else ''} to Library", type="primary"):
+        books = [item['book'] for item in items if item['state'] == SCAN_ACCEPTED]
+        success, message = add_books_to_database(books, session.library_id)
+        if success:
+            session.remove([book['isbncode'] for book in books])
+            st.success(message)
+        else:
+            st.error(message)
+
+    # Newest scans first
+    for item in reversed(items):
+        book = item['book'] or {}
+        col_info, col_state, col_accept, col_reject = st.columns([4, 2, 1, 1])
+        with col_info:
+            title = book.get('title') or item['isbn']
+            author = f" — {book['author']}" if book.get('author') else ""
+            st.write(f"**{title}**{author}")
+            st.caption(item['isbn'] + (f" · {item['message']}" if item['message'] else ""))
+        with col_state:
+            st.write(STATE_LABELS[item['state']])
+        if item['state'] in (SCAN_FOUND, SCAN_REJECTED):
+            with col_accept:
+                st.button("Accept", key=f"accept_{item['isbn']}",
+                          on_click=session.set_state, args=(item['isbn'], SCAN_ACCEPTED))
+        if item['state'] in (SCAN_FOUND, SCAN_ACCEPTED):
+            with col_reject:
+                st.button("Reject", key=f"reject_{item['isbn']}",
+                          on_click=session.set_state, args=(item['isbn'], SCAN_REJECTED))
+
+# Run the page
+if __name__ == "__main__":
+    with profile_rerun("scan_books"):
+        show_scan_books_page()
@@ -2,10 +2,14 @@ import streamlit as st
 import sys
 import os
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add parent directory to path for imports (once - pages rerun on every interaction)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
 
-from database import get_book_by_isbn
+from database import get_book_by_isbn, get_book_authors, get_bad_covers
+from page_loader import load_page_data
+from profiler import profile_rerun
 
 # Hide auto-generated page navigation
 st.markdown("""
@@ -42,9 +46,21 @@ def show_view_book_page():
             st.switch_page("myLibrary.py")
         return
     
-    # Get the book data from database
+    # Get the book and its authors from the database together
     isbn = st.session_state.edit_isbn
-    book_data = get_book_by_isbn(isbn)
+    # numpy is only loaded once a book is shown
+    from similar_books import similar_books
+    data = load_page_data({
+        'book': lambda: get_book_by_isbn(isbn),
+        'authors': lambda: get_book_authors(isbn),
+        'bad_covers': get_bad_covers,
+        'similar': lambda: similar_books(isbn),
+    })
+    if 'book' not in data:
+        st.warning("The book is taking longer than usual to load.")
+        st.button("Retry")
+        return
+    book_data = data.get('book')
     
     if not book_data:
         st.error(f"Book with ISBN {isbn} not found in database")
@@ -55,15 +71,54 @@ def show_view_book_page():
         return
     
     # Show the book information (read-only)
-    show_book_info(book_data)
+    show_book_info(book_data, isbn in data.get('bad_covers', frozenset()))
+    show_author_links(data.get('authors', []))
+    show_similar_books(data.get('similar', []))
+
+def show_author_links(authors):
+    """Link each of the book's authors to the Browse by Author page"""
+    if not authors:
+        return
+    
+    st.markdown("---")
+    cols = st.columns(len(authors))
+    for col, author in zip(cols, authors):
+        with col:
+            if st.button(f"More by {author['name']}", key=f"author_{author['authorid']}"):
+                st.session_state.browse_author_id = author['authorid']
+                st.session_state.browse_author_name = author['name']
+                st.session_state.browse_author_cursors = [None]
+                st.switch_page("pages/browse_author.py")
+
+def view_similar_book(isbn):
+    """Callback for a recommendation: show that book instead"""
+    st.session_state.edit_isbn = isbn
+
+def show_similar_books(books):
+    """Show the books most like this one"""
+    if not books:
+        return
+    
+    st.markdown("---")
+    st.markdown("**More Like This:**")
+    cols = st.columns(len(books))
+    for col, book in zip(cols, books):
+        with col:
+            if book.get('imageurl'):
+                st.image(book['imageurl'], width=100)
+            st.markdown(f"**{book.get('title') or 'Unknown Title'}**")
+            if book.get('author'):
+                st.caption(book['author'])
+            st.button("View", key=f"similar_{book['isbncode']}", on_click=view_similar_book,
+                      args=(book['isbncode'],))
 
-def show_book_info(book_data):
+def show_book_info(book_data, bad_cover=False):
     """Display book data in read-only format"""
     
     st.subheader("Book Information")
     
-    # Display book cover if available
-    if book_data.get('imageurl'):
+    # Display book cover if available (and not known to be dead or a placeholder)
+    if book_data.get('imageurl') and not bad_cover:
         col_img, col_info = st.columns([1, 3])
         with col_img:
             try:
@@ -125,4 +180,5 @@ def display_book_details(book_data):
 
 # Run the page
 if __name__ == "__main__":
-    show_view_book_page()
\ No newline at end of file
+    with profile_rerun("view_book"):
+        show_view_book_page()
\ No newline at end of file
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from database import get_all_books
+from covers import book_slug
+from database import current_library_id
 
 def save_position_state(view_mode, selected_idx=None, book_isbn=None):
     """Save current position state before navigation"""
@@ -25,7 +26,7 @@ def navigate_to_edit(book_isbn, view_mode, selected_idx=None):
     st.switch_page("pages/edit_book.py")
 
 def display_books_table(df, returning_isbn=None):
-    """Display books in table format"""
+    """Display books in table format, with actions for the selected rows below it"""
     display_cols = ['title', 'author', 'rating']
     available_cols = [col for col in display_cols if col in df.columns]
     
@@ -34,27 +35,46 @@ def display_books_table(df, returning_isbn=None):
         use_container_width=True, 
         hide_index=True,
         on_select="rerun",
-        selection_mode="single-row"
+        selection_mode="multi-row"
     )
     
-    # Handle selection for view/edit
-    if selected and selected.selection.rows:
-        selected_idx = selected.selection.rows[0]
-        selected_book = df.iloc[selected_idx]
-        
-        # Show selected book and buttons in sidebar
-        st.sidebar.success(f"Selected: {selected_book['title']}")
+    # Selecting rows reruns only the fragment the table is in, which shows these actions
+    rows = selected.selection.rows if selected else []
+    show_selection_actions([{'isbncode': df.iloc[i]['isbncode'], 'position': i,
+                             'title': df.iloc[i]['title'] if pd.notna(df.iloc[i]['title']) else 'Unknown Title'}
+                            for i in rows])
+
+def show_selection_actions(books):
+    """Actions for the books selected in the table view"""
+    # Several rows selected: offer to edit them together
+    if len(books) > 1:
+        st.success(f"Selected: {len(books)} books")
+        if st.button("Batch Edit", key="batch_edit_table", use_container_width=True):
+            save_position_state('table', book_isbn=books[0]['isbncode'])
+            st.session_state.batch_edit_isbns = [book['isbncode'] for book in books]
+            st.switch_page("pages/batch_edit.py")
+    
+    # Show selected book and buttons for view/edit
+    elif books:
+        selected_book = books[0]
+        st.success(f"Selected: {selected_book['title']}")
         
-        col1, col2 = st.sidebar.columns(2)
+        col1, col2, _ = st.columns([1, 1, 6])
         with col1:
             if st.button("View", key="view_table"):
-                navigate_to_view(selected_book['isbncode'], 'table', selected_idx)
+                navigate_to_view(selected_book['isbncode'], 'table', selected_book['position'])
         with col2:
             if st.button("Edit", key="edit_table"):
-                navigate_to_edit(selected_book['isbncode'], 'table', selected_idx)
+                navigate_to_edit(selected_book['isbncode'], 'table', selected_book['position'])
 
-def display_books_with_images(df, returning_isbn=None):
-    """Display books with cover images in card format"""
+def display_books_with_images(df, returning_isbn=None, covers=None, bad_covers=None):
+    """Display books with cover images in card format
+    
+    covers maps book slugs to locally cached cover files, used instead of the remote URL;
+    bad_covers holds ISBNs whose remote URL is known to be dead or a placeholder
+    """
+    covers = covers or {}
+    bad_covers = bad_covers or frozenset()
     cols_per_row = 3
     for i in range(0, len(df), cols_per_row):
         cols = st.columns(cols_per_row) 
@@ -63,16 +83,20 @@ def display_books_with_images(df, returning_isbn=None):
                 book = df.iloc[i + j]
                 book_position = i + j
                 with cols[j]:
-                    display_book_card(book, book_position)
-def display_book_card(book, position):
+                    display_book_card(book, book_position, covers.get(book_slug(book['isbncode'])),
+                                      book['isbncode'] in bad_covers)
+
+def display_book_card(book, position, cached_cover=None, bad_cover=False):
     """Display individual book card"""
     st.markdown("---")
     
     # Book cover ONLY in fixed-height container
     with st.container(height=200, border=False):
-        if pd.notna(book.get('imageurl')) and book['imageurl']:
+        remote_cover = book['imageurl'] if pd.notna(book.get('imageurl')) and book['imageurl'] and not bad_cover else None
+        cover = cached_cover or remote_cover
+        if cover:
             try:
-                st.image(book['imageurl'], width=120)
+                st.image(cover, width=120)
             except:
                 st.write("📖 No image")
         else:
@@ -115,11 +139,57 @@ def display_book_card(book, position):
         if st.button("Edit", key=f"edit_{book['isbncode']}"):
             navigate_to_edit(book['isbncode'], 'card', position)
 
-def filter_books(df, search_term, search_field):
+def catalog_signature(df):
+    """Cheap fingerprint of the catalog contents, used to key cached indexes"""
+    if 'lastmodified' in df.columns:
+        return (len(df), str(df['lastmodified'].max()))
+    return (len(df), int(pd.util.hash_pandas_object(df[['isbncode', 'title', 'author']], index=False).sum()))
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_fuzzy_index(signature, _df):
+    """Build (once per catalog version) the trigram index used by fuzzy search"""
+    from search_index import FuzzyCatalogIndex
+    return FuzzyCatalogIndex(_df)
+
+def fuzzy_filter_books(df, search_term, search_field):
+    """Return books matching the search term despite typos, best match first"""
+    index = get_fuzzy_index((current_library_id(), catalog_signature(df)), df)
+    positions = pd.Index(df['isbncode']).get_indexer(index.search(search_term, search_field))
+    return df.iloc[positions[positions >= 0]]
+
+# In-memory equivalents of database.SORT_ORDERS: (columns, ascending)
+CATALOG_SORTS = {
+    "Title": (['title'], True),
+    "Author": (['author', 'title'], True),
+    "Rating": (['rating'], False),
+    "Date added": (['dateadded'], False),
+    "Last modified": (['lastmodified'], False),
+    "Published date": (['publisheddate'], False),
+}
+
+def sort_books(df, sort):
+    """Sort a loaded catalog the same way the paged view orders it (rows keep their index labels)"""
+    columns, ascending = CATALOG_SORTS.get(sort, CATALOG_SORTS["Title"])
+    # Published dates come in many formats; order by the year like the database does
+    def sort_values(column):
+        if column.name == 'publisheddate':
+            return column.astype(str).str.extract(r'([0-9]{4})', expand=False)
+        # Case-folded, missing as '' (SORT_ORDERS); str order is the database's COLLATE "C"
+        if column.name in ('title', 'author'):
+            return column.fillna('').astype(str).str.lower()
+        return column
+    return df.sort_values(columns + ['isbncode'], ascending=ascending, key=sort_values,
+                          na_position='last' if not ascending else 'first',
+                          kind='stable')
+
+def filter_books(df, search_term, search_field, fuzzy=False):
     """Filter dataframe based on search criteria"""
     if not search_term:
         return df
     
+    if fuzzy and search_field != "ISBN":
+        return fuzzy_filter_books(df, search_term, search_field)
+    
     search_term = search_term.lower()
     
     if search_field == "All":
@@ -0,0 +1,164 @@
+"""
+Rerun profiler for Personal Library Management System
+Profiles each script rerun of a session on demand and saves the profiles for offline analysis
+
+Turn it on for one session with ?profile=1 (?profile=0 turns it off) or
+for every session with PROFILE_RERUNS=1. Each rerun is then run under
+cProfile and a stack sampler, and two files are written to PROFILE_DIR:
+
+    <time>-<page>-<session>.pstats     python -m pstats FILE, snakeviz FILE
+    <time>-<page>-<session>.collapsed  flamegraph.pl FILE > flame.svg, or speedscope
+
+The sidebar shows the rerun's top functions by cumulative time. When
+profiling is off, a rerun only pays for a query parameter and session
+state lookup.
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import streamlit as st
+from app_config import get_setting
+
+PROFILE_DIR = get_setting('PROFILE_DIR', 'profiles')
+PROFILE_ALL_SESSIONS = get_setting('PROFILE_RERUNS', '') not in ('', '0')
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = float(get_setting('PROFILE_SAMPLE_INTERVAL', '0.005'))
+
+# Functions listed in the sidebar
+TOP_FUNCTIONS = 15
+
+def profiling_enabled():
+    """Whether this session's reruns are profiled (?profile= sticks for the session)"""
+    requested = st.query_params.get('profile')
+    if requested is not None:
+        st.session_state.profile_reruns = requested not in ('', '0')
+    return st.session_state.get('profile_reruns', PROFILE_ALL_SESSIONS)
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Samples the stacks of the script thread and the page loader threads
+
+    Counts are kept as collapsed stacks (root first, frames joined by ';'),
+    the input format of flame graph tools.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rerun-sampler", daemon=True)
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                name = names.get(thread_id, '')
+                if thread_id != self.thread_id and not name.startswith('page-loader'):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def top_functions(profile, limit=TOP_FUNCTIONS):
+    """
+    The functions with the most cumulative time in a profile
+
+    Returns:
+        list: Dicts with function, calls, own_ms and cumulative_ms
+    """
+    import pstats
+    stats = pstats.Stats(profile).stats
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.items():
+        if filename == __file__:
+            continue
+        # Built-ins have no file ('~')
+        label = f"{name} ({os.path.basename(filename)}:{line})" if line else name
+        rows.append({'function': label, 'calls': calls,
+                     'own_ms': round(own * 1000, 1), 'cumulative_ms': round(cumulative * 1000, 1)})
+    return sorted(rows, key=lambda row: -row['cumulative_ms'])[:limit]
+
+def show_profile_summary(page, elapsed, functions, files):
+    """Sidebar summary of the rerun just profiled"""
+    with st.sidebar.expander(f"⏱️ Profile: {page} rerun {elapsed * 1000:.0f} ms", expanded=True):
+        if functions:
+            st.dataframe(functions, hide_index=True, use_container_width=True)
+        else:
+            st.caption("cProfile was busy with another session; only stack samples were taken")
+        st.caption("Saved " + ", ".join(os.path.basename(path) for path in files))
+
+@contextmanager
+def profile_rerun(page):
+    """
+    Profile the block (one rerun of a page) when profiling is on for this session
+
+    Args:
+        page (str): Page name used in the profile file names
+    """
+    if not profiling_enabled():
+        yield
+        return
+
+    import cProfile
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    ctx = get_script_run_ctx()
+    session = ctx.session_id[:8] if ctx else 'script'
+    stamp = time.strftime('%Y%m%d-%H%M%S') + f"{time.time() % 1:.3f}"[1:]
+    base = os.path.join(PROFILE_DIR, f"{stamp}-{page}-{session}")
+
+    sampler = StackSampler(threading.get_ident())
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Only one cProfile can run at a time; concurrent profiled reruns get stack samples only
+        profile = None
+    sampler.start()
+    started = time.perf_counter()
+    completed = False
+    try:
+        yield
+        completed = True
+    finally:
+        elapsed = time.perf_counter() - started
+        if profile:
+            profile.disable()
+        sampler.stop()
+
+        files = []
+        if profile:
+            profile.dump_stats(f"{base}.pstats")
+            files.append(f"{base}.pstats")
+        sampler.write(f"{base}.collapsed")
+        files.append(f"{base}.collapsed")
+        # A rerun cut short by st.rerun() or st.switch_page() has nowhere to show the summary
+        if completed:
+            show_profile_summary(page, elapsed, top_functions(profile) if profile else [], files)
@@ -0,0 +1,117 @@
+"""
+Barcode scanning queue for Personal Library Management System
+Resolves scanned ISBNs in the background while the user keeps scanning
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app_config import get_setting
+from api_calls import lookup_book
+from database import get_book_by_isbn, find_possible_duplicates
+
+# Scan item states
+SCAN_PENDING = 'pending'
+SCAN_FOUND = 'found'
+SCAN_NOT_FOUND = 'not_found'
+SCAN_IN_LIBRARY = 'in_library'
+SCAN_ERROR = 'error'
+SCAN_ACCEPTED = 'accepted'
+SCAN_REJECTED = 'rejected'
+
+# Resolving an ISBN waits on lookup_book, so it gets its own pool rather
+# than sharing the one the HTTP requests run on
+_scan_pool = ThreadPoolExecutor(max_workers=int(get_setting('SCAN_WORKERS', '4')),
+                                thread_name_prefix="scan-resolver")
+
+def normalize_isbn(value):
+    """Strip scanner noise, keeping digits and a trailing X"""
+    cleaned = re.sub(r'[^0-9Xx]', '', value or '').upper()
+    return cleaned if len(cleaned) in (10, 13) else None
+
+def resolve_isbn(isbn, library_id):
+    """
+    Look up one scanned ISBN (runs on a worker thread)
+
+    Args:
+        isbn (str): Normalized ISBN
+        library_id (int): Library to check for the book (worker threads have no session)
+
+    Returns:
+        tuple: (state, book data or None, message)
+    """
+    try:
+        existing = get_book_by_isbn(isbn, library_id)
+        if existing:
+            return SCAN_IN_LIBRARY, existing, "Already in library"
+    except Exception as e:
+        print(f"Library check for {isbn} failed: {e}")
+
+    try:
+        book = lookup_book(isbn)
+    except Exception as e:
+        return SCAN_ERROR, None, str(e)
+    if not book:
+        return SCAN_NOT_FOUND, None, "Book not found"
+    others = find_possible_duplicates(book, library_id)
+    if others:
+        return SCAN_FOUND, book, f"Another edition in library: {others[0]['title']} ({others[0]['isbncode']})"
+    return SCAN_FOUND, book, ""
+
+class ScanSession:
+    """Scanned ISBNs in scan order, each resolved by a background worker"""
+
+    def __init__(self, library_id):
+        self.library_id = library_id
+        self.items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enqueue(self, raw_value):
+        """
+        Queue a scanned value for lookup
+
+        Returns:
+            str: The normalized ISBN, or None if the value is not an ISBN
+        """
+        isbn = normalize_isbn(raw_value)
+        if not isbn:
+            return None
+        with self._lock:
+            # Rescanning a failed ISBN retries it; anything else is a double scan
+            if isbn in self.items and self.items[isbn]['state'] not in (SCAN_ERROR, SCAN_NOT_FOUND):
+                return isbn
+            self.items[isbn] = {'isbn': isbn, 'state': SCAN_PENDING, 'book': None, 'message': ""}
+        future = _scan_pool.submit(resolve_isbn, isbn, self.library_id)
+        future.add_done_callback(lambda f: self._resolved(isbn, f))
+        return isbn
+
+    def _resolved(self, isbn, future):
+        try:
+            state, book, message = future.result()
+        except Exception as e:
+            state, book, message = SCAN_ERROR, None, str(e)
+        with self._lock:
+            item = self.items.get(isbn)
+            if item is not None and item['state'] == SCAN_PENDING:
+                item.update(state=state, book=book, message=message)
+
+    def set_state(self, isbn, state):
+        """Accept or reject a resolved book"""
+        with self._lock:
+            if isbn in self.items:
+                self.items[isbn]['state'] = state
+
+    def remove(self, isbns):
+        with self._lock:
+            for isbn in isbns:
+                self.items.pop(isbn, None)
+
+    def snapshot(self):
+        """Copy of the items, safe to render while workers keep updating"""
+        with self._lock:
+            return [dict(item) for item in self.items.values()]
+
+    def count(self, state):
+        with self._lock:
+            return sum(1 for item in self.items.values() if item['state'] == state)
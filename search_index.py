@@ -0,0 +1,93 @@
+"""
+Fuzzy search index for Personal Library Management System
+Typo-tolerant title/author search using a trigram candidate index
+"""
+
+import re
+import numpy as np
+
+# Minimum share of the query's trigrams a book must contain to be a match
+MIN_SIMILARITY = 0.4
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def trigrams(text):
+    """Return the set of word-padded trigrams of a string (pg_trgm style)"""
+    grams = set()
+    for word in _WORD_RE.findall(str(text).lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+class TrigramIndex:
+    """
+    Inverted index from trigram to row positions
+
+    Postings for all trigrams live in one array sliced by offsets, so a
+    query only touches the rows sharing at least one trigram with it.
+    """
+
+    def __init__(self, values):
+        vocab = {}
+        gram_ids = []
+        row_ids = []
+        lengths = np.zeros(len(values), dtype=np.int32)
+        for row, value in enumerate(values):
+            grams = trigrams(value) if value else ()
+            lengths[row] = len(grams)
+            for gram in grams:
+                gram_ids.append(vocab.setdefault(gram, len(vocab)))
+                row_ids.append(row)
+
+        gram_ids = np.asarray(gram_ids, dtype=np.int32)
+        row_ids = np.asarray(row_ids, dtype=np.int32)
+        order = np.argsort(gram_ids, kind="stable")
+
+        self.vocab = vocab
+        self.lengths = lengths
+        self.postings = row_ids[order]
+        self.offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(vocab)), out=self.offsets[1:])
+
+    def search(self, query, min_similarity=MIN_SIMILARITY):
+        """
+        Rank rows by trigram similarity to the query
+
+        Returns:
+            tuple: (row positions, scores) ordered best match first
+        """
+        grams = trigrams(query)
+        ids = [self.vocab[gram] for gram in grams if gram in self.vocab]
+        if not ids:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        hits = np.concatenate([self.postings[self.offsets[i]:self.offsets[i + 1]] for i in ids])
+        rows, shared = np.unique(hits, return_counts=True)
+
+        # Share of the query found in the row; ties go to the closer overall match
+        score = shared / len(grams)
+        keep = score >= min_similarity
+        rows, shared, score = rows[keep], shared[keep], score[keep]
+        overlap = shared / (len(grams) + self.lengths[rows] - shared)
+        order = np.lexsort((-overlap, -score))
+        return rows[order], score[order]
+
+class FuzzyCatalogIndex:
+    """Trigram indexes over a catalog DataFrame for the Title, Author and All search fields"""
+
+    def __init__(self, df):
+        titles = df['title'].fillna('').astype(str).tolist()
+        authors = df['author'].fillna('').astype(str).tolist()
+        self.isbns = df['isbncode'].to_numpy()
+        self.indexes = {
+            "Title": TrigramIndex(titles),
+            "Author": TrigramIndex(authors),
+            "All": TrigramIndex([f"{t} {a}" for t, a in zip(titles, authors)]),
+        }
+
+    def search(self, query, search_field="All"):
+        """Return ISBNs of matching books ordered best match first"""
+        index = self.indexes.get(search_field, self.indexes["All"])
+        rows, _ = index.search(query)
+        return self.isbns[rows]
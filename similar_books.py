@@ -0,0 +1,343 @@
+"""
+"More like this" recommendations for Personal Library Management System
+Finds similar books with TF-IDF vectors over hashed words and word pairs
+
+Each book becomes a sparse, L2-normalized TF-IDF vector over its title,
+subtitle, authors, publisher, description and excerpt, with terms hashed
+into a fixed number of buckets. The vectors are kept twice: by book (to
+read a book's own vector) and as postings by bucket, so the neighbors of
+a book are scored by summing only the postings of its own buckets.
+
+Usage:
+    python similar_books.py <isbn>
+"""
+
+import re
+import math
+import time
+import threading
+import numpy as np
+
+# Hashed feature space (power of two); collisions are rare at catalog vocabulary sizes
+N_FEATURES = 1 << 18
+
+# Only a book's strongest terms are kept, which bounds both memory and query time
+MAX_TERMS_PER_BOOK = 64
+
+# Neighbors scoring below this share nothing meaningful with the book
+MIN_SIMILARITY = 0.05
+
+# Books changed since the last full build are scored separately; past this
+# share of the catalog the index is rebuilt (which also refreshes the IDF weights)
+REBUILD_SHARE = 0.1
+
+# (field, weight, include word pairs)
+TEXT_FIELDS = [
+    ('title', 3.0, True),
+    ('subtitle', 2.0, True),
+    ('description', 1.0, False),
+    ('excerpt', 1.0, False),
+]
+AUTHOR_WEIGHT = 3.0
+PUBLISHER_WEIGHT = 1.0
+
+# Metadata kept per book so recommendations render without another query
+DISPLAY_FIELDS = ['isbncode', 'title', 'author', 'imageurl']
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have he her his in is it its of on or she that the their
+    this to was were which who will with you your
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _words(text):
+    if not isinstance(text, str):
+        return []
+    return [word for word in _WORD_RE.findall(text.lower()) if len(word) > 1 and word not in STOP_WORDS]
+
+def book_terms(book):
+    """
+    Weighted terms describing a book
+
+    Returns:
+        list: (term, weight) pairs; a term can appear more than once
+    """
+    terms = []
+    for field, weight, pairs in TEXT_FIELDS:
+        words = _words(book.get(field))
+        terms.extend((word, weight) for word in words)
+        if pairs:
+            terms.extend((f"{a} {b}", weight) for a, b in zip(words, words[1:]))
+    author = book.get('author')
+    if isinstance(author, str):
+        for name in re.split(r";| and | & ", author):
+            name = " ".join(_words(name))
+            if name:
+                terms.append((f"author:{name}", AUTHOR_WEIGHT))
+    publisher = " ".join(_words(book.get('publisher')))
+    if publisher:
+        terms.append((f"publisher:{publisher}", PUBLISHER_WEIGHT))
+    return terms
+
+def term_frequencies(book):
+    """
+    Hashed, sublinear term frequencies of a book
+
+    Returns:
+        tuple: (bucket ids sorted ascending, frequencies) as numpy arrays
+    """
+    terms = book_terms(book)
+    if not terms:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    # str hashes are salted per process, which is fine for an in-memory index
+    buckets = np.fromiter((hash(term) % N_FEATURES for term, _ in terms), dtype=np.int32, count=len(terms))
+    weights = np.fromiter((weight for _, weight in terms), dtype=np.float32, count=len(terms))
+    ids, inverse = np.unique(buckets, return_inverse=True)
+    counts = np.bincount(inverse, weights=weights)
+    return ids, (1 + np.log(counts)).astype(np.float32)
+
+class SimilarBooksIndex:
+    """
+    TF-IDF neighbors over one library's books
+
+    Built in one pass over the catalog. Later changes are applied with
+    update() and remove(): the book's row in the built matrix is retired
+    and its new vector is kept on the side (using the IDF weights of the
+    build), until enough books have changed that a rebuild is due.
+    """
+
+    def __init__(self, books):
+        """
+        Args:
+            books (list): Book dicts with isbncode and the fields in TEXT_FIELDS, author and publisher
+        """
+        self.lock = threading.Lock()
+        self.books = {}
+        frequencies = []
+        isbns = []
+        for book in books:
+            isbn = book.get('isbncode')
+            if not isbn or isbn in self.books:
+                continue
+            self.books[isbn] = {field: book.get(field) for field in DISPLAY_FIELDS}
+            isbns.append(isbn)
+            frequencies.append(term_frequencies(book))
+
+        count = len(isbns)
+        all_ids = np.concatenate([ids for ids, _ in frequencies]) if frequencies else np.empty(0, dtype=np.int32)
+        document_frequency = np.bincount(all_ids, minlength=N_FEATURES)
+        self.idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        # Rows in book order (CSR)
+        vectors = [self.weigh(ids, tf) for ids, tf in frequencies]
+        lengths = np.fromiter((len(ids) for ids, _ in vectors), dtype=np.int64, count=count)
+        self.row_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.row_offsets[1:])
+        self.row_ids = np.concatenate([ids for ids, _ in vectors]) if vectors else np.empty(0, dtype=np.int32)
+        self.row_weights = np.concatenate([w for _, w in vectors]) if vectors else np.empty(0, dtype=np.float32)
+
+        # The same weights as postings by bucket (CSC)
+        rows = np.repeat(np.arange(count, dtype=np.int32), lengths)
+        order = np.argsort(self.row_ids, kind="stable")
+        self.posting_rows = rows[order]
+        self.posting_weights = self.row_weights[order]
+        self.posting_offsets = np.zeros(N_FEATURES + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.row_ids, minlength=N_FEATURES), out=self.posting_offsets[1:])
+
+        self.isbns = np.array(isbns, dtype=object)
+        self.row_of = {isbn: row for row, isbn in enumerate(isbns)}
+        self.alive = np.ones(count, dtype=bool)
+        # Books added or changed since the build: isbn -> (ids, weights)
+        self.changed = {}
+        # ISBNs written since they were last read into the index
+        self.stale = set()
+
+    def weigh(self, ids, tf):
+        """TF-IDF weights for a book's term frequencies, pruned to its strongest terms and L2-normalized"""
+        weights = tf * self.idf[ids]
+        if len(ids) > MAX_TERMS_PER_BOOK:
+            keep = np.sort(np.argpartition(weights, -MAX_TERMS_PER_BOOK)[-MAX_TERMS_PER_BOOK:])
+            ids, weights = ids[keep], weights[keep]
+        norm = math.sqrt(float(np.dot(weights, weights)))
+        return ids, (weights / norm if norm else weights).astype(np.float32)
+
+    def vector(self, isbn):
+        """A book's (ids, weights), or None if it isn't in the index"""
+        if isbn in self.changed:
+            return self.changed[isbn]
+        row = self.row_of.get(isbn)
+        if row is None or not self.alive[row]:
+            return None
+        start, end = self.row_offsets[row], self.row_offsets[row + 1]
+        return self.row_ids[start:end], self.row_weights[start:end]
+
+    def update(self, book):
+        """Add or replace a book"""
+        isbn = book['isbncode']
+        self.remove(isbn)
+        self.books[isbn] = {field: book.get(field) for field in DISPLAY_FIELDS}
+        self.changed[isbn] = self.weigh(*term_frequencies(book))
+
+    def remove(self, isbn):
+        """Drop a book"""
+        self.books.pop(isbn, None)
+        self.changed.pop(isbn, None)
+        row = self.row_of.get(isbn)
+        if row is not None:
+            self.alive[row] = False
+
+    def needs_rebuild(self):
+        retired = len(self.alive) - int(self.alive.sum())
+        return len(self.changed) + retired > max(REBUILD_SHARE * len(self.alive), 50)
+
+    def similar(self, isbn, k=6):
+        """
+        The k books most similar to one book
+
+        Returns:
+            list: (isbn, cosine similarity) pairs, most similar first
+        """
+        query = self.vector(isbn)
+        if query is None or not len(query[0]):
+            return []
+        query_ids, query_weights = query
+
+        # Built rows: gather the postings of the query's buckets and sum per row
+        starts = self.posting_offsets[query_ids]
+        ends = self.posting_offsets[query_ids + 1]
+        lengths = ends - starts
+        results = []
+        if lengths.sum():
+            positions = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+            scores = np.bincount(self.posting_rows[positions],
+                                 weights=self.posting_weights[positions] * np.repeat(query_weights, lengths),
+                                 minlength=len(self.alive))
+            scores[~self.alive] = 0
+            if isbn in self.row_of:
+                scores[self.row_of[isbn]] = 0
+            top = np.argpartition(scores, -k)[-k:] if len(scores) > k else np.arange(len(scores))
+            results = [(self.isbns[row], float(scores[row])) for row in top]
+
+        # Changed books: a sparse dot product each
+        for other, (ids, weights) in self.changed.items():
+            if other == isbn:
+                continue
+            _, query_positions, other_positions = np.intersect1d(query_ids, ids, assume_unique=True,
+                                                                 return_indices=True)
+            if len(query_positions):
+                results.append((other, float(np.dot(query_weights[query_positions], weights[other_positions]))))
+
+        results = [(other, score) for other, score in results if score >= MIN_SIMILARITY]
+        return sorted(results, key=lambda item: -item[1])[:k]
+
+# One index per library, built in the background on first use and kept current by book_changed()
+_indexes = {}
+_indexes_lock = threading.Lock()
+# Libraries whose index is being built, with the books written since the build started
+_building = {}
+
+def build_index(library_id):
+    """Build a library's index from its whole catalog"""
+    from database import get_all_books
+    books_df = get_all_books(library_id=library_id)
+    columns = set(DISPLAY_FIELDS) | {field for field, _, _ in TEXT_FIELDS} | {'publisher'}
+    books = books_df[[col for col in books_df.columns if col in columns]].to_dict('records')
+    return SimilarBooksIndex(books)
+
+def book_changed(library_id, isbn):
+    """Note that a book was written; a loaded index re-reads it before its next query"""
+    with _indexes_lock:
+        index = _indexes.get(library_id)
+        if library_id in _building:
+            # The new index may have read the catalog before this write
+            _building[library_id].add(isbn)
+    if index is not None:
+        with index.lock:
+            index.stale.add(isbn)
+
+def start_build(library_id):
+    """Build a library's index in a background thread (once at a time), replacing the current one when done"""
+    with _indexes_lock:
+        if library_id in _building:
+            return
+        _building[library_id] = set()
+
+    def run():
+        index = None
+        try:
+            index = build_index(library_id)
+        except Exception as e:
+            print(f"Similar books index for library {library_id} failed to build: {e}")
+        finally:
+            with _indexes_lock:
+                written = _building.pop(library_id)
+                if index is not None:
+                    index.stale |= written
+                    _indexes[library_id] = index
+    threading.Thread(target=run, name=f"similar-books-{library_id}", daemon=True).start()
+
+def get_similar_index(library_id, wait=False):
+    """
+    A library's index, caught up with books written since it was built
+
+    A missing index, or one due for a rebuild, is built in the background;
+    until it is ready the current index (if any) keeps serving.
+
+    Args:
+        library_id (int): Library to use
+        wait (bool): Block until a missing index is built
+
+    Returns:
+        SimilarBooksIndex: The index, or None while the first build runs
+    """
+    from database import fetch_book_by_isbn
+    with _indexes_lock:
+        index = _indexes.get(library_id)
+    if index is None or index.needs_rebuild():
+        start_build(library_id)
+    while wait and index is None:
+        time.sleep(0.1)
+        with _indexes_lock:
+            index = _indexes.get(library_id)
+            if index is None and library_id not in _building:
+                raise RuntimeError(f"Similar books index for library {library_id} failed to build")
+    if index is None:
+        return None
+    with index.lock:
+        while index.stale:
+            isbn = index.stale.pop()
+            book = fetch_book_by_isbn(isbn, library_id)
+            if book:
+                index.update(book)
+            else:
+                index.remove(isbn)
+    return index
+
+def similar_books(isbn, k=6, library_id=None):
+    """
+    Books similar to the given one
+
+    Returns:
+        list: Book dicts (isbncode, title, author, imageurl, similarity), most similar
+            first; empty while the library's index is still being built
+    """
+    from database import current_library_id
+    index = get_similar_index(library_id or current_library_id())
+    if index is None:
+        return []
+    with index.lock:
+        return [dict(index.books[other], similarity=score)
+                for other, score in index.similar(isbn, k) if other in index.books]
+
+if __name__ == "__main__":
+    import sys
+    from database import DEFAULT_LIBRARY_ID
+    started = time.perf_counter()
+    index = get_similar_index(DEFAULT_LIBRARY_ID, wait=True)
+    built = time.perf_counter()
+    matches = index.similar(sys.argv[1])
+    done = time.perf_counter()
+    for other, score in matches:
+        print(f"{score:.3f}  {other}  {index.books[other]['title']} — {index.books[other]['author']}")
+    print(f"Indexed {len(index.books)} books in {built - started:.1f}s; query took {(done - built) * 1000:.1f} ms")
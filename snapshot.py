@@ -0,0 +1,274 @@
+"""
+Static snapshot builder for Personal Library Management System
+Renders the read-only catalog to HTML and JSON files that can be served from disk
+
+The snapshot holds index.html (client-side search over search_index.json),
+one page per book under books/, and cover images copied from the local
+cover cache. manifest.json records each book's LastModified and cached
+cover so a refresh only re-renders books that changed.
+
+Usage:
+    python snapshot.py [--out DIR] [--full] [--library ID]
+    python -m http.server --directory site
+"""
+
+import os
+import json
+import shutil
+import argparse
+import threading
+from html import escape
+from app_config import get_setting
+from covers import book_slug, cached_cover, cached_cover_index
+from database import get_read_connection_dict, DEFAULT_LIBRARY_ID
+
+# Where the snapshot is written
+SNAPSHOT_DIR = get_setting('SNAPSHOT_DIR', 'site')
+# The library the snapshot publishes
+SNAPSHOT_LIBRARY_ID = int(get_setting('SNAPSHOT_LIBRARY_ID', str(DEFAULT_LIBRARY_ID)))
+
+PAGE_STYLE = """
+body {font-family: sans-serif; margin: 2rem auto; max-width: 1100px; padding: 0 1rem;}
+.grid {display: grid; grid-template-columns: repeat(auto-fill, minmax(180px, 1fr)); gap: 1.5rem;}
+.card img, .cover {max-width: 120px; max-height: 180px;}
+.card a {color: inherit; text-decoration: none;}
+.muted {color: #666; font-size: 0.9rem;}
+input {width: 100%; padding: 0.5rem; font-size: 1rem; margin-bottom: 1rem;}
+"""
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>📚 My Library</title>
+<style>{style}</style>
+</head>
+<body>
+<h1>📚 My Library</h1>
+<input id="search" type="search" placeholder="Search title, author or ISBN...">
+<p class="muted" id="count"></p>
+<div class="grid" id="books"></div>
+<script>
+const esc = s => String(s ?? "").replace(/[&<>"']/g, c => ({{"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}})[c]);
+let books = [];
+function render() {{
+  const term = document.getElementById("search").value.trim().toLowerCase();
+  const shown = term ? books.filter(b => b.search.includes(term)) : books;
+  document.getElementById("count").textContent = `${{shown.length}} of ${{books.length}} books`;
+  document.getElementById("books").innerHTML = shown.map(b => `
+    <div class="card"><a href="${{esc(b.page)}}">
+      ${{b.cover ? `<img src="${{esc(b.cover)}}" alt="" loading="lazy">` : "<div>📖 No image</div>"}}
+      <div><strong>${{esc(b.title || "Unknown Title")}}</strong></div>
+      ${{b.author ? `<div><em>by ${{esc(b.author)}}</em></div>` : ""}}
+    </a></div>`).join("");
+}}
+fetch("search_index.json").then(r => r.json()).then(data => {{ books = data; render(); }});
+document.getElementById("search").addEventListener("input", render);
+</script>
+</body>
+</html>
+"""
+
+BOOK_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>{style}</style>
+</head>
+<body>
+<p><a href="../index.html">← Return to Library</a></p>
+{cover}
+<h1>{title}</h1>
+{subtitle}
+<ul>{details}</ul>
+{sections}
+</body>
+</html>
+"""
+
+def _write_atomic(path, text):
+    """Write a file via a temporary sibling so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def copy_cover(book, out_dir):
+    """
+    Copy a book's cached cover into the snapshot
+
+    Returns:
+        str: Cover URL relative to the snapshot root, the remote ImageURL
+             when no cached copy exists, or None
+    """
+    source = cached_cover(book['isbncode'])
+    if not source:
+        return book.get('imageurl') or None
+    name = os.path.basename(source)
+    shutil.copyfile(source, os.path.join(out_dir, 'covers', name))
+    return f"covers/{name}"
+
+def render_book_page(book, cover):
+    """Render the static HTML page for one book"""
+    details = []
+    for label, key in [("Author", 'author'), ("ISBN", 'isbncode'), ("Publisher", 'publisher'),
+                       ("Published", 'publisheddate'), ("Pages", 'length'), ("Rating", 'rating')]:
+        if book.get(key):
+            details.append(f"<li><strong>{label}:</strong> {escape(str(book[key]))}</li>")
+
+    sections = []
+    for label, key in [("Personal Notes", 'memo'), ("Book Excerpt", 'excerpt'), ("Description", 'description')]:
+        if book.get(key):
+            sections.append(f"<h3>{label}</h3><p>{escape(str(book[key]))}</p>")
+
+    if cover and not cover.startswith(('http://', 'https://')):
+        cover = f"../{cover}"
+    return BOOK_TEMPLATE.format(
+        style=PAGE_STYLE,
+        title=escape(book.get('title') or 'Unknown Title'),
+        subtitle=f"<p><em>{escape(book['subtitle'])}</em></p>" if book.get('subtitle') else "",
+        cover=f'<img class="cover" src="{escape(cover)}" alt="">' if cover else "",
+        details="".join(details),
+        sections="".join(sections),
+    )
+
+def search_entry(book, cover):
+    """Client-side search index entry for one book"""
+    return {
+        'isbn': book['isbncode'],
+        'title': book.get('title'),
+        'author': book.get('author'),
+        'cover': cover,
+        'page': f"books/{book_slug(book['isbncode'])}.html",
+        'search': " ".join(str(book.get(k) or '') for k in ['title', 'author', 'isbncode']).lower(),
+    }
+
+def load_manifest(out_dir):
+    """Read the previous snapshot's manifest, or an empty one"""
+    try:
+        with open(os.path.join(out_dir, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'books': {}}
+
+def cover_version(path):
+    """Manifest key for a cached cover: its file name and mtime, or None when there is none"""
+    if not path:
+        return None
+    try:
+        return f"{os.path.basename(path)}:{os.path.getmtime(path)}"
+    except OSError:
+        return None
+
+def remove_orphans(out_dir, entries):
+    """Delete book pages and copied covers no search index entry refers to"""
+    keep = {entry['page'] for entry in entries} | {entry['cover'] for entry in entries if entry['cover']}
+    for folder in ['books', 'covers']:
+        for name in os.listdir(os.path.join(out_dir, folder)):
+            if f"{folder}/{name}" not in keep:
+                os.remove(os.path.join(out_dir, folder, name))
+
+def refresh_snapshot(out_dir=None, full=False, library_id=None):
+    """
+    Bring the static snapshot up to date with the database
+
+    Only books whose LastModified or cached cover changed since the last run
+    are fetched and re-rendered; pages and covers of deleted books are removed.
+
+    Args:
+        out_dir (str): Snapshot directory, defaults to SNAPSHOT_DIR
+        full (bool): Re-render every book regardless of the manifest and
+                     remove every file the new snapshot doesn't use
+        library_id (int): Library to publish, defaults to SNAPSHOT_LIBRARY_ID
+
+    Returns:
+        dict: Counts of rendered, removed and total books
+    """
+    out_dir = out_dir or SNAPSHOT_DIR
+    library_id = library_id or SNAPSHOT_LIBRARY_ID
+    os.makedirs(os.path.join(out_dir, 'books'), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'covers'), exist_ok=True)
+    manifest = {'books': {}} if full else load_manifest(out_dir)
+    previous = manifest['books']
+
+    conn = get_read_connection_dict(library_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ISBNCode, LastModified FROM MyBooks WHERE LibraryID = %s AND ISBNCode IS NOT NULL",
+                       (library_id,))
+        versions = {row['isbncode']: str(row['lastmodified']) for row in cursor.fetchall()}
+
+        cached = cached_cover_index()
+        covers = {isbn: cover_version(cached.get(book_slug(isbn))) for isbn in versions}
+        changed = [isbn for isbn, version in versions.items()
+                   if previous.get(isbn, {}).get('lastmodified') != version
+                   or previous.get(isbn, {}).get('cover') != covers[isbn]]
+        books = []
+        if changed:
+            cursor.execute("SELECT * FROM MyBooks WHERE LibraryID = %s AND ISBNCode = ANY(%s)",
+                           (library_id, changed))
+            books = [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+    for book in books:
+        cover = copy_cover(book, out_dir)
+        _write_atomic(os.path.join(out_dir, 'books', f"{book_slug(book['isbncode'])}.html"),
+                      render_book_page(book, cover))
+        previous[book['isbncode']] = {
+            'lastmodified': versions[book['isbncode']],
+            'cover': covers[book['isbncode']],
+            'entry': search_entry(book, cover),
+        }
+
+    removed = [isbn for isbn in previous if isbn not in versions]
+    for isbn in removed:
+        del previous[isbn]
+    # Sweep the folders: a full refresh starts from an empty manifest, and
+    # a deleted book's cover may be named after another extension by now
+    if full or removed:
+        remove_orphans(out_dir, [item['entry'] for item in previous.values()])
+
+    index_path = os.path.join(out_dir, 'index.html')
+    if full or books or removed or not os.path.exists(index_path):
+        entries = sorted((item['entry'] for item in previous.values()),
+                         key=lambda e: ((e['title'] or '').lower(), e['isbn']))
+        _write_atomic(os.path.join(out_dir, 'search_index.json'), json.dumps(entries, ensure_ascii=False))
+        _write_atomic(index_path, INDEX_TEMPLATE.format(style=PAGE_STYLE))
+        _write_atomic(os.path.join(out_dir, 'manifest.json'), json.dumps(manifest, ensure_ascii=False))
+
+    return {'rendered': len(books), 'removed': len(removed), 'total': len(previous)}
+
+# Background refresh after writes: at most one run at a time, and a write
+# arriving mid-run triggers exactly one follow-up run
+_refresh_lock = threading.Lock()
+_refresh_requested = threading.Event()
+
+def _refresh_worker():
+    while True:
+        while _refresh_requested.is_set():
+            _refresh_requested.clear()
+            try:
+                refresh_snapshot()
+            except Exception as e:
+                print(f"Snapshot refresh failed: {e}")
+        _refresh_lock.release()
+        # A request that raced with the release above would otherwise be lost
+        if not _refresh_requested.is_set() or not _refresh_lock.acquire(blocking=False):
+            return
+
+def schedule_snapshot_refresh():
+    """Refresh the snapshot in a background thread"""
+    _refresh_requested.set()
+    if _refresh_lock.acquire(blocking=False):
+        threading.Thread(target=_refresh_worker, name="snapshot-refresh", daemon=True).start()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the static read-only library snapshot")
+    parser.add_argument('--out', default=SNAPSHOT_DIR, help="output directory")
+    parser.add_argument('--full', action='store_true', help="re-render every book")
+    parser.add_argument('--library', type=int, default=SNAPSHOT_LIBRARY_ID, help="LibraryID to publish")
+    args = parser.parse_args()
+    counts = refresh_snapshot(args.out, full=args.full, library_id=args.library)
+    print(f"Rendered {counts['rendered']}, removed {counts['removed']}, {counts['total']} books in snapshot")
@@ -0,0 +1,345 @@
+"""
+Write-behind journal for Personal Library Management System
+Acknowledges book writes once they are on local disk and flushes them to the database in the background
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from app_config import get_setting
+
+# Journal entry operations
+JOURNAL_ADD = 'add'
+JOURNAL_UPDATE = 'update'
+JOURNAL_DELETE = 'delete'
+
+# Entries the database rejected (conflict, missing book) stay in the journal as failed
+JOURNAL_PENDING = 'pending'
+JOURNAL_FAILED = 'failed'
+
+FLUSH_BATCH_SIZE = int(get_setting('JOURNAL_FLUSH_BATCH_SIZE', '100'))
+FLUSH_RETRY_MIN_SECONDS = 1.0
+FLUSH_RETRY_MAX_SECONDS = 60.0
+
+# One flusher per journal file holds the flush lease; it is renewed every batch,
+# so another process only takes over once the holder has stopped for this long
+FLUSH_LEASE_SECONDS = float(get_setting('JOURNAL_FLUSH_LEASE_SECONDS', '300'))
+
+class WriteJournal:
+    """
+    Durable, ordered queue of book writes in a local SQLite file
+
+    append() returns as soon as the entries are committed to disk. A
+    background thread hands pending entries, oldest first, to the apply
+    function and removes each one it reports done. When the database
+    can't be reached the thread backs off and retries from the same entry,
+    so writes reach the database in the order they were made.
+
+    Every process using the journal file runs a flusher, but only the one
+    holding the flush lease applies entries; the others wait and retry, so
+    no entry is applied twice.
+    """
+
+    def __init__(self, path, apply):
+        """
+        Args:
+            path (str): SQLite file holding the journal
+            apply: Callable taking a list of entries and yielding
+                (seq, ok, message) for each one it handled, in order; it
+                raises ConnectionError when the database is unavailable
+        """
+        self.path = path
+        self.apply = apply
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Pending entries are read on every rerun; cache them until the journal changes
+        self._generation = 0
+        self._cached = (None, [])
+        self.last_error = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS Journal (
+                    Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    Op TEXT NOT NULL,
+                    LibraryID INTEGER NOT NULL DEFAULT 1,
+                    ISBN TEXT,
+                    Payload TEXT NOT NULL,
+                    ExpectedVersion INTEGER,
+                    State TEXT NOT NULL DEFAULT 'pending',
+                    Attempts INTEGER NOT NULL DEFAULT 0,
+                    Message TEXT,
+                    CreatedAt REAL NOT NULL
+                )
+            """)
+            # Journal files from before libraries existed hold the default library's writes
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(Journal)")]
+            if 'LibraryID' not in columns:
+                conn.execute("ALTER TABLE Journal ADD COLUMN LibraryID INTEGER NOT NULL DEFAULT 1")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS FlushLease (
+                    ID INTEGER PRIMARY KEY CHECK (ID = 1),
+                    Owner TEXT NOT NULL,
+                    LeaseUntil REAL NOT NULL
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        # Acknowledged writes must survive a crash or power loss
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def _changed(self):
+        with self._lock:
+            self._generation += 1
+
+    def append(self, entries):
+        """
+        Durably record writes and wake the flusher
+
+        Args:
+            entries (list): (op, library_id, isbn, payload dict, expected_version) tuples
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO Journal (Op, LibraryID, ISBN, Payload, ExpectedVersion, CreatedAt)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(op, library_id, isbn, json.dumps(payload, default=str), expected_version, now)
+                     for op, library_id, isbn, payload, expected_version in entries])
+        finally:
+            conn.close()
+        self._changed()
+        self.start()
+        self._wake.set()
+
+    def _entries(self, state, limit=None):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM Journal WHERE State = ? ORDER BY Seq" + (" LIMIT ?" if limit else ""),
+                (state, limit) if limit else (state,)).fetchall()
+        finally:
+            conn.close()
+        return [{'seq': row['Seq'], 'op': row['Op'], 'library_id': row['LibraryID'], 'isbn': row['ISBN'], 'payload': json.loads(row['Payload']),
+                 'expected_version': row['ExpectedVersion'], 'attempts': row['Attempts'],
+                 'message': row['Message'], 'created_at': row['CreatedAt']} for row in rows]
+
+    def pending(self):
+        """Entries not yet written to the database, oldest first"""
+        with self._lock:
+            generation, entries = self._cached
+            if generation == self._generation:
+                return entries
+            generation = self._generation
+        entries = self._entries(JOURNAL_PENDING)
+        with self._lock:
+            self._cached = (generation, entries)
+        return entries
+
+    def failed(self):
+        """Entries the database rejected, for the user to review"""
+        return self._entries(JOURNAL_FAILED)
+
+    def dismiss(self, seq):
+        """Drop a failed entry once the user has seen it"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM Journal WHERE Seq = ? AND State = ?", (seq, JOURNAL_FAILED))
+        finally:
+            conn.close()
+
+    def _ack(self, conn, seq, ok, message):
+        with conn:
+            if ok:
+                conn.execute("DELETE FROM Journal WHERE Seq = ?", (seq,))
+            else:
+                conn.execute("UPDATE Journal SET State = ?, Message = ? WHERE Seq = ?", (JOURNAL_FAILED, message, seq))
+        self._changed()
+
+    def _claim(self, conn):
+        """Take or renew the flush lease; False while another flusher holds it"""
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so two flushers can't both see the lease free
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT Owner, LeaseUntil FROM FlushLease WHERE ID = 1").fetchone()
+            if row and row['Owner'] != self._owner and row['LeaseUntil'] > now:
+                conn.rollback()
+                return False
+            conn.execute("INSERT OR REPLACE INTO FlushLease (ID, Owner, LeaseUntil) VALUES (1, ?, ?)",
+                         (self._owner, now + FLUSH_LEASE_SECONDS))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return True
+
+    def _release(self, conn):
+        with conn:
+            conn.execute("DELETE FROM FlushLease WHERE ID = 1 AND Owner = ?", (self._owner,))
+
+    def flush(self):
+        """
+        Write one batch of pending entries to the database
+
+        Returns:
+            int: Entries handled (0 when the journal is empty), or None when
+                another flusher holds the lease
+
+        Raises:
+            ConnectionError: The database is unavailable; unhandled entries stay pending
+        """
+        conn = self._connect()
+        handled = 0
+        try:
+            if not self._claim(conn):
+                return None
+            # Read under the lease, so entries the previous holder acked are gone
+            entries = self._entries(JOURNAL_PENDING, FLUSH_BATCH_SIZE)
+            if not entries:
+                self._release(conn)
+                return 0
+            try:
+                for seq, ok, message in self.apply(entries):
+                    self._ack(conn, seq, ok, message)
+                    handled += 1
+            except Exception:
+                if handled < len(entries):
+                    with conn:
+                        conn.execute("UPDATE Journal SET Attempts = Attempts + 1 WHERE Seq = ?",
+                                     (entries[handled]['seq'],))
+                # Another process's flusher may retry in the meantime
+                self._release(conn)
+                raise
+        finally:
+            conn.close()
+        return handled
+
+    def start(self):
+        """Start the flusher thread if it isn't running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-journal", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        delay = FLUSH_RETRY_MIN_SECONDS
+        while True:
+            try:
+                handled = self.flush()
+                if handled:
+                    self.last_error = None
+                    delay = FLUSH_RETRY_MIN_SECONDS
+                    continue
+                if handled is None:
+                    # Another process is flushing; its acks change what is pending here
+                    self._changed()
+                    self._wake.wait(FLUSH_RETRY_MIN_SECONDS)
+                    self._wake.clear()
+                    continue
+                # Empty: sleep until the next append
+                self._wake.wait()
+                self._wake.clear()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Write journal flush failed, retrying in {delay:.0f}s: {e}")
+                self._wake.wait(delay)
+                self._wake.clear()
+                delay = min(delay * 2, FLUSH_RETRY_MAX_SECONDS)
+
+    def retry_now(self):
+        """Skip the current backoff wait"""
+        self.start()
+        self._wake.set()
+
+def _apply_entry(book, entry):
+    """Apply one pending entry to the overlaid state of the book with this ISBN"""
+    if entry['op'] == JOURNAL_ADD:
+        return dict(entry['payload'], rowversion=1)
+    if entry['op'] == JOURNAL_DELETE:
+        return None
+    if book is None:
+        return None
+    book = dict(book, **entry['payload'])
+    # The flushed update bumps the row version; match it so a follow-up edit doesn't conflict
+    book['rowversion'] = (book.get('rowversion') or 1) + 1
+    return book
+
+def overlay_book(entries, isbn, read_book):
+    """
+    A book as it will be once the pending entries are flushed
+
+    Args:
+        entries (list): Pending journal entries, oldest first
+        isbn (str): Book to read
+        read_book: Callable reading a book by ISBN from the database
+
+    Returns:
+        dict: The book, or None if it doesn't exist (or a pending write removes it)
+    """
+    touching = [entry for entry in entries
+                if entry['isbn'] == isbn or entry['payload'].get('isbncode') == isbn]
+    if not touching:
+        return read_book(isbn)
+
+    first = touching[0]
+    if first['op'] == JOURNAL_ADD:
+        book = None
+    elif first['isbn'] != isbn:
+        # A pending update renames another book to this ISBN
+        book = read_book(first['isbn'])
+    else:
+        book = read_book(isbn)
+    for entry in touching:
+        book = _apply_entry(book, entry)
+        if book is not None and book.get('isbncode') != isbn:
+            # Renamed away from this ISBN
+            book = None
+    return book
+
+def overlay_books_df(entries, df, include_added=True):
+    """
+    Apply pending entries to a DataFrame of books
+
+    Updated rows are replaced and deleted ones dropped; with include_added
+    the rows of pending adds are appended (callers re-sort as needed).
+    """
+    if not entries or 'isbncode' not in df.columns:
+        return df
+    import pandas as pd
+    touched = {entry['isbn'] for entry in entries} | {entry['payload'].get('isbncode') for entry in entries}
+    touched.discard(None)
+    present = df['isbncode'].isin(touched).fillna(False)
+    books = {row['isbncode']: row for row in df[present].to_dict('records')}
+
+    for entry in entries:
+        if entry['op'] == JOURNAL_ADD and not include_added and entry['isbn'] not in books:
+            continue
+        book = _apply_entry(books.get(entry['isbn']), entry)
+        if book is not None and book.get('isbncode') != entry['isbn']:
+            books[entry['isbn']] = None
+            books[book['isbncode']] = book
+        else:
+            books[entry['isbn']] = book
+
+    rows = [book for book in books.values() if book is not None]
+    df = df[~present]
+    if rows:
+        df = pd.concat([df, pd.DataFrame(rows).reindex(columns=df.columns)], ignore_index=True)
+    return df.reset_index(drop=True)